@@ -0,0 +1,150 @@
+from decimal import Decimal
+from functools import lru_cache
+
+from carboncalc.constants import (
+    DD_VECTORS,
+    REDUCTION_FACTORS,
+    REFERENCE_LINE_CONSTANTS,
+)
+from carboncalc.enums import CIIGrade
+from carboncalc.models import CIIShipYearBoundaries
+from carboncalc.utils import cii_utils
+from core.models import Ship
+
+# Grade -> CIIShipYearBoundaries field holding its upper boundary
+BOUNDARY_FIELDS = {
+    CIIGrade.A: 'boundary_a',
+    CIIGrade.B: 'boundary_b',
+    CIIGrade.C: 'boundary_c',
+    CIIGrade.D: 'boundary_d',
+}
+# Boundaries are rounded as CIIShipYearBoundaries stores them, so cached
+# and stored boundaries grade alike
+BOUNDARY_PLACES = Decimal('0.001')
+# Distinct (ship, boundary spec) pairs kept per process
+BOUNDARY_CACHE_SIZE = 1024
+
+# Constants as Decimals, converted once per process
+_REDUCTION_FACTORS = {
+    year: Decimal(factor) for year, factor in REDUCTION_FACTORS.items()}
+
+
+def calculate_cii_reference_line(
+    cii_ship_type: str,
+    capacity: Decimal,
+) -> Decimal:
+    a, c = REFERENCE_LINE_CONSTANTS.get(cii_ship_type)
+    a, c = Decimal(a), Decimal(c)
+    return a * ((capacity)**(-c))
+
+
+def get_boundary_spec(ship: Ship) -> tuple[str, Decimal]:
+    """
+    (CII ship type, capacity), everything a ship's boundaries depend on
+    Reads ship.shipspecs and ship.ciiconfig, select_related them to avoid
+    queries
+    """
+    return (
+        cii_utils.get_cii_ship_type(ship),
+        cii_utils.get_ship_capacity_value(ship),
+    )
+
+
+def compute_cii_boundaries(
+    cii_ship_type: str,
+    capacity: Decimal,
+) -> dict[int, dict[str, Decimal]]:
+    """
+    Rating boundaries for every year in REDUCTION_FACTORS, in one pass
+    * The reference line and dd vector are evaluated once, each year is
+      then a reduction factor times the dd vector
+    Returns {year: {grade: boundary}}
+    """
+    reference_line = calculate_cii_reference_line(cii_ship_type, capacity)
+    dd_vector = dict(zip(
+        BOUNDARY_FIELDS, map(Decimal, DD_VECTORS.get(cii_ship_type))))
+    return {
+        year: {
+            grade: (d * (1 - reduction_factor) * reference_line).quantize(
+                BOUNDARY_PLACES)
+            for grade, d in dd_vector.items()}
+        for year, reduction_factor in _REDUCTION_FACTORS.items()
+    }
+
+
+def save_ship_boundaries(
+    ship_id: int,
+    boundaries: dict[int, dict[str, Decimal]],
+) -> list[CIIShipYearBoundaries]:
+    """Upserts a ship's boundaries for every year in a single query"""
+    rows = [
+        CIIShipYearBoundaries(
+            ship_id=ship_id,
+            year=year,
+            **{BOUNDARY_FIELDS[grade]: boundary
+               for grade, boundary in year_boundaries.items()})
+        for year, year_boundaries in sorted(boundaries.items())
+    ]
+    CIIShipYearBoundaries.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['ship', 'year'],
+        update_fields=[*BOUNDARY_FIELDS.values(), 'modified_at'],
+    )
+    return rows
+
+
+def populate_boundaries_for_ship(
+    ship: Ship,
+) -> list[CIIShipYearBoundaries]:
+    """Recomputes and stores a ship's boundaries for every year"""
+    cii_ship_type, capacity = get_boundary_spec(ship)
+    return save_ship_boundaries(
+        ship.pk, compute_cii_boundaries(cii_ship_type, capacity))
+
+
+def get_ship_boundaries(ship: Ship) -> dict[int, CIIShipYearBoundaries]:
+    """
+    A ship's boundaries by year, memoized per process
+    * Keyed on the ship and its boundary spec, so a change of ship type or
+      tonnage computes fresh boundaries instead of serving stale ones
+    * Warm lookups run no queries, see get_boundary_spec
+    """
+    cii_ship_type, capacity = get_boundary_spec(ship)
+    return _get_ship_boundaries(ship.pk, cii_ship_type, capacity)
+
+
+def get_ship_year_boundaries(
+    ship: Ship,
+    year: int,
+) -> CIIShipYearBoundaries:
+    try:
+        return get_ship_boundaries(ship)[year]
+    except KeyError:
+        raise CIIShipYearBoundaries.DoesNotExist(
+            "No CII boundaries for {}".format(year))
+
+
+@lru_cache(maxsize=BOUNDARY_CACHE_SIZE)
+def _get_ship_boundaries(
+    ship_id: int,
+    cii_ship_type: str,
+    capacity: Decimal,
+) -> dict[int, CIIShipYearBoundaries]:
+    boundaries = compute_cii_boundaries(cii_ship_type, capacity)
+    stored = {
+        row.year: {
+            grade: getattr(row, field)
+            for grade, field in BOUNDARY_FIELDS.items()}
+        for row in CIIShipYearBoundaries.objects.filter(ship_id=ship_id)}
+    # CASE: Stored rows are missing or were computed from older specs
+    if stored != boundaries:
+        save_ship_boundaries(ship_id, boundaries)
+    return {
+        year: CIIShipYearBoundaries(
+            ship_id=ship_id,
+            year=year,
+            **{BOUNDARY_FIELDS[grade]: boundary
+               for grade, boundary in year_boundaries.items()})
+        for year, year_boundaries in boundaries.items()
+    }
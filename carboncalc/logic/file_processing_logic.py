@@ -1,18 +1,58 @@
-import requests
+from typing import Optional
+
+from django.db import transaction
 
 from carboncalc.enums import (
     CIIFuelType,
 )
 from carboncalc.models import (
+    CIIRawData,
     StandardizedDataReportingData,
     StandardizedDataReportingFile,
 )
 from core.models import Ship
+from utils.excel_utils import (
+    iter_stored_xlsx_rows,
+    normalize_label,
+    parse_with_backends,
+)
 from utils.filetype_utils import get_file_extension
+from utils.http_utils import IntegrationEndpoint
+
 
+# Seconds to connect to, then to wait on, the extraction Lambdas
+LAMBDA_TIMEOUT = (5, 120)
+PDF_DATA_REPORTING_LAMBDA = IntegrationEndpoint(
+    name='pdf_data_reporting_lambda',
+    url="https://neapj5jo27o6a22mxs7lkb56ny0jiuzu.lambda-url.ap-southeast-1.on.aws/",
+    timeout=LAMBDA_TIMEOUT,
+)
+XLSX_DATA_REPORTING_LAMBDA = IntegrationEndpoint(
+    name='xlsx_data_reporting_lambda',
+    url="https://ykmupploq5r6j5ws3jqb5g76yi0zcqwu.lambda-url.ap-southeast-1.on.aws/",
+    timeout=LAMBDA_TIMEOUT,
+)
 
-PDF_DATA_REPORTING_LAMBDA = "https://neapj5jo27o6a22mxs7lkb56ny0jiuzu.lambda-url.ap-southeast-1.on.aws/"
-XLSX_DATA_REPORTING_LAMBDA = "https://ykmupploq5r6j5ws3jqb5g76yi0zcqwu.lambda-url.ap-southeast-1.on.aws/"
+# Labels of the XLSX template's values, see read_sdr_xlsx_data
+XLSX_DATA_REPORTING_LABELS = [
+    "Start date (yyyy-mm-dd)",
+    "End date (yyyy-mm-dd)",
+    "Gross tonnage",
+    "DWT",
+    "Hours underway (h)",
+    "Distance Travelled (n.m)",
+]
+XLSX_DATA_REPORTING_FUEL_LABEL = "Fuel oil consumption (ton)"
+XLSX_DATA_REPORTING_FUEL_MAP = {
+    "Diesel/gas Oil (Cf:3.206)": CIIFuelType.MDGO,
+    "LPG (Butane) (Cf:3.030)": CIIFuelType.LPG_BUTANE,
+    "LPG (Propane) (Cf:3.000)": CIIFuelType.LPG_PROPANE,
+    "LNG (Cf:2.750)": CIIFuelType.LNG,
+    "LFO (Cf:3.151)": CIIFuelType.LSFO,
+    "HFO (Cf:3.114)": CIIFuelType.HFO,
+    "Methanol (Cf:1.375)": CIIFuelType.METHANOL,
+    "Ethanol (Cf:1.913)": CIIFuelType.ETHANOL,
+}
 
 
 def process_standardized_data_reporting_file(
@@ -23,10 +63,7 @@ def process_standardized_data_reporting_file(
         'filepath': data_report.s3_file_path,
     }
     if file_extension == ".pdf":
-        response = requests.post(
-            PDF_DATA_REPORTING_LAMBDA,
-            json=filepath,
-        )
+        response = PDF_DATA_REPORTING_LAMBDA.post(json=filepath)
         json_response = response.json()
         data = json_response.get('data')
 
@@ -39,12 +76,7 @@ def process_standardized_data_reporting_file(
         fuel_oil_burned = _process_fuel_types_for_pdf(
             data["Fuel oil consumption(t)"])
     else:
-        response = requests.post(
-            XLSX_DATA_REPORTING_LAMBDA,
-            json=filepath,
-        )
-        json_response = response.json()
-        data = json_response.get('data')
+        data = parse_with_backends(SDR_XLSX_PARSER_BACKENDS, data_report)
 
         start_date = data["Start date (yyyy-mm-dd)"]
         end_date = data["End date (yyyy-mm-dd)"]
@@ -53,7 +85,7 @@ def process_standardized_data_reporting_file(
         total_hours = data["Hours underway (h)"]
         total_distance = data["Distance Travelled (n.m)"]
         fuel_oil_burned = _process_fuel_types_for_xlsx(
-            data["Fuel oil consumption (ton)"])
+            data[XLSX_DATA_REPORTING_FUEL_LABEL])
     # TODO: Error Handling
 
     extracted_data = StandardizedDataReportingData.objects.create(
@@ -72,6 +104,135 @@ def process_standardized_data_reporting_file(
     return extracted_data
 
 
+def read_sdr_xlsx_data(
+    data_report: StandardizedDataReportingFile,
+) -> dict:
+    """
+    Values of a data reporting XLSX file, read in process from storage
+    * Every row holding a template label takes the next filled cell as its
+      value, labels are matched ignoring case and spacing
+    * Fuel consumption is keyed by fuel label, as the XLSX Lambda returns
+      it, and a fuel left out of the file burned nothing
+    * Raises ValueError for files not following the template, e.g. without
+      the fuel oil consumption section, so the Lambda is tried instead
+    """
+    labels = set()
+    values = {}
+    for row in iter_stored_xlsx_rows(data_report.s3_file_path):
+        cells = [cell for cell in row if cell is not None and cell != '']
+        if not cells or not isinstance(cells[0], str):
+            continue
+        labels.add(normalize_label(cells[0]))
+        if len(cells) >= 2:
+            values.setdefault(normalize_label(cells[0]), cells[1])
+
+    data = {}
+    for label in XLSX_DATA_REPORTING_LABELS:
+        try:
+            data[label] = values[normalize_label(label)]
+        except KeyError:
+            raise ValueError(
+                "Missing data reporting value: {}".format(label))
+    if normalize_label(XLSX_DATA_REPORTING_FUEL_LABEL) not in labels:
+        raise ValueError("Missing data reporting section: {}".format(
+            XLSX_DATA_REPORTING_FUEL_LABEL))
+    # CASE: Without a single fuel label, the fuel rows are laid out in a
+    # way this parser does not know, rather than every fuel burning nothing
+    if not any(normalize_label(label) in labels
+               for label in XLSX_DATA_REPORTING_FUEL_MAP):
+        raise ValueError("Missing data reporting fuel types under {}".format(
+            XLSX_DATA_REPORTING_FUEL_LABEL))
+    data[XLSX_DATA_REPORTING_FUEL_LABEL] = {
+        label: values.get(normalize_label(label), 0)
+        for label in XLSX_DATA_REPORTING_FUEL_MAP}
+    return data
+
+
+def fetch_sdr_xlsx_data(
+    data_report: StandardizedDataReportingFile,
+) -> dict:
+    """Values of a data reporting XLSX file, read by the XLSX Lambda"""
+    filepath = {
+        'filepath': data_report.s3_file_path,
+    }
+    response = XLSX_DATA_REPORTING_LAMBDA.post(json=filepath)
+    json_response = response.json()
+    return json_response.get('data')
+
+
+# See utils.excel_utils.parse_with_backends
+SDR_XLSX_PARSER_BACKENDS = {
+    'local': read_sdr_xlsx_data,
+    'lambda': fetch_sdr_xlsx_data,
+}
+
+
+def get_or_extract_reporting_file_data(
+    data_report: StandardizedDataReportingFile,
+) -> StandardizedDataReportingData:
+    """
+    Data extracted from a file, calling the extraction Lambda only if the
+    file has not been extracted yet, so retried pipelines extract once
+    """
+    extracted_data = StandardizedDataReportingData.objects.filter(
+        reporting_file=data_report,
+    ).order_by(
+        '-created_at',
+    ).first()
+    if extracted_data is None:
+        extracted_data = process_standardized_data_reporting_file(data_report)
+    return extracted_data
+
+
+def generate_cii_raw_data_from_reporting_file_data(
+    file_data: StandardizedDataReportingData,
+) -> CIIRawData:
+    cii_raw_data, _ = CIIRawData.objects.update_or_create(
+        ship=file_data.ship,
+        year=file_data.year,
+        defaults={
+            'start_date': file_data.start_date,
+            'end_date': file_data.end_date,
+            'distance_sailed': file_data.total_distance,
+            'fuel_oil_burned': file_data.fuel_oil_burned,
+        }
+    )
+    return cii_raw_data
+
+
+@transaction.atomic
+def set_reporting_file_status(
+    file_uuid: str,
+    acceptance_status: str,
+    error_message: Optional[str] = None,
+) -> None:
+    StandardizedDataReportingFile.objects.filter(
+        uuid=file_uuid,
+    ).update(
+        acceptance_status=acceptance_status,
+        error_message=error_message,
+    )
+
+
+def get_duplicate_reporting_files(
+    ship_years: list[tuple[int, int]],
+) -> list[bool]:
+    """
+    Whether each (ship id, year) of a new batch of files is taken
+    * A ship has one file per year, an earlier file of the batch or an
+      existing file takes it
+    """
+    existing = set(StandardizedDataReportingFile.objects.filter(
+        ship_id__in={ship_id for ship_id, _ in ship_years},
+        year__in={year for _, year in ship_years},
+    ).values_list('ship_id', 'year'))
+    duplicates = []
+    for ship_year in ship_years:
+        duplicates.append(ship_year in existing)
+        existing.add(ship_year)
+    return duplicates
+
+
 def _process_fuel_types_for_pdf(
     consumption_dict: dict[str, float]
 ) -> dict[str, float]:
@@ -101,16 +262,6 @@ def _process_fuel_types_for_pdf(
 def _process_fuel_types_for_xlsx(
     consumption_dict: dict[str, float]
 ) -> dict[str, float]:
-    XLSX_DATA_REPORTING_FUEL_MAP = {
-        "Diesel/gas Oil (Cf:3.206)": CIIFuelType.MDGO,
-        "LPG (Butane) (Cf:3.030)": CIIFuelType.LPG_BUTANE,
-        "LPG (Propane) (Cf:3.000)": CIIFuelType.LPG_PROPANE,
-        "LNG (Cf:2.750)": CIIFuelType.LNG,
-        "LFO (Cf:3.151)": CIIFuelType.LSFO,
-        "HFO (Cf:3.114)": CIIFuelType.HFO,
-        "Methanol (Cf:1.375)": CIIFuelType.METHANOL,
-        "Ethanol (Cf:1.913)": CIIFuelType.ETHANOL,
-    }
     clean_dict = {}
     for key, value in consumption_dict.items():
         if value == 0:
@@ -0,0 +1,262 @@
+import logging
+from decimal import Decimal
+from typing import Iterable, Optional
+
+import numpy as np
+from django.db import transaction
+
+from carboncalc.constants import (
+    CONVERSION_FACTORS,
+    DD_VECTORS,
+    REDUCTION_FACTORS,
+    REFERENCE_LINE_CONSTANTS,
+)
+from carboncalc.enums import CIIGrade
+from carboncalc.logic.boundary_logic import (
+    compute_cii_boundaries,
+    get_boundary_spec,
+)
+from carboncalc.logic.cii_logic import (
+    calculate_co2_from_fuel_burn,
+    calculate_cii_for_ship,
+)
+from carboncalc.models import CalculatedCII, CIIRawData
+from carboncalc.utils import cii_utils
+from core.models import Ship
+from core.response_cache import bump_ship_version
+
+logger = logging.getLogger(__name__)
+
+# Grades in boundary order, a CII above n boundaries gets GRADES[n]
+GRADES = (CIIGrade.A, CIIGrade.B, CIIGrade.C, CIIGrade.D, CIIGrade.E)
+# CalculatedCII.value precision
+CII_VALUE_PLACES = Decimal('0.001')
+# Float error allowed when comparing an attained CII to a boundary, so a CII
+# on a boundary gets the same grade as in Decimal, see compute_cii_decimal
+GRADE_TOLERANCE = 1e-9
+
+# Fuel types in column order of the fuel burn matrix
+_FUELS = list(CONVERSION_FACTORS)
+_FUEL_COLUMNS = {fuel: column for column, fuel in enumerate(_FUELS)}
+_CONVERSION_FACTORS = np.array(
+    [float(CONVERSION_FACTORS[fuel]) for fuel in _FUELS])
+
+
+def get_fleet_raw_data(
+    year: Optional[int] = None,
+    company_id: Optional[int] = None,
+    ship_ids: Optional[Iterable[int]] = None,
+) -> list[CIIRawData]:
+    """
+    CIIRawData that can be graded, with ship specs and config joined in
+    Years without a reduction factor or distance sailed, and ships without
+    specs, CII config or a CII ship type, are left out
+    """
+    raw_data = CIIRawData.objects.filter(
+        year__in=list(REDUCTION_FACTORS),
+        # CASE: No distance gives an infinite CII, which CalculatedCII
+        # cannot store
+        distance_sailed__gt=0,
+        ship__shipspecs__isnull=False,
+        ship__ciiconfig__isnull=False,
+    ).select_related(
+        'ship__shipspecs',
+        'ship__ciiconfig',
+    ).order_by(
+        'ship_id', 'year',
+    )
+    if year is not None:
+        raw_data = raw_data.filter(year=year)
+    if company_id is not None:
+        raw_data = raw_data.filter(ship__company_id=company_id)
+    if ship_ids is not None:
+        raw_data = raw_data.filter(ship_id__in=ship_ids)
+    return [
+        cii_raw_data for cii_raw_data in raw_data
+        if cii_utils.get_cii_ship_type(cii_raw_data.ship) is not None]
+
+
+def compute_fleet_cii(
+    raw_data: list[CIIRawData],
+) -> tuple[np.ndarray, list[str]]:
+    """
+    Attained CII and grade of every CIIRawData row in one vectorized pass
+    * Rows are columns of float arrays: fuel burn, capacity, distance and
+      the ship type constants
+    Returns (attained CII per row, grade per row)
+    """
+    burn = get_fuel_burn_matrix(
+        [cii_raw_data.fuel_oil_burned for cii_raw_data in raw_data])
+    distance = np.array(
+        [cii_raw_data.distance_sailed for cii_raw_data in raw_data],
+        dtype=float)
+    capacity, reference_line, dd_vectors = get_ship_constants(
+        [cii_raw_data.ship for cii_raw_data in raw_data])
+    reduction_factors = np.array([
+        float(REDUCTION_FACTORS[cii_raw_data.year])
+        for cii_raw_data in raw_data])
+
+    co2 = burn @ _CONVERSION_FACTORS * 1000000
+    attained = co2 / (capacity * distance)
+    required = (1 - reduction_factors) * reference_line
+    # Rounded as CIIShipYearBoundaries stores them
+    boundaries = np.round(dd_vectors * required[:, np.newaxis], 3)
+    grade_indexes = (
+        attained[:, np.newaxis] - boundaries > GRADE_TOLERANCE).sum(axis=1)
+    return attained, [GRADES[index] for index in grade_indexes]
+
+
+def get_fuel_burn_matrix(fuel_burns: list[dict]) -> np.ndarray:
+    """Fuel burn dicts as rows of tonnes, in CONVERSION_FACTORS order"""
+    burn = np.zeros((len(fuel_burns), len(_FUELS)))
+    for row, fuel_burn_dict in enumerate(fuel_burns):
+        for fuel, fuel_burn in fuel_burn_dict.items():
+            burn[row, _FUEL_COLUMNS[fuel]] = float(fuel_burn)
+    return burn
+
+
+def get_ship_constants(
+    ships: list,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (capacity, reference line, dd vector) arrays, one row per ship
+    Ships need shipspecs and ciiconfig joined in, see get_boundary_spec
+    """
+    capacity = np.empty(len(ships))
+    ref_constants = np.empty((len(ships), 2))
+    dd_vectors = np.empty((len(ships), 4))
+    for row, ship in enumerate(ships):
+        cii_ship_type, ship_capacity = get_boundary_spec(ship)
+        capacity[row] = float(ship_capacity)
+        ref_constants[row] = [
+            float(val) for val in REFERENCE_LINE_CONSTANTS[cii_ship_type]]
+        dd_vectors[row] = [float(val) for val in DD_VECTORS[cii_ship_type]]
+    reference_line = ref_constants[:, 0] * capacity ** -ref_constants[:, 1]
+    return capacity, reference_line, dd_vectors
+
+
+def compute_cii_decimal(cii_raw_data: CIIRawData) -> tuple[Decimal, str]:
+    """Attained CII and grade of one row in Decimal, for cross-checks"""
+    ship = cii_raw_data.ship
+    cii_ship_type, capacity = get_boundary_spec(ship)
+    cii = calculate_cii_for_ship(
+        co2_emissions=calculate_co2_from_fuel_burn(
+            cii_raw_data.fuel_oil_burned),
+        tonnage=capacity,
+        distance_travelled=Decimal(cii_raw_data.distance_sailed))
+    boundaries = compute_cii_boundaries(
+        cii_ship_type, capacity)[cii_raw_data.year]
+    grade_index = sum(cii > boundary for boundary in boundaries.values())
+    return cii, GRADES[grade_index]
+
+
+@transaction.atomic
+def recalculate_fleet_cii(
+    year: Optional[int] = None,
+    company_id: Optional[int] = None,
+    ship_ids: Optional[Iterable[int]] = None,
+    cross_check: bool = False,
+) -> list[CalculatedCII]:
+    """
+    Recomputes CalculatedCII for a fleet and/or year from CIIRawData
+    * One query to load, one vectorized pass, one bulk upsert
+    * cross_check: also computes every row in Decimal, the way
+      process_cii_raw_data does, and keeps the Decimal result wherever the
+      two disagree, e.g. a CII on a rounding edge of a boundary
+    """
+    raw_data = get_fleet_raw_data(
+        year=year, company_id=company_id, ship_ids=ship_ids)
+    if not raw_data:
+        return []
+
+    attained, grades = compute_fleet_cii(raw_data)
+    calculated_ciis = []
+    for cii_raw_data, value, grade in zip(raw_data, attained, grades):
+        value = Decimal(str(value)).quantize(CII_VALUE_PLACES)
+        if cross_check:
+            decimal_value, decimal_grade = compute_cii_decimal(cii_raw_data)
+            decimal_value = decimal_value.quantize(CII_VALUE_PLACES)
+            if (decimal_value, decimal_grade) != (value, grade):
+                logger.warning(
+                    "CII cross-check mismatch for ship %s in %s: "
+                    "%s %s (float) vs %s %s (Decimal)",
+                    cii_raw_data.ship_id, cii_raw_data.year,
+                    value, grade, decimal_value, decimal_grade)
+                value, grade = decimal_value, decimal_grade
+        calculated_ciis.append(CalculatedCII(
+            ship_id=cii_raw_data.ship_id,
+            year=cii_raw_data.year,
+            value=value,
+            grade=grade,
+        ))
+
+    CalculatedCII.objects.bulk_create(
+        calculated_ciis,
+        update_conflicts=True,
+        unique_fields=['ship', 'year'],
+        update_fields=['value', 'grade', 'modified_at'],
+    )
+    for ship_id in {cii.ship_id for cii in calculated_ciis}:
+        bump_ship_version(ship_id)
+    return calculated_ciis
+
+
+def process_cii_scenarios(
+    ships: list[Ship],
+    years: list[int],
+    fuel_consumptions: list[dict],
+    distances: list[int],
+    budget_grade: str = CIIGrade.C,
+) -> dict:
+    """
+    Attained CII, grade and fuel budget of every ship, year and scenario
+    * Scenarios are every fuel consumption paired with every distance, in
+      fuel consumption major order
+    * The fuel budget is the most of each fuel the scenario's fuel mix can
+      burn over its distance while staying within budget_grade
+    * One vectorized pass over ship x year x scenario arrays, results are
+      nested lists indexed in the order of ships, years, scenarios and fuels
+    """
+    capacity, reference_line, dd_vectors = get_ship_constants(ships)
+    reduction_factors = np.array(
+        [float(REDUCTION_FACTORS[year]) for year in years])
+    burn = np.repeat(
+        get_fuel_burn_matrix(fuel_consumptions), len(distances), axis=0)
+    distance = np.tile(np.array(distances, dtype=float),
+                       len(fuel_consumptions))
+
+    co2 = burn @ _CONVERSION_FACTORS * 1000000
+    # ship x scenario, the reduction factor only moves the boundaries
+    attained = co2 / np.outer(capacity, distance)
+    # ship x year x grade
+    boundaries = np.round(
+        dd_vectors[:, np.newaxis, :] *
+        np.outer(reference_line, 1 - reduction_factors)[:, :, np.newaxis],
+        3)
+    # ship x year x scenario
+    grade_indexes = (
+        attained[:, np.newaxis, :, np.newaxis] -
+        boundaries[:, :, np.newaxis, :] > GRADE_TOLERANCE).sum(axis=3)
+    budget_boundary = boundaries[:, :, GRADES.index(budget_grade)]
+    emission_max = budget_boundary[:, :, np.newaxis] * \
+        np.outer(capacity, distance)[:, np.newaxis, :]
+
+    # Only fuels some scenario burns get a column
+    fuel_columns = np.flatnonzero(burn.any(axis=0))
+    # ship x year x scenario x fuel, a budget keeps the scenario's fuel mix
+    fuel_budgets = burn[np.newaxis, np.newaxis, :, fuel_columns] * \
+        (emission_max / co2)[:, :, :, np.newaxis]
+
+    return {
+        'ships': [ship.imo_reg for ship in ships],
+        'years': years,
+        'scenarios': [
+            {'fuel_consumption': fuel_consumption, 'distance': distance}
+            for fuel_consumption in fuel_consumptions
+            for distance in distances],
+        'fuels': [_FUELS[column] for column in fuel_columns],
+        'budget_grade': budget_grade,
+        'attained_cii': attained.round(3).tolist(),
+        'grades': np.array(GRADES)[grade_indexes].tolist(),
+        'fuel_budgets': fuel_budgets.round(3).tolist(),
+    }
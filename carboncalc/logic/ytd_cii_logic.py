@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Q
+
+from carboncalc.enums import CIIGrade
+from carboncalc.logic.boundary_logic import (
+    get_boundary_spec,
+    get_ship_year_boundaries,
+)
+from carboncalc.logic.cii_logic import (
+    calculate_cii_for_ship,
+    calculate_co2_from_fuel_burn,
+    determine_cii_grade_for_ship,
+)
+from carboncalc.models import CIIShipYearBoundaries, CIIYearToDate
+from carboncalc.utils.cii_utils import CII_FUEL_TYPE_MAP
+from core.models import Ship
+from vesselreporting.logic.rollup_logic import (
+    rebuild_report_rollups,
+    update_report_rollup,
+)
+from vesselreporting.models.report_models import ReportHeader
+
+# Grade whose boundary the remaining CO2 budget is measured against
+BUDGET_CII_GRADE = CIIGrade.C
+
+
+def get_cii_year(report_date: datetime) -> int:
+    return report_date.astimezone(timezone.utc).year
+
+
+@transaction.atomic(savepoint=False)
+def update_cii_year_to_date(
+    report_header: ReportHeader,
+    distance_time_data=None,
+    consumption_condition_data=None,
+) -> Optional[CIIYearToDate]:
+    """
+    Adds a newly created report to its ship's year to date CII inputs
+    * Constant work per report, the year's earlier reports are not read
+    * The row is locked so concurrent reports for the same ship add up
+    """
+    if distance_time_data is None and consumption_condition_data is None:
+        return None
+    return update_report_rollup(
+        CIIYearToDate,
+        _get_year_to_date_key(report_header),
+        _add_report_to_year_to_date,
+        report_header,
+        distance_time_data=distance_time_data,
+        consumption_condition_data=consumption_condition_data)
+
+
+def rebuild_cii_year_to_date(ship_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recomputes year to date CII inputs from the reports themselves
+    * ship_ids: limits the rebuild to these ships, otherwise all ships
+    Returns the number of rows written
+    """
+    # CASE: Reports without distance or consumption, e.g. bunker delivery
+    # notes, are not counted, as in update_cii_year_to_date
+    return rebuild_report_rollups(
+        CIIYearToDate,
+        ReportHeader.objects.filter(
+            Q(distancetimedata__isnull=False) |
+            Q(consumptionconditiondata__isnull=False)),
+        _get_year_to_date_key,
+        _add_report_to_year_to_date,
+        ship_ids=ship_ids)
+
+
+def get_cii_year_to_date(ship: Ship, year: int) -> CIIYearToDate:
+    """A ship's year to date CII inputs, empty if it has no reports yet"""
+    ytd = CIIYearToDate.objects.filter(ship=ship, year=year).first()
+    if ytd is None:
+        ytd = CIIYearToDate(ship=ship, year=year)
+    return ytd
+
+
+def get_cii_year_to_date_projection(ytd: CIIYearToDate) -> dict:
+    """
+    Live attained CII and grade from a ship's year to date inputs
+    * CII is a rate, so the attained CII so far is also the year end
+      projection if the ship keeps operating as it has
+    * Distance and CO2 are projected to year end pro rata from the last
+      report, remaining_co2_budget is what the ship can still emit in the
+      year and end at BUDGET_CII_GRADE
+    * Needs ship.shipspecs and ship.ciiconfig, grades and budgets are
+      None for years without CII boundaries
+    """
+    ship = ytd.ship
+    _, capacity = get_boundary_spec(ship)
+    co2_emissions = calculate_co2_from_fuel_burn(ytd.fuel_oil_burned)
+    projection = {
+        'year': ytd.year,
+        'report_count': ytd.report_count,
+        'last_report_date': ytd.last_report_date,
+        'hours': ytd.hours,
+        'distance_sailed': ytd.distance_sailed,
+        'fuel_oil_burned': ytd.fuel_oil_burned,
+        'co2_emissions': co2_emissions / Decimal(1000000),
+        'attained_cii': None,
+        'grade': None,
+        'projected_distance': None,
+        'projected_co2_emissions': None,
+        'remaining_co2_budget': None,
+    }
+    if not ytd.distance_sailed or ytd.last_report_date is None:
+        return projection
+
+    attained_cii = calculate_cii_for_ship(
+        co2_emissions=co2_emissions,
+        tonnage=capacity,
+        distance_travelled=ytd.distance_sailed)
+    projection['attained_cii'] = attained_cii
+
+    year_fraction = _get_year_fraction(ytd.year, ytd.last_report_date)
+    projected_distance = ytd.distance_sailed / year_fraction
+    projection['projected_distance'] = projected_distance
+    projection['projected_co2_emissions'] = \
+        co2_emissions / year_fraction / Decimal(1000000)
+
+    try:
+        projection['grade'] = determine_cii_grade_for_ship(
+            ship=ship, year=ytd.year, cii_value=attained_cii)
+        boundaries = get_ship_year_boundaries(ship=ship, year=ytd.year)
+    except CIIShipYearBoundaries.DoesNotExist:
+        return projection
+    co2_max = boundaries.get_boundary_for_grade(BUDGET_CII_GRADE) * \
+        capacity * projected_distance
+    projection['remaining_co2_budget'] = \
+        (co2_max - co2_emissions) / Decimal(1000000)
+    return projection
+
+
+def _get_year_fraction(year: int, last_report_date: datetime) -> Decimal:
+    start = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    elapsed = min(max(last_report_date - start, timedelta(0)), end - start)
+    # CASE: A report at midnight on 1 January has covered no time yet
+    fraction = Decimal(elapsed.total_seconds()) / \
+        Decimal((end - start).total_seconds())
+    return max(fraction, Decimal("0.0001"))
+
+
+def _get_year_to_date_key(report_header: ReportHeader) -> dict:
+    return {
+        'ship_id': report_header.ship_id,
+        'year': get_cii_year(report_header.report_date),
+    }
+
+
+def _add_report_to_year_to_date(
+    ytd: CIIYearToDate,
+    report_header: ReportHeader,
+    distance_time_data,
+    fuel_oil_data_set,
+) -> None:
+    ytd.report_count += 1
+    if ytd.last_report_date is None or \
+            report_header.report_date > ytd.last_report_date:
+        ytd.last_report_date = report_header.report_date
+
+    if distance_time_data is not None:
+        ytd.hours += distance_time_data.hours_since_last
+        ytd.distance_sailed += \
+            distance_time_data.distance_observed_since_last
+
+    for fuel_oil_data in fuel_oil_data_set:
+        fuel = CII_FUEL_TYPE_MAP[fuel_oil_data.fuel_oil_type]
+        ytd.fuel_oil_burned[fuel] = str(
+            Decimal(ytd.fuel_oil_burned.get(fuel, "0")) +
+            fuel_oil_data.total_consumption)
@@ -0,0 +1,75 @@
+# Generated by Django 4.1.1 on 2026-10-18 10:12
+
+from decimal import Decimal
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_ship_latest_leg"),
+        ("carboncalc", "0002_alter_energyefficiencytechnicalfile_energy_efficiency_index_type"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CIIYearToDate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("year", models.PositiveSmallIntegerField()),
+                ("report_count", models.PositiveIntegerField(default=0)),
+                ("last_report_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "hours",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=6
+                    ),
+                ),
+                (
+                    "distance_sailed",
+                    models.DecimalField(
+                        decimal_places=0, default=Decimal("0"), max_digits=8
+                    ),
+                ),
+                (
+                    "fuel_oil_burned",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "ship",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT, to="core.ship"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "cii_year_to_date",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ciiyeartodate",
+            constraint=models.UniqueConstraint(
+                fields=("ship", "year"), name="ciiyeartodate_ship_year"
+            ),
+        ),
+    ]
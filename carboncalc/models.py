@@ -123,6 +123,33 @@ class CIIRawData(BaseModel):
         ]
 
 
+class CIIYearToDate(BaseModel):
+    """
+    A ship's running CII inputs for the UTC calendar year so far
+    Kept up to date as reports are created, see ytd_cii_logic
+    """
+    ship = models.ForeignKey(Ship, on_delete=models.PROTECT)
+    year = models.PositiveSmallIntegerField()
+    report_count = models.PositiveIntegerField(default=0)
+    last_report_date = models.DateTimeField(null=True, blank=True)
+    hours = models.DecimalField(
+        max_digits=6, decimal_places=2, default=Decimal("0.00"))
+    distance_sailed = models.DecimalField(
+        max_digits=8, decimal_places=0, default=Decimal("0"))
+    # Same shape as CIIRawData: {CII fuel type: tonnes}
+    fuel_oil_burned = models.JSONField(
+        default=dict, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = "cii_year_to_date"
+        constraints = [
+            models.UniqueConstraint(
+                fields=('ship', 'year'),
+                name='ciiyeartodate_ship_year'
+            ),
+        ]
+
+
 class CIIShipYearBoundaries(BaseModel):
     ship = models.ForeignKey(Ship, on_delete=models.PROTECT)
     year = models.PositiveSmallIntegerField()
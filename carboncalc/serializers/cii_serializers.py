@@ -2,6 +2,7 @@ from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
 from rest_framework import serializers
 
+from carboncalc.constants import CONVERSION_FACTORS, REDUCTION_FACTORS
 from carboncalc.enums import CIIGrade
 from carboncalc.models import (
     CalculatedCII,
@@ -128,3 +129,86 @@ class CIICalculatorOutputSerializer(serializers.Serializer):
         max_digits=None, decimal_places=2,
         coerce_to_string=True, required=False)
     minimum_fuel_projection = serializers.JSONField(required=False)
+
+
+class CIIScenarioInputSerializer(serializers.Serializer):
+    """
+    Ships, years and a grid of fuel consumption x distance scenarios
+    * fuel_consumptions: list of {fuel type: tonnes}
+    """
+    MAX_SHIPS = 200
+    MAX_SCENARIOS = 1000
+    MAX_RESULTS = 200000
+
+    ships = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False,
+        max_length=MAX_SHIPS)
+    start_year = serializers.IntegerField()
+    end_year = serializers.IntegerField()
+    fuel_consumptions = serializers.ListField(
+        child=serializers.DictField(
+            child=serializers.DecimalField(
+                max_digits=12, decimal_places=3, min_value=0)),
+        allow_empty=False)
+    distances = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False)
+    budget_grade = serializers.ChoiceField(
+        choices=[CIIGrade.A, CIIGrade.B, CIIGrade.C, CIIGrade.D],
+        default=CIIGrade.C)
+
+    def validate_fuel_consumptions(self, value):
+        for fuel_consumption in value:
+            unknown_fuels = set(fuel_consumption) - set(CONVERSION_FACTORS)
+            if unknown_fuels:
+                raise serializers.ValidationError(
+                    "Unknown fuel types: {}".format(
+                        ", ".join(sorted(unknown_fuels))))
+            if not any(fuel_consumption.values()):
+                raise serializers.ValidationError(
+                    "Every scenario must burn some fuel.")
+        return value
+
+    def validate(self, data):
+        years = range(data['start_year'], data['end_year'] + 1)
+        if not years:
+            raise serializers.ValidationError(
+                "end_year must not be before start_year.")
+        if any(year not in REDUCTION_FACTORS for year in years):
+            raise serializers.ValidationError(
+                "CII reduction factors are only defined for {}-{}.".format(
+                    min(REDUCTION_FACTORS), max(REDUCTION_FACTORS)))
+        scenario_count = \
+            len(data['fuel_consumptions']) * len(data['distances'])
+        if scenario_count > self.MAX_SCENARIOS:
+            raise serializers.ValidationError(
+                "At most {} scenarios per request.".format(
+                    self.MAX_SCENARIOS))
+        if len(data['ships']) * len(years) * scenario_count > \
+                self.MAX_RESULTS:
+            raise serializers.ValidationError(
+                "At most {} ship, year and scenario combinations per "
+                "request.".format(self.MAX_RESULTS))
+        data['years'] = list(years)
+        return data
+
+
+class CIIYearToDateSerializer(serializers.Serializer):
+    year = serializers.IntegerField()
+    report_count = serializers.IntegerField()
+    last_report_date = serializers.DateTimeField(allow_null=True)
+    hours = serializers.DecimalField(max_digits=None, decimal_places=2)
+    distance_sailed = serializers.DecimalField(
+        max_digits=None, decimal_places=0)
+    fuel_oil_burned = serializers.JSONField()
+    co2_emissions = serializers.DecimalField(
+        max_digits=None, decimal_places=2)
+    attained_cii = serializers.DecimalField(
+        max_digits=None, decimal_places=3, allow_null=True)
+    grade = serializers.ChoiceField(
+        choices=CIIGrade.choices, allow_null=True)
+    projected_distance = serializers.DecimalField(
+        max_digits=None, decimal_places=0, allow_null=True)
+    projected_co2_emissions = serializers.DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True)
+    remaining_co2_budget = serializers.DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True)
@@ -1,49 +1,139 @@
-from celery import shared_task
+from typing import Iterable, Optional
+
+import requests
+from celery import Task, chain, group, shared_task
+from celery.exceptions import SoftTimeLimitExceeded
+from django.core.cache import cache
 
 from carboncalc.enums import FileAcceptanceStatus
-from carboncalc.logic.cii_logic import (
-    populate_boundaries_for_ship,
-    process_cii_raw_data,
-)
+from carboncalc.logic.boundary_logic import populate_boundaries_for_ship
+from carboncalc.logic.cii_logic import process_cii_raw_data
 from carboncalc.logic.file_processing_logic import (
-    process_standardized_data_reporting_file,
+    generate_cii_raw_data_from_reporting_file_data,
+    get_or_extract_reporting_file_data,
+    set_reporting_file_status,
 )
+from carboncalc.logic.fleet_cii_logic import recalculate_fleet_cii
 from carboncalc.models import (
     CIIRawData,
-    StandardizedDataReportingData,
     StandardizedDataReportingFile,
 )
-from core.models import Ship
+from core.models import Company, Ship
 
+# Idempotency key, held while a file's pipeline is queued or running
+REPORTING_FILE_LOCK_KEY = 'carboncalc:reporting_file:{}'
+# Safety net only, the key is released when the pipeline ends
+REPORTING_FILE_LOCK_TIMEOUT = 60 * 60
+# Lambda calls are retried on network errors and timeouts, backing off
+# exponentially up to 10 minutes between attempts
+LAMBDA_RETRY_OPTIONS = {
+    'autoretry_for': (requests.RequestException, SoftTimeLimitExceeded),
+    'retry_backoff': True,
+    'retry_backoff_max': 10 * 60,
+    'retry_jitter': True,
+    'max_retries': 5,
+}
 
-@shared_task()
-def process_standardized_data_reporting_file_task(
+
+class ReportingFileTask(Task):
+    """
+    Stage of a StandardizedDataReportingFile pipeline, called with a
+    file_uuid kwarg. A stage failing for good marks the file as errored
+    and ends the pipeline
+    """
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        file_uuid = kwargs['file_uuid']
+        set_reporting_file_status(
+            file_uuid,
+            FileAcceptanceStatus.ERROR,
+            error_message='{}: {}'.format(type(exc).__name__, exc))
+        cache.delete(REPORTING_FILE_LOCK_KEY.format(file_uuid))
+
+
+@shared_task(
+    base=ReportingFileTask,
+    soft_time_limit=3 * 60,
+    time_limit=4 * 60,
+    **LAMBDA_RETRY_OPTIONS,
+)
+def extract_reporting_file_data_task(
+    file_uuid: str,
+):
+    file = StandardizedDataReportingFile.objects.select_related(
+        'ship').get(uuid=file_uuid)
+    get_or_extract_reporting_file_data(file)
+
+
+@shared_task(base=ReportingFileTask, soft_time_limit=60, time_limit=90)
+def generate_cii_raw_data_from_reporting_file_task(
+    file_uuid: str,
+):
+    file = StandardizedDataReportingFile.objects.select_related(
+        'ship').get(uuid=file_uuid)
+    file_data = get_or_extract_reporting_file_data(file)
+    generate_cii_raw_data_from_reporting_file_data(file_data)
+
+
+@shared_task(base=ReportingFileTask, soft_time_limit=60, time_limit=90)
+def calculate_cii_from_reporting_file_task(
     file_uuid: str,
 ):
     file = StandardizedDataReportingFile.objects.get(uuid=file_uuid)
-    file_data = process_standardized_data_reporting_file(file)
-    file.acceptance_status = FileAcceptanceStatus.ACCEPTED
-    file.save()
-    generate_cii_raw_data_from_reporting_file_data.delay(
-        file_data_uuid=file_data.uuid)
+    raw_cii = CIIRawData.objects.select_related(
+        'ship__shipspecs',
+        'ship__ciiconfig',
+    ).get(ship_id=file.ship_id, year=file.year)
+    # CASE: CII is graded once the ship is configured, see CIIConfigView
+    if not hasattr(raw_cii.ship, 'ciiconfig'):
+        return
+    process_cii_raw_data(raw_cii)
 
 
-@shared_task()
-def generate_cii_raw_data_from_reporting_file_data(
-    file_data_uuid: str,
-):
-    file_data = StandardizedDataReportingData.objects.get(uuid=file_data_uuid)
-    cii_raw_data, _ = CIIRawData.objects.update_or_create(
-        ship=file_data.ship,
-        year=file_data.year,
-        defaults={
-            'start_date': file_data.start_date,
-            'end_date': file_data.end_date,
-            'distance_sailed': file_data.total_distance,
-            'fuel_oil_burned': file_data.fuel_oil_burned,
-        }
+@shared_task(base=ReportingFileTask, soft_time_limit=30, time_limit=60)
+def accept_reporting_file_task(
+    file_uuid: str,
+):
+    set_reporting_file_status(file_uuid, FileAcceptanceStatus.ACCEPTED)
+    cache.delete(REPORTING_FILE_LOCK_KEY.format(file_uuid))
+
+
+def get_reporting_file_pipeline(file_uuid: str):
+    """Stages processing one file, each safe to rerun for the same file"""
+    return chain(
+        extract_reporting_file_data_task.si(file_uuid=file_uuid),
+        generate_cii_raw_data_from_reporting_file_task.si(
+            file_uuid=file_uuid),
+        calculate_cii_from_reporting_file_task.si(file_uuid=file_uuid),
+        accept_reporting_file_task.si(file_uuid=file_uuid),
     )
-    calculate_cii_from_raw_data_task.delay(raw_cii_data_uuid=cii_raw_data.uuid)
+
+
+def start_reporting_file_pipelines(file_uuids: Iterable[str]) -> list[str]:
+    """
+    Processes files in parallel, one pipeline per file
+    * Files with a pipeline already queued or running are skipped
+    Returns the uuids of files a pipeline was started for
+    """
+    started = []
+    for file_uuid in map(str, file_uuids):
+        if cache.add(REPORTING_FILE_LOCK_KEY.format(file_uuid), 1,
+                     timeout=REPORTING_FILE_LOCK_TIMEOUT):
+            set_reporting_file_status(
+                file_uuid, FileAcceptanceStatus.PROCESSING)
+            started.append(file_uuid)
+    if started:
+        group(
+            get_reporting_file_pipeline(file_uuid) for file_uuid in started
+        ).apply_async()
+    return started
+
+
+@shared_task()
+def process_standardized_data_reporting_file_task(
+    file_uuid: str,
+):
+    start_reporting_file_pipelines([file_uuid])
 
 
 @shared_task
@@ -61,3 +151,17 @@ def populate_cii_boundaries_for_ship_task(
 ):
     ship = Ship.objects.get(imo_reg=ship_imo)
     populate_boundaries_for_ship(ship)
+
+
+@shared_task()
+def recalculate_fleet_cii_task(
+    year: Optional[int] = None,
+    company_uuid: Optional[str] = None,
+    cross_check: bool = False,
+):
+    company_id = None
+    if company_uuid is not None:
+        company_id = Company.objects.get(uuid=company_uuid).pk
+    calculated_ciis = recalculate_fleet_cii(
+        year=year, company_id=company_id, cross_check=cross_check)
+    return len(calculated_ciis)
@@ -1,3 +1,695 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+import requests
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from carboncalc.constants import CONVERSION_FACTORS
+from carboncalc.enums import (
+    ApplicableCII,
+    CIIFuelType,
+    CIIGrade,
+    DCSMethod,
+    EnergyEfficiencyIndexType,
+    FileAcceptanceStatus,
+)
+from carboncalc import tasks
+from carboncalc.logic import (
+    cii_logic,
+    file_processing_logic,
+    fleet_cii_logic,
+    ytd_cii_logic,
+)
+from carboncalc.logic.boundary_logic import (
+    BOUNDARY_FIELDS,
+    compute_cii_boundaries,
+    get_boundary_spec,
+)
+from carboncalc.models import (
+    CalculatedCII,
+    CIIConfig,
+    CIIRawData,
+    CIIShipYearBoundaries,
+    CIIYearToDate,
+    StandardizedDataReportingFile,
+)
+from core.enums import CargoUnits, FuelType, ShipType
+from core.models import Company, Ship, ShipSpecs, User
+from utils.excel_utils import parse_with_backends
+from vesselreporting.enums import ReportType
+from vesselreporting.logic.rollup_logic import fold_reports
+from vesselreporting.models.report_models import (
+    DistanceTimeData,
+    FuelOilData,
+    ReportHeader,
+)
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+def create_unsaved_ship(
+    imo_reg: int = 9000001,
+    ship_type: str = ShipType.BULK_CARRIER,
+    deadweight_tonnage: str = '30000',
+    gross_tonnage: str = '20000',
+    applicable_cii: str = ApplicableCII.AER,
+) -> Ship:
+    """A ship with specs and CII config, as get_fleet_raw_data joins them"""
+    ship = Ship(id=imo_reg, imo_reg=imo_reg, ship_type=ship_type)
+    ship.shipspecs = ShipSpecs(
+        deadweight_tonnage=Decimal(deadweight_tonnage),
+        gross_tonnage=Decimal(gross_tonnage))
+    ship.ciiconfig = CIIConfig(applicable_cii=applicable_cii)
+    return ship
+
+
+def create_unsaved_boundaries(ship: Ship, year: int) -> CIIShipYearBoundaries:
+    return CIIShipYearBoundaries(ship=ship, year=year, **{
+        BOUNDARY_FIELDS[grade]: boundary for grade, boundary
+        in compute_cii_boundaries(*get_boundary_spec(ship))[year].items()})
+
+
+class FleetCIITest(SimpleTestCase):
+    def setUp(self):
+        self.ship = create_unsaved_ship()
+        self.boundaries = compute_cii_boundaries(
+            *get_boundary_spec(self.ship))
+
+    def create_raw_data(
+        self,
+        fuel_oil_burned: dict,
+        distance_sailed: int = 100,
+        year: int = 2023,
+        ship: Ship = None,
+    ) -> CIIRawData:
+        ship = ship or self.ship
+        return CIIRawData(
+            ship=ship, year=year, distance_sailed=distance_sailed,
+            fuel_oil_burned=fuel_oil_burned)
+
+    def assert_matches_decimal(self, raw_data: list[CIIRawData]) -> None:
+        attained, grades = fleet_cii_logic.compute_fleet_cii(raw_data)
+        for cii_raw_data, value, grade in zip(raw_data, attained, grades):
+            decimal_value, decimal_grade = \
+                fleet_cii_logic.compute_cii_decimal(cii_raw_data)
+            self.assertEqual(
+                Decimal(str(value)).quantize(
+                    fleet_cii_logic.CII_VALUE_PLACES),
+                decimal_value.quantize(fleet_cii_logic.CII_VALUE_PLACES))
+            self.assertEqual(grade, decimal_grade)
+
+    def test_matches_decimal_calculation(self):
+        tanker = create_unsaved_ship(
+            imo_reg=9000002, ship_type=ShipType.OIL_TANKER,
+            deadweight_tonnage='115000')
+        cruise_ship = create_unsaved_ship(
+            imo_reg=9000003, ship_type=ShipType.CRUISE_PASSENGER_SHIP,
+            gross_tonnage='90000', applicable_cii=ApplicableCII.CGDIST)
+        self.assert_matches_decimal([
+            self.create_raw_data(
+                {CIIFuelType.HFO: '5321.5', CIIFuelType.MDGO: '412.25'},
+                distance_sailed=61234, year=2019),
+            self.create_raw_data(
+                {CIIFuelType.LSFO: '6012.125'}, distance_sailed=58000,
+                year=2026),
+            self.create_raw_data(
+                {CIIFuelType.HFO: '9100', CIIFuelType.LNG: '1200.5'},
+                distance_sailed=72010, ship=tanker),
+            self.create_raw_data(
+                {CIIFuelType.MDGO: '20500.75'}, distance_sailed=45100,
+                year=2024, ship=cruise_ship),
+        ])
+
+    def test_cii_on_boundary_gets_lower_grade(self):
+        # CASE: 30000 DWT over 100 nm, so LPG burned in tonnes times its
+        # conversion factor of 3 is exactly the CII
+        self.assertEqual(CONVERSION_FACTORS[CIIFuelType.LPG_PROPANE],
+                         '3.000')
+        expected_grades = [CIIGrade.A, CIIGrade.B, CIIGrade.C, CIIGrade.D]
+        raw_data = [
+            self.create_raw_data({CIIFuelType.LPG_PROPANE: str(boundary)})
+            for boundary in self.boundaries[2023].values()]
+
+        attained, grades = fleet_cii_logic.compute_fleet_cii(raw_data)
+        np.testing.assert_allclose(
+            attained, [float(boundary)
+                       for boundary in self.boundaries[2023].values()])
+        self.assertEqual(grades, expected_grades)
+        self.assert_matches_decimal(raw_data)
+
+        # CASE: Just over a boundary gets the next grade
+        boundary_a = self.boundaries[2023][CIIGrade.A]
+        attained, grades = fleet_cii_logic.compute_fleet_cii([
+            self.create_raw_data({
+                CIIFuelType.LPG_PROPANE: str(boundary_a + Decimal('0.001'))
+            })])
+        self.assertEqual(grades, [CIIGrade.B])
+
+    def test_cross_check_keeps_decimal_result(self):
+        cii_raw_data = self.create_raw_data(
+            {CIIFuelType.HFO: '4000'}, distance_sailed=61234)
+        decimal_value, decimal_grade = \
+            fleet_cii_logic.compute_cii_decimal(cii_raw_data)
+        self.assertNotEqual(decimal_grade, CIIGrade.E)
+        # Without transaction.atomic, the database is mocked out
+        recalculate_fleet_cii = \
+            fleet_cii_logic.recalculate_fleet_cii.__wrapped__
+
+        with mock.patch.object(
+                fleet_cii_logic, 'get_fleet_raw_data',
+                return_value=[cii_raw_data]), \
+                mock.patch.object(
+                    fleet_cii_logic, 'compute_fleet_cii',
+                    return_value=(np.array([99.0]), [CIIGrade.E])), \
+                mock.patch.object(
+                    fleet_cii_logic.CalculatedCII.objects,
+                    'bulk_create') as bulk_create, \
+                mock.patch.object(
+                    fleet_cii_logic, 'bump_ship_version') as bump, \
+                self.assertLogs(fleet_cii_logic.logger, 'WARNING'):
+            calculated_ciis = recalculate_fleet_cii(
+                year=2023, cross_check=True)
+
+        self.assertEqual(len(calculated_ciis), 1)
+        self.assertEqual(
+            calculated_ciis[0].value,
+            decimal_value.quantize(fleet_cii_logic.CII_VALUE_PLACES))
+        self.assertEqual(calculated_ciis[0].grade, decimal_grade)
+        bulk_create.assert_called_once()
+        bump.assert_called_once_with(self.ship.id)
+
+
+class FleetRawDataTest(TestCase):
+    def setUp(self):
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = Ship.objects.create(
+            name="Ship 9000001",
+            imo_reg=9000001,
+            company=company,
+            ship_type=ShipType.BULK_CARRIER,
+        )
+        ShipSpecs.objects.create(
+            ship=self.ship,
+            flag="SG",
+            call_sign="9V0000",
+            mmsi=563000000,
+            delivery_date=date(2015, 1, 1),
+            class_society="DNV",
+            gross_tonnage=20000,
+            deadweight_tonnage=30000,
+            net_tonnage=12000,
+            cargo_unit=CargoUnits.MT,
+            cargo_capacity=28000,
+            propeller_pitch=1,
+        )
+        CIIConfig.objects.create(
+            ship=self.ship,
+            energy_efficiency_index_type=EnergyEfficiencyIndexType.EEXI,
+            energy_efficiency_index_value=Decimal("4.500"),
+            is_engine_power_limited=False,
+            imo_dcs_method=DCSMethod.METHOD_1,
+            applicable_cii=ApplicableCII.AER,
+        )
+
+    def test_rows_without_distance_are_left_out(self):
+        for year, distance_sailed in ((2023, 0), (2024, 61234)):
+            CIIRawData.objects.create(
+                ship=self.ship,
+                year=year,
+                start_date=date(year, 1, 1),
+                end_date=date(year, 12, 31),
+                distance_sailed=distance_sailed,
+                fuel_oil_burned={CIIFuelType.HFO: "4000"},
+            )
+
+        calculated_ciis = fleet_cii_logic.recalculate_fleet_cii(
+            ship_ids=[self.ship.pk])
+        self.assertEqual([cii.year for cii in calculated_ciis], [2024])
+        self.assertFalse(CalculatedCII.objects.filter(
+            ship=self.ship, year=2023).exists())
+
+
+class CIIScenarioTest(SimpleTestCase):
+    def setUp(self):
+        self.ships = [
+            create_unsaved_ship(),
+            create_unsaved_ship(
+                imo_reg=9000002, ship_type=ShipType.OIL_TANKER,
+                deadweight_tonnage='115000'),
+        ]
+        self.fuel_consumptions = [
+            {CIIFuelType.HFO: Decimal('4000'),
+             CIIFuelType.MDGO: Decimal('350.5')},
+            {CIIFuelType.LNG: Decimal('2500')},
+        ]
+        self.distances = [48000, 61234, 75000]
+
+    def get_calculator_result(
+        self,
+        ship: Ship,
+        fuel_consumption: dict,
+        distance: int,
+    ) -> dict:
+        """process_cii_calculator, with its 2023 boundaries computed"""
+        boundaries = create_unsaved_boundaries(ship, 2023)
+        with mock.patch.object(
+                cii_logic, 'get_cii_boundaries_for_ship_year',
+                return_value=boundaries), \
+                mock.patch.object(
+                    cii_logic, 'get_ship_year_boundaries',
+                    return_value=boundaries):
+            return cii_logic.process_cii_calculator(
+                ship=ship, distance=Decimal(distance),
+                fuel_burn_dict={
+                    fuel: str(consumption)
+                    for fuel, consumption in fuel_consumption.items()},
+                target_cii_grade=CIIGrade.C)
+
+    def test_result_shape(self):
+        years = [2023, 2024, 2025, 2026]
+        result = fleet_cii_logic.process_cii_scenarios(
+            self.ships, years, self.fuel_consumptions, self.distances)
+
+        scenario_count = len(self.fuel_consumptions) * len(self.distances)
+        self.assertEqual(result['ships'], [9000001, 9000002])
+        self.assertEqual(result['years'], years)
+        self.assertEqual(len(result['scenarios']), scenario_count)
+        # CASE: Fuel consumption major order
+        self.assertEqual(result['scenarios'][1], {
+            'fuel_consumption': self.fuel_consumptions[0],
+            'distance': self.distances[1]})
+        self.assertEqual(
+            result['fuels'],
+            [fuel for fuel in CONVERSION_FACTORS
+             if fuel in (CIIFuelType.HFO, CIIFuelType.MDGO,
+                         CIIFuelType.LNG)])
+        self.assertEqual(result['budget_grade'], CIIGrade.C)
+        self.assertEqual(
+            np.shape(result['attained_cii']),
+            (len(self.ships), scenario_count))
+        self.assertEqual(
+            np.shape(result['grades']),
+            (len(self.ships), len(years), scenario_count))
+        self.assertEqual(
+            np.shape(result['fuel_budgets']),
+            (len(self.ships), len(years), scenario_count,
+             len(result['fuels'])))
+
+    def test_matches_cii_calculator(self):
+        result = fleet_cii_logic.process_cii_scenarios(
+            self.ships, [2023], self.fuel_consumptions, self.distances)
+
+        scenarios = [
+            (fuel_consumption, distance)
+            for fuel_consumption in self.fuel_consumptions
+            for distance in self.distances]
+        for ship_index, ship in enumerate(self.ships):
+            for scenario_index, (fuel_consumption, distance) in \
+                    enumerate(scenarios):
+                calculator_result = self.get_calculator_result(
+                    ship, fuel_consumption, distance)
+                self.assertAlmostEqual(
+                    result['attained_cii'][ship_index][scenario_index],
+                    float(calculator_result['estimated_cii_value']),
+                    places=3)
+                self.assertEqual(
+                    result['grades'][ship_index][0][scenario_index],
+                    calculator_result['estimated_cii_grade'])
+                fuel_budgets = dict(zip(
+                    result['fuels'],
+                    result['fuel_budgets'][ship_index][0][scenario_index]))
+                for fuel, projected_fuel in \
+                        calculator_result['minimum_fuel_projection'].items():
+                    self.assertAlmostEqual(
+                        fuel_budgets[fuel], float(projected_fuel), places=3)
+
+
+class CIIYearToDateTest(SimpleTestCase):
+    def setUp(self):
+        self.ship = create_unsaved_ship()
+
+    def create_report(
+        self,
+        report_date: str,
+        hours: str = "12.00",
+        distance: str = "150",
+    ) -> ReportHeader:
+        report_header = ReportHeader(
+            ship=self.ship, report_type=ReportType.NOON,
+            report_date=parse_datetime(report_date))
+        report_header.distancetimedata = DistanceTimeData(
+            hours_since_last=Decimal(hours),
+            distance_observed_since_last=Decimal(distance))
+        return report_header
+
+    def test_reports_are_folded_by_utc_year(self):
+        reports = [
+            self.create_report("2023-12-31T23:30:00+00:00"),
+            # CASE: Local new year, still 2023 in UTC
+            self.create_report("2024-01-01T00:30:00+02:00", distance="100"),
+            self.create_report("2024-01-01T00:30:00+00:00", hours="6.00"),
+        ]
+        year_to_dates = fold_reports(
+            reports, CIIYearToDate, ytd_cii_logic._get_year_to_date_key,
+            ytd_cii_logic._add_report_to_year_to_date)
+
+        self.assertEqual(list(year_to_dates), [
+            (self.ship.id, 2023), (self.ship.id, 2024)])
+        ytd_2023 = year_to_dates[(self.ship.id, 2023)]
+        self.assertEqual(ytd_2023.report_count, 2)
+        self.assertEqual(ytd_2023.hours, Decimal("24.00"))
+        self.assertEqual(ytd_2023.distance_sailed, Decimal("250"))
+        self.assertEqual(ytd_2023.last_report_date,
+                         parse_datetime("2023-12-31T23:30:00+00:00"))
+        ytd_2024 = year_to_dates[(self.ship.id, 2024)]
+        self.assertEqual(ytd_2024.report_count, 1)
+        self.assertEqual(ytd_2024.hours, Decimal("6.00"))
+
+    def test_mdo_and_mgo_are_added_as_mdgo(self):
+        ytd = CIIYearToDate(ship=self.ship, year=2023)
+        ytd_cii_logic._add_report_to_year_to_date(
+            ytd, self.create_report("2023-03-01T12:00:00+00:00"), None, [
+                FuelOilData(fuel_oil_type=FuelType.MDO,
+                            total_consumption=Decimal("1.50")),
+                FuelOilData(fuel_oil_type=FuelType.MGO,
+                            total_consumption=Decimal("0.25")),
+                FuelOilData(fuel_oil_type=FuelType.HFO,
+                            total_consumption=Decimal("10.00")),
+            ])
+
+        self.assertEqual(ytd.report_count, 1)
+        self.assertEqual(ytd.distance_sailed, Decimal("0"))
+        self.assertEqual(ytd.fuel_oil_burned, {
+            CIIFuelType.MDGO: "1.75", CIIFuelType.HFO: "10.00"})
+
+    def test_projection(self):
+        ytd = CIIYearToDate(
+            ship=self.ship, year=2023, report_count=10,
+            # CASE: Half of 2023 has passed
+            last_report_date=parse_datetime("2023-07-02T12:00:00+00:00"),
+            hours=Decimal("80.00"), distance_sailed=Decimal("1000"),
+            fuel_oil_burned={CIIFuelType.MDGO: "10.00"})
+        boundaries = create_unsaved_boundaries(self.ship, 2023)
+        with mock.patch.object(
+                ytd_cii_logic, 'get_ship_year_boundaries',
+                return_value=boundaries), \
+                mock.patch.object(
+                    cii_logic, 'get_ship_year_boundaries',
+                    return_value=boundaries):
+            projection = ytd_cii_logic.get_cii_year_to_date_projection(ytd)
+
+        co2_emissions = Decimal("3.206") * Decimal("10.00")
+        self.assertEqual(projection['co2_emissions'], co2_emissions)
+        self.assertEqual(
+            projection['attained_cii'],
+            co2_emissions * 1000000 / (Decimal("30000") * 1000))
+        self.assertEqual(projection['grade'], CIIGrade.A)
+        self.assertEqual(projection['projected_distance'], 2000)
+        self.assertEqual(
+            projection['projected_co2_emissions'], co2_emissions * 2)
+        self.assertEqual(
+            projection['remaining_co2_budget'],
+            boundaries.boundary_c * 30000 * 2000 / 1000000 - co2_emissions)
+
+    def test_projection_without_distance(self):
+        ytd = CIIYearToDate(
+            ship=self.ship, year=2023, report_count=1,
+            last_report_date=parse_datetime("2023-07-02T12:00:00+00:00"),
+            fuel_oil_burned={CIIFuelType.HFO: "2.00"})
+        with mock.patch.object(
+                ytd_cii_logic, 'get_ship_year_boundaries') as boundaries:
+            projection = ytd_cii_logic.get_cii_year_to_date_projection(ytd)
+
+        self.assertEqual(projection['co2_emissions'],
+                         Decimal("3.114") * Decimal("2.00"))
+        for field in ('attained_cii', 'grade', 'projected_distance',
+                      'projected_co2_emissions', 'remaining_co2_budget'):
+            self.assertIsNone(projection[field])
+        boundaries.assert_not_called()
+
+
+class SDRXlsxTest(SimpleTestCase):
+    """read_sdr_xlsx_data against workbooks laid out like the template"""
+
+    def setUp(self):
+        self.rows = [
+            ["Standardized data reporting format"],
+            [None, "Ship name", "MV Marina"],
+            [None, "IMO number", 9000001],
+            [None, "Start date (yyyy-mm-dd)", "2023-01-01"],
+            [None, "End date (yyyy-mm-dd)", "2023-12-31"],
+            [None, "Gross tonnage", 20000],
+            [None, "DWT", 30000],
+            [None, "Hours underway (h)", 5120.5],
+            [None, "Distance Travelled (n.m)", 61234],
+            [None, "Fuel oil consumption (ton)"],
+            [None, "Diesel/gas Oil (Cf:3.206)", 412.25],
+            [None, "HFO (Cf:3.114)", 5321.5],
+            [None, "LNG (Cf:2.750)"],
+        ]
+        patcher = mock.patch('utils.excel_utils.default_storage')
+        self.storage = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage.open.side_effect = lambda path, mode: open(path, mode)
+
+    def read(self, parse=file_processing_logic.read_sdr_xlsx_data) -> dict:
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as xlsx_file:
+            workbook = openpyxl.Workbook()
+            for row in self.rows:
+                workbook.active.append(row)
+            workbook.save(xlsx_file.name)
+            return parse(
+                StandardizedDataReportingFile(s3_file_path=xlsx_file.name))
+
+    def remove_row(self, label: str) -> None:
+        self.rows = [row for row in self.rows if label not in row]
+
+    def test_template(self):
+        data = self.read()
+
+        self.assertEqual(data["Start date (yyyy-mm-dd)"], "2023-01-01")
+        self.assertEqual(data["DWT"], 30000)
+        self.assertEqual(data["Distance Travelled (n.m)"], 61234)
+        fuel_oil_burned = data["Fuel oil consumption (ton)"]
+        self.assertEqual(fuel_oil_burned["Diesel/gas Oil (Cf:3.206)"], 412.25)
+        self.assertEqual(fuel_oil_burned["HFO (Cf:3.114)"], 5321.5)
+        # CASE: Fuels left blank or out of the file burned nothing
+        self.assertEqual(fuel_oil_burned["LNG (Cf:2.750)"], 0)
+        self.assertEqual(fuel_oil_burned["Methanol (Cf:1.375)"], 0)
+        self.assertEqual(
+            list(fuel_oil_burned),
+            list(file_processing_logic.XLSX_DATA_REPORTING_FUEL_MAP))
+
+    def test_missing_value(self):
+        self.remove_row("DWT")
+        with self.assertRaisesMessage(ValueError, "DWT"):
+            self.read()
+
+    def test_missing_fuel_section(self):
+        self.remove_row("Fuel oil consumption (ton)")
+        with self.assertRaisesMessage(
+                ValueError, "Fuel oil consumption (ton)"):
+            self.read()
+
+    def test_missing_fuel_labels(self):
+        for label in file_processing_logic.XLSX_DATA_REPORTING_FUEL_MAP:
+            self.remove_row(label)
+        with self.assertRaisesMessage(
+                ValueError, "Fuel oil consumption (ton)"):
+            self.read()
+
+    def test_missing_fuel_section_falls_back_to_lambda(self):
+        self.remove_row("Fuel oil consumption (ton)")
+        backends = file_processing_logic.SDR_XLSX_PARSER_BACKENDS
+        fetch = mock.Mock(return_value={"DWT": 30000})
+        with override_settings(EXCEL_PARSER_BACKENDS=['local', 'lambda']), \
+                mock.patch.dict(backends, {'lambda': fetch}), \
+                self.assertLogs('utils.excel_utils', 'WARNING'):
+            data = self.read(
+                lambda data_report: parse_with_backends(backends, data_report))
+        self.assertEqual(data, {"DWT": 30000})
+        fetch.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReportingFilePipelineTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.set_status = mock.Mock()
+        self.group = mock.Mock()
+        patchers = [
+            mock.patch.object(
+                tasks, 'set_reporting_file_status', self.set_status),
+            mock.patch.object(tasks, 'group', self.group),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get_started_pipelines(self) -> list:
+        (pipelines,), _ = self.group.call_args
+        return list(pipelines)
+
+    def test_pipeline_per_file(self):
+        started = tasks.start_reporting_file_pipelines(['file-1', 'file-2'])
+
+        self.assertEqual(started, ['file-1', 'file-2'])
+        self.assertEqual(len(self._get_started_pipelines()), 2)
+        self.group.return_value.apply_async.assert_called_once()
+        self.set_status.assert_has_calls([
+            mock.call('file-1', FileAcceptanceStatus.PROCESSING),
+            mock.call('file-2', FileAcceptanceStatus.PROCESSING),
+        ])
+
+    def test_file_with_running_pipeline_is_skipped(self):
+        tasks.start_reporting_file_pipelines(['file-1'])
+        self.group.reset_mock()
+        self.set_status.reset_mock()
+
+        started = tasks.start_reporting_file_pipelines(['file-1', 'file-2'])
+
+        self.assertEqual(started, ['file-2'])
+        self.assertEqual(len(self._get_started_pipelines()), 1)
+        self.set_status.assert_called_once_with(
+            'file-2', FileAcceptanceStatus.PROCESSING)
+
+    def test_no_pipeline_when_every_file_is_running(self):
+        tasks.start_reporting_file_pipelines(['file-1'])
+        self.group.reset_mock()
+
+        self.assertEqual(tasks.start_reporting_file_pipelines(['file-1']), [])
+        self.group.assert_not_called()
+
+    def test_accepted_file_releases_lock(self):
+        tasks.start_reporting_file_pipelines(['file-1'])
+        tasks.accept_reporting_file_task.apply(kwargs={'file_uuid': 'file-1'})
+
+        self.set_status.assert_called_with(
+            'file-1', FileAcceptanceStatus.ACCEPTED)
+        self.assertEqual(
+            tasks.start_reporting_file_pipelines(['file-1']), ['file-1'])
+
+    def test_final_failure_marks_file_as_errored(self):
+        tasks.start_reporting_file_pipelines(['file-1'])
+        self.set_status.reset_mock()
+        extract = mock.Mock(side_effect=requests.ConnectionError("down"))
+        with mock.patch.object(
+                tasks.StandardizedDataReportingFile, 'objects'), \
+                mock.patch.object(
+                    tasks, 'get_or_extract_reporting_file_data', extract), \
+                mock.patch('celery.app.trace.logger') as logger:
+            result = tasks.extract_reporting_file_data_task.apply(
+                kwargs={'file_uuid': 'file-1'})
+
+        # CASE: Network errors are retried before the file errors, once
+        self.assertEqual(result.state, 'FAILURE')
+        logger.log.assert_called_once()
+        self.assertEqual(
+            extract.call_count,
+            tasks.LAMBDA_RETRY_OPTIONS['max_retries'] + 1)
+        self.set_status.assert_called_once_with(
+            'file-1',
+            FileAcceptanceStatus.ERROR,
+            error_message="ConnectionError: down")
+        self.assertEqual(
+            tasks.start_reporting_file_pipelines(['file-1']), ['file-1'])
+
+
+class StandardizedDataReportingFileViewTest(TestCase):
+    url = '/api/cii/standarddatareporting/'
+
+    def setUp(self):
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ships = [
+            Ship.objects.create(
+                name="Ship {}".format(imo_reg),
+                imo_reg=imo_reg,
+                company=company,
+                ship_type=ShipType.BULK_CARRIER,
+            )
+            for imo_reg in (9000001, 9000002)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create(username="fleet.manager"))
+
+        self.start_pipelines = mock.Mock()
+        patcher = mock.patch(
+            'carboncalc.views.start_reporting_file_pipelines',
+            self.start_pipelines)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _file_data(self, ship: Ship, year: int) -> dict:
+        return {
+            'ship': ship.imo_reg,
+            'year': year,
+            'file_name': "sdr_{}_{}.xlsx".format(ship.imo_reg, year),
+            's3_file_path': "sdr/{}/{}.xlsx".format(ship.imo_reg, year),
+        }
+
+    def test_batch_starts_pipeline_per_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, [
+                self._file_data(self.ships[0], 2023),
+                self._file_data(self.ships[0], 2024),
+                self._file_data(self.ships[1], 2024),
+            ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        file_uuids = list(StandardizedDataReportingFile.objects.order_by(
+            'id').values_list('uuid', flat=True))
+        self.assertEqual(len(file_uuids), 3)
+        self.start_pipelines.assert_called_once_with(file_uuids)
+
+    def test_single_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.url, self._file_data(self.ships[0], 2024),
+                format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['year'], 2024)
+        self.start_pipelines.assert_called_once()
+
+    def test_same_ship_and_year_in_batch_is_rejected(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, [
+                self._file_data(self.ships[0], 2024),
+                self._file_data(self.ships[1], 2024),
+                self._file_data(self.ships[0], 2024),
+            ], format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertEqual(response.data[1], {})
+        self.assertIn('year', response.data[2])
+        self.assertFalse(StandardizedDataReportingFile.objects.exists())
+        self.start_pipelines.assert_not_called()
+
+    def test_existing_ship_and_year_is_rejected(self):
+        StandardizedDataReportingFile.objects.create(
+            ship=self.ships[0],
+            year=2024,
+            file_name="sdr.xlsx",
+            s3_file_path="sdr/sdr.xlsx",
+        )
+
+        response = self.client.post(
+            self.url, self._file_data(self.ships[0], 2024), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('year', response.data)
+        self.assertEqual(StandardizedDataReportingFile.objects.count(), 1)
@@ -8,4 +8,7 @@ urlpatterns=[
     path('cii/config/', views.CIIConfigView.as_view()),
     path('cii/ships-overview/', views.ShipsCIIOverviewListView.as_view()),
     path('cii/calculator/', views.CIICalculatorView.as_view()),
+    path('cii/scenarios/', views.CIIScenarioView.as_view()),
+    path('cii/ships/<int:imo_reg>/ytd/',
+         views.CIIYearToDateView.as_view()),
 ]
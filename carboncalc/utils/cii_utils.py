@@ -1,7 +1,7 @@
 from decimal import Decimal
 
-from carboncalc.enums import ApplicableCII, CIIShipType
-from core.enums import ShipType
+from carboncalc.enums import ApplicableCII, CIIFuelType, CIIShipType
+from core.enums import FuelType, ShipType
 from core.models import Ship
 
 
@@ -26,7 +26,7 @@ def get_cii_ship_type(
 
         if ship_type == ShipType.BULK_CARRIER:
             if dwt >= 279000:
-                cii_ship_type = CIIShipType.BULK_CARRIER_GTE_27900
+                cii_ship_type = CIIShipType.BULK_CARRIER_GTE_279000
             else:
                 cii_ship_type = CIIShipType.BULK_CARRIER_LT_279000
 
@@ -89,3 +89,16 @@ def get_ship_capacity_value(
         return ship.shipspecs.deadweight_tonnage
     elif applicable_cii == ApplicableCII.CGDIST:
         return ship.shipspecs.gross_tonnage
+
+
+CII_FUEL_TYPE_MAP = {
+    FuelType.HFO: CIIFuelType.HFO,
+    FuelType.LSFO: CIIFuelType.LSFO,
+    FuelType.MDO: CIIFuelType.MDGO,
+    FuelType.MGO: CIIFuelType.MDGO,
+    FuelType.LPG_PROPANE: CIIFuelType.LPG_PROPANE,
+    FuelType.LPG_BUTANE: CIIFuelType.LPG_BUTANE,
+    FuelType.METHANOL: CIIFuelType.METHANOL,
+    FuelType.ETHANOL: CIIFuelType.ETHANOL,
+    FuelType.LNG: CIIFuelType.LNG,
+}
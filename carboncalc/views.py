@@ -1,5 +1,11 @@
+from datetime import datetime, timezone
+
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -7,16 +13,34 @@ from carboncalc.serializers.cii_serializers import (
     CIICalculatorInputSerializer,
     CIICalculatorOutputSerializer,
     CIIConfigViewSerlaizer,
+    CIIScenarioInputSerializer,
+    CIIYearToDateSerializer,
     EnergyEfficiencyTechnicalFileSerializer,
     ShipOverviewCIISerializer,
     StandardizedDataReportingFileSerializer,
 )
 from carboncalc.logic.cii_logic import process_cii_calculator
+from carboncalc.logic.file_processing_logic import (
+    get_duplicate_reporting_files,
+)
+from carboncalc.logic.fleet_cii_logic import process_cii_scenarios
+from carboncalc.logic.ytd_cii_logic import (
+    get_cii_year_to_date,
+    get_cii_year_to_date_projection,
+)
+from carboncalc.utils.cii_utils import get_cii_ship_type
 from carboncalc.tasks import (
     populate_cii_boundaries_for_ship_task,
-    process_standardized_data_reporting_file_task,
+    start_reporting_file_pipelines,
 )
+from core.access import get_request_ships
 from core.models import Ship
+from core.permissions import HasShipAccess, ShipAccessQuerysetMixin
+from core.response_cache import (
+    AccessibleShipsCachedResponseMixin,
+    ShipCachedResponseMixin,
+    bump_ship_version,
+)
 
 
 class CIIConfigView(generics.CreateAPIView):
@@ -27,6 +51,7 @@ class CIIConfigView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(ship=ship)
+        bump_ship_version(ship.pk)
         headers = self.get_success_headers(serializer.data)
         populate_cii_boundaries_for_ship_task.delay(ship_imo=ship.imo_reg)
         return Response(serializer.data, status=status.HTTP_201_CREATED,
@@ -37,16 +62,49 @@ class StandardizedDataReportingFile(generics.CreateAPIView):
     serializer_class = StandardizedDataReportingFileSerializer
 
     def create(self, request):
-        ship = get_object_or_404(Ship, imo_reg=request.data.get('ship'))
-        serializer = self.get_serializer(
-            data=request.data, many=isinstance(request.data, list))
-        # TODO: Handle multiple files
+        """
+        Accepts one file, or a list of files for any number of ships, whose
+        pipelines then run in parallel
+        """
+        many = isinstance(request.data, list)
+        file_data_list = request.data if many else [request.data]
+        ships = {
+            str(ship.imo_reg): ship for ship in Ship.objects.filter(
+                imo_reg__in=[
+                    file_data.get('ship') for file_data in file_data_list])}
+        if any(str(file_data.get('ship')) not in ships
+               for file_data in file_data_list):
+            raise Http404
+
+        serializer = self.get_serializer(data=file_data_list, many=True)
         serializer.is_valid(raise_exception=True)
-        file = serializer.save(ship=ship)
-        process_standardized_data_reporting_file_task.delay(
-            file_uuid=file.uuid)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED,
+        # CASE: A ship has one file per year, within the batch or already
+        duplicates = get_duplicate_reporting_files([
+            (ships[str(file_data.get('ship'))].pk, attrs['year'])
+            for attrs, file_data in zip(
+                serializer.validated_data, file_data_list)])
+        if any(duplicates):
+            errors = [
+                {'year': ["This ship already has a file for this year."]}
+                if duplicate else {}
+                for duplicate in duplicates]
+            raise ValidationError(errors if many else errors[0])
+
+        with transaction.atomic():
+            files = [
+                serializer.child.create({
+                    **attrs, 'ship': ships[str(file_data.get('ship'))]})
+                for attrs, file_data in zip(
+                    serializer.validated_data, file_data_list)]
+            file_uuids = [file.uuid for file in files]
+            transaction.on_commit(
+                lambda: start_reporting_file_pipelines(file_uuids))
+
+        data = self.get_serializer(files, many=True).data
+        if not many:
+            data = data[0]
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED,
                         headers=headers)
 
 
@@ -64,14 +122,13 @@ class EnergyEfficiencyTechnicalFileView(generics.CreateAPIView):
                         headers=headers)
 
 
-class ShipsCIIOverviewListView(generics.ListAPIView):
+class ShipsCIIOverviewListView(AccessibleShipsCachedResponseMixin,
+                               ShipAccessQuerysetMixin, generics.ListAPIView):
     serializer_class = ShipOverviewCIISerializer
+    ship_access_field = 'id'
 
     def get_queryset(self):
-        user = self.request.user
-        ships = Ship.objects.filter(
-            assigned_users=user,
-        ).select_related(
+        ships = Ship.objects.select_related(
             'shipspecs',
         )
         return ships
@@ -79,7 +136,9 @@ class ShipsCIIOverviewListView(generics.ListAPIView):
 
 class CIICalculatorView(APIView):
     def post(self, request):
-        ship = get_object_or_404(Ship, imo_reg=request.data.pop('ship'))
+        ship = get_object_or_404(
+            Ship.objects.select_related('shipspecs', 'ciiconfig'),
+            imo_reg=request.data.pop('ship'))
         input_serializer = CIICalculatorInputSerializer(data=request.data)
         input_serializer.is_valid(raise_exception=True)
         calculations = process_cii_calculator(
@@ -90,3 +149,74 @@ class CIICalculatorView(APIView):
         )
         output_serializer = CIICalculatorOutputSerializer(calculations)
         return Response(output_serializer.data)
+
+
+class CIIScenarioView(APIView):
+    """
+    Projects CII for ships over a range of years and a grid of fuel
+    consumption and distance scenarios, see process_cii_scenarios
+    """
+
+    def post(self, request):
+        input_serializer = CIIScenarioInputSerializer(data=request.data)
+        input_serializer.is_valid(raise_exception=True)
+        data = input_serializer.validated_data
+
+        imo_regs = list(dict.fromkeys(data['ships']))
+        ships = {
+            ship.imo_reg: ship for ship in Ship.objects.filter(
+                imo_reg__in=imo_regs,
+                id__in=get_request_ships(request).ids,
+                shipspecs__isnull=False,
+                ciiconfig__isnull=False,
+            ).select_related(
+                'shipspecs',
+                'ciiconfig',
+            )}
+        # CASE: Unknown, unassigned, unconfigured and non-CII ships are
+        # reported together
+        missing = [
+            imo_reg for imo_reg in imo_regs
+            if imo_reg not in ships or
+            get_cii_ship_type(ships[imo_reg]) is None]
+        if missing:
+            raise ValidationError({
+                'ships': "No CII configuration for: {}".format(
+                    ", ".join(map(str, missing)))})
+
+        scenarios = process_cii_scenarios(
+            ships=[ships[imo_reg] for imo_reg in imo_regs],
+            years=data['years'],
+            fuel_consumptions=data['fuel_consumptions'],
+            distances=data['distances'],
+            budget_grade=data['budget_grade'],
+        )
+        return Response(scenarios)
+
+
+class CIIYearToDateView(ShipCachedResponseMixin, APIView):
+    """
+    A ship's live CII for a year (this year by default) from its reports
+    so far, see get_cii_year_to_date_projection
+    """
+    permission_classes = [IsAuthenticated, HasShipAccess]
+
+    def get(self, request, imo_reg):
+        ship = get_object_or_404(
+            Ship.objects.select_related('shipspecs', 'ciiconfig'),
+            imo_reg=imo_reg)
+        if not hasattr(ship, 'ciiconfig') or \
+                get_cii_ship_type(ship) is None:
+            raise ValidationError("Ship has no CII configuration.")
+
+        year = request.query_params.get(
+            'year', datetime.now(timezone.utc).year)
+        try:
+            year = int(year)
+        except ValueError:
+            raise ValidationError({'year': "Must be a year."})
+
+        ytd = get_cii_year_to_date(ship, year)
+        serializer = CIIYearToDateSerializer(
+            get_cii_year_to_date_projection(ytd))
+        return Response(serializer.data)
@@ -0,0 +1,80 @@
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import ShipUser
+
+logger = logging.getLogger(__name__)
+
+
+ACCESSIBLE_SHIPS_CACHE_KEY = 'core:accessible_ships:{}'
+# Safety net only, entries are invalidated when ShipUser rows change
+ACCESSIBLE_SHIPS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+def get_accessible_ships(user) -> dict[int, int]:
+    """
+    Ship id -> IMO number of every ship assigned to user
+    Cached in Redis per user, see invalidate_accessible_ships
+    """
+    if user is None or not user.is_authenticated:
+        return {}
+
+    cache_key = ACCESSIBLE_SHIPS_CACHE_KEY.format(user.pk)
+    try:
+        ships = cache.get(cache_key)
+    except Exception:
+        logger.warning("Unable to read accessible ships from cache",
+                       exc_info=True)
+        ships = None
+    if ships is not None:
+        return ships
+
+    ships = dict(ShipUser.objects.filter(
+        user=user,
+    ).values_list(
+        'ship_id', 'ship__imo_reg',
+    ))
+    try:
+        cache.set(cache_key, ships, timeout=ACCESSIBLE_SHIPS_CACHE_TIMEOUT)
+    except Exception:
+        logger.warning("Unable to write accessible ships to cache",
+                       exc_info=True)
+    return ships
+
+
+class AccessibleShips:
+    """Ships a user is assigned to, as sets for constant time lookups"""
+
+    def __init__(self, ships: dict[int, int]):
+        self.ids = frozenset(ships)
+        self.imo_regs = frozenset(ships.values())
+
+
+def get_request_ships(request) -> AccessibleShips:
+    """Ships of the request's user, looked up at most once per request"""
+    ships = getattr(request, '_accessible_ships', None)
+    if ships is None:
+        ships = AccessibleShips(get_accessible_ships(request.user))
+        request._accessible_ships = ships
+    return ships
+
+
+def invalidate_accessible_ships(user_id: int) -> None:
+    """
+    Drops a user's cached ships now, and again once the current
+    transaction commits, so a read racing the commit cannot leave
+    stale ships cached
+    """
+    cache_key = ACCESSIBLE_SHIPS_CACHE_KEY.format(user_id)
+
+    def delete():
+        try:
+            cache.delete(cache_key)
+        except Exception:
+            logger.warning("Unable to invalidate accessible ships",
+                           exc_info=True)
+
+    delete()
+    transaction.on_commit(delete)
@@ -0,0 +1,132 @@
+import logging
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from core.response_cache import (
+    ShipCachedResponseMixin,
+    get_response_cache_key,
+    is_etag_matched,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncReadAPIView(ShipCachedResponseMixin, View):
+    """
+    Async GET only counterpart of a DRF read view, for ASGI workers
+    * DRF views are sync only. Requests are wrapped in a DRF Request for
+      authentication and permissions, and rendered with DRF's JSONRenderer,
+      so payloads and errors match the sync view
+    * Queries go through the async ORM. Blocking work without an async API,
+      i.e. token checks, ship access and serialization, runs in
+      sync_to_async
+    * Responses are cached and get ETags as ShipCachedResponseMixin does
+    * get_data: the body of a successful response
+    """
+    http_method_names = ['get', 'head', 'options']
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    renderer = JSONRenderer()
+
+    async def get(self, request, *args, **kwargs):
+        self.request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes])
+        try:
+            return await self.get_response(self.request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    async def get_response(self, request, *args, **kwargs) -> HttpResponse:
+        await sync_to_async(self.check_permissions)(request)
+        etag = await sync_to_async(self.read_response_etag)(request)
+        if etag is None:
+            return self.render(await self.get_data(request, *args, **kwargs))
+
+        if is_etag_matched(request, etag):
+            return self.render(None, status.HTTP_304_NOT_MODIFIED,
+                               headers={'ETag': etag})
+
+        cache_key = get_response_cache_key(etag)
+        try:
+            data = await cache.aget(cache_key)
+        except Exception:
+            logger.warning("Unable to read response from cache",
+                           exc_info=True)
+            data = None
+        if data is None:
+            data = await self.get_data(request, *args, **kwargs)
+            try:
+                await cache.aset(cache_key, data,
+                                 timeout=self.response_cache_timeout)
+            except Exception:
+                logger.warning("Unable to write response to cache",
+                               exc_info=True)
+        return self.render(data, headers={'ETag': etag})
+
+    async def get_data(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    async def serialize(self, serializer_class, instance, many=False):
+        return await sync_to_async(
+            lambda: serializer_class(instance, many=many).data)()
+
+    def check_permissions(self, request) -> None:
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if permission.has_permission(request, self):
+                continue
+            if request.authenticators and \
+                    not request.successful_authenticator:
+                raise exceptions.NotAuthenticated()
+            raise exceptions.PermissionDenied(
+                getattr(permission, 'message', None))
+
+    def handle_exception(self, exc) -> HttpResponse:
+        """Error responses as DRF's APIView.handle_exception renders them"""
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            authenticators = self.request.authenticators
+            auth_header = None
+            if authenticators:
+                auth_header = authenticators[0].authenticate_header(
+                    self.request)
+            if auth_header:
+                exc.auth_header = auth_header
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+
+        response = exception_handler(
+            exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        headers = {
+            header: value for header, value in response.headers.items()
+            if header.lower() != 'content-type'}
+        return self.render(response.data, response.status_code,
+                           headers=headers)
+
+    def render(
+        self,
+        data,
+        status_code: int = status.HTTP_200_OK,
+        headers: Optional[dict] = None,
+    ) -> HttpResponse:
+        content = b''
+        if data is not None:
+            content = self.renderer.render(data)
+        return HttpResponse(
+            content,
+            status=status_code,
+            content_type=self.renderer.media_type,
+            headers=headers,
+        )
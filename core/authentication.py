@@ -0,0 +1,103 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.blacklist.exceptions import MissingToken
+
+from core.models import User
+
+
+VERIFIED_TOKEN_CACHE_MAX_SIZE = 2048
+# Caps how long a cached user is trusted, so deactivations still apply
+# to long-lived tokens
+VERIFIED_TOKEN_CACHE_MAX_TTL = 15 * 60
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of token digest -> (decoded payload, user)
+    Entries expire at the token's `exp` claim, or after max_ttl seconds,
+    whichever comes first
+    """
+
+    def __init__(
+        self,
+        max_size: int = VERIFIED_TOKEN_CACHE_MAX_SIZE,
+        max_ttl: int = VERIFIED_TOKEN_CACHE_MAX_TTL,
+    ):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[tuple[dict, User]]:
+        digest = _get_token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            expires_at, payload, user = entry
+            if expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload, user
+
+    def set(self, token: str, payload: dict, user: User) -> None:
+        now = time.time()
+        expires_at = min(payload.get('exp', now), now + self.max_ttl)
+        if expires_at <= now:
+            return
+
+        digest = _get_token_digest(token)
+        with self._lock:
+            self._entries[digest] = (expires_at, payload, user)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _get_token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+verified_token_cache = VerifiedTokenCache()
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JSON Web Token authentication that skips signature verification and
+    the user lookup for tokens it has already verified
+    """
+
+    def authenticate(self, request):
+        try:
+            token = self.get_token_from_request(request)
+        except MissingToken:
+            return None
+        if token is None:
+            return None
+
+        cached = verified_token_cache.get(token)
+        if cached is not None:
+            _, user = cached
+            return user, token
+
+        self._payload = None
+        result = super().authenticate(request)
+        if result is not None and self._payload is not None:
+            user, token = result
+            verified_token_cache.set(token, self._payload, user)
+        return result
+
+    def authenticate_credentials(self, payload):
+        # Authenticators are instantiated per request, so this is safe
+        self._payload = payload
+        return super().authenticate_credentials(payload)
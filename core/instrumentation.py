@@ -0,0 +1,295 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from utils.metrics_utils import get_metric_totals, increment_metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Upper bounds of the request duration (seconds) and query count buckets
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+HISTOGRAM_BUCKETS = {
+    'marinanet_http_request_duration_seconds': DURATION_BUCKETS,
+    'marinanet_db_queries_per_request': QUERY_COUNT_BUCKETS,
+}
+# Metric name -> (type, help) served by MetricsView, in this order.
+# Integration metrics are recorded by utils.http_utils
+METRIC_FAMILIES = {
+    'marinanet_http_requests_total': (
+        'counter', "Requests by endpoint, method and status"),
+    'marinanet_http_request_duration_seconds': (
+        'histogram', "Request latency by endpoint"),
+    'marinanet_db_queries_per_request': (
+        'histogram', "Database queries per request by endpoint"),
+    'marinanet_db_query_duration_seconds_total': (
+        'counter', "Time spent in database queries by endpoint"),
+    'marinanet_serializer_duration_seconds_total': (
+        'counter',
+        "Time spent serializing responses by endpoint, including queries "
+        "run while serializing"),
+    'marinanet_query_budget_exceeded_total': (
+        'counter',
+        "Requests running more queries than their view's query_budget"),
+    'marinanet_integration_requests_total': (
+        'counter', "Calls to external endpoints"),
+    'marinanet_integration_errors_total': (
+        'counter', "Failed calls to external endpoints"),
+    'marinanet_integration_latency_seconds_total': (
+        'counter', "Time spent calling external endpoints"),
+    'marinanet_integration_circuit_opened_total': (
+        'counter', "Times an external endpoint's circuit opened"),
+}
+# Endpoint label of requests not routed to a view
+UNMATCHED_ENDPOINT = 'unmatched'
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on, see RequestMetricsMiddleware"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+
+class MetricsRegistry:
+    """
+    Request and integration metrics by endpoint, in Prometheus format
+    * Totals are kept in Redis, see utils.metrics_utils, so every worker
+      process serves the same totals and they outlive worker restarts
+    """
+
+    def record(
+        self,
+        endpoint: str,
+        method: str,
+        status_code: int,
+        metrics: RequestMetrics,
+        over_budget: bool = False,
+    ) -> None:
+        by_endpoint = (('endpoint', endpoint),)
+        increments = {
+            ('marinanet_http_requests_total', by_endpoint + (
+                ('method', method), ('status', str(status_code)))): 1,
+            ('marinanet_db_query_duration_seconds_total', by_endpoint):
+                metrics.db_time,
+            ('marinanet_serializer_duration_seconds_total', by_endpoint):
+                metrics.serializer_time,
+        }
+        _add_observation(
+            increments, 'marinanet_http_request_duration_seconds',
+            endpoint, metrics.duration)
+        _add_observation(
+            increments, 'marinanet_db_queries_per_request',
+            endpoint, metrics.query_count)
+        if over_budget:
+            increments[
+                ('marinanet_query_budget_exceeded_total', by_endpoint)] = 1
+        increment_metrics(increments)
+
+    def render(self) -> str:
+        """Text exposition format, version 0.0.4"""
+        samples = defaultdict(dict)
+        for (name, labels), value in get_metric_totals().items():
+            samples[name][labels] = value
+
+        lines = []
+        for name, (metric_type, help_text) in METRIC_FAMILIES.items():
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} {}'.format(name, metric_type))
+            if metric_type == 'histogram':
+                _add_histogram(lines, name, samples)
+                continue
+            for labels, value in sorted(samples[name].items()):
+                _add_sample(lines, name, labels, value)
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each request's latency, database queries and time, and
+    serializer time, by endpoint
+    * Endpoints are the matched URL route, e.g.
+      api/marinanet/ships/<int:imo_reg>/
+    * Totals are served in Prometheus format by MetricsView, and every
+      request is logged as one JSON line
+    * Views can declare a query_budget, requests over it are logged as
+      warnings, see core.test_utils for enforcing budgets in tests
+    * Queries are counted by a wrapper installed on every connection, so
+      queries run in sync_to_async threads count towards their request
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Marks this middleware as async, as Django's MiddlewareMixin
+            # does, so async views are not run through a thread
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    def record(self, request, response, metrics: RequestMetrics) -> None:
+        metrics.duration = time.perf_counter() - metrics.start
+        endpoint = UNMATCHED_ENDPOINT
+        view_name = None
+        query_budget = None
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is not None:
+            endpoint = resolver_match.route
+            view_name = resolver_match.view_name
+            query_budget = get_query_budget(resolver_match.func)
+        over_budget = query_budget is not None and \
+            metrics.query_count > query_budget
+
+        registry.record(
+            endpoint, request.method, response.status_code, metrics,
+            over_budget=over_budget)
+        log_level = logging.WARNING if over_budget else logging.INFO
+        if logger.isEnabledFor(log_level):
+            logger.log(log_level, json.dumps({
+                'event': 'request',
+                'endpoint': endpoint,
+                'view': view_name,
+                'method': request.method,
+                'status': response.status_code,
+                'duration_ms': round(metrics.duration * 1000, 2),
+                'db_queries': metrics.query_count,
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'serializer_ms': round(metrics.serializer_time * 1000, 2),
+                'query_budget': query_budget,
+            }))
+
+
+def get_query_budget(view_func) -> Optional[int]:
+    """The query_budget declared on a view, None if it declares none"""
+    view_class = getattr(view_func, 'view_class',
+                         getattr(view_func, 'cls', None))
+    return getattr(view_class, 'query_budget', None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper adding each query to its request"""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.query_count += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs) -> None:
+    """connection_created receiver, see RequestMetricsMiddleware"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def instrument_serializers() -> None:
+    """
+    Times top level serialization, i.e. serializer.data, per request
+    * Nested serializers are timed as part of their parent
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    data_property = BaseSerializer.data
+    if getattr(data_property.fget, 'is_instrumented', False):
+        return
+
+    def data(self):
+        metrics = _current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return data_property.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return data_property.fget(self)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_time += time.perf_counter() - start
+
+    data.is_instrumented = True
+    BaseSerializer.data = property(data)
+
+
+def _add_observation(
+    increments: dict,
+    name: str,
+    endpoint: str,
+    value: float,
+) -> None:
+    """Adds one observation to a histogram's cumulative buckets"""
+    by_endpoint = (('endpoint', endpoint),)
+    for bound in HISTOGRAM_BUCKETS[name]:
+        if value <= bound:
+            increments[('{}_bucket'.format(name),
+                        by_endpoint + (('le', str(bound)),))] = 1
+    increments[('{}_bucket'.format(name),
+                by_endpoint + (('le', '+Inf'),))] = 1
+    increments[('{}_sum'.format(name), by_endpoint)] = value
+    increments[('{}_count'.format(name), by_endpoint)] = 1
+
+
+def _add_histogram(lines: list, name: str, samples: dict) -> None:
+    bounds = [str(bound) for bound in HISTOGRAM_BUCKETS[name]] + ['+Inf']
+    buckets = samples['{}_bucket'.format(name)]
+    for labels in sorted(samples['{}_count'.format(name)]):
+        for bound in bounds:
+            bucket_labels = labels + (('le', bound),)
+            _add_sample(lines, '{}_bucket'.format(name), bucket_labels,
+                        buckets.get(bucket_labels, 0))
+        for suffix in ('sum', 'count'):
+            sample_name = '{}_{}'.format(name, suffix)
+            _add_sample(lines, sample_name, labels,
+                        samples[sample_name].get(labels, 0))
+
+
+def _add_sample(lines: list, name: str, labels: tuple, value: float) -> None:
+    if float(value).is_integer():
+        value = int(value)
+    lines.append('{}{} {}'.format(name, _format_labels(labels), value))
+
+
+def _format_labels(labels: tuple) -> str:
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(label, str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n'))
+        for label, value in labels))
@@ -0,0 +1,151 @@
+import json
+import logging
+import re
+import threading
+import time
+
+from django.core.cache import cache
+import jwt
+import requests
+
+from marinanet.secrets import JWT_ISSUER
+from utils.http_utils import IntegrationEndpoint
+
+logger = logging.getLogger(__name__)
+
+
+JWKS_URL = 'https://{}/.well-known/jwks.json'.format(JWT_ISSUER)
+JWKS_CACHE_KEY = 'core:jwks:{}'.format(JWT_ISSUER)
+
+# Used when the IdP response carries no usable Cache-Control max-age
+JWKS_DEFAULT_MAX_AGE = 60 * 60
+# Upper bound on how long a fetched key set is trusted without refetching
+JWKS_MAX_MAX_AGE = 24 * 60 * 60
+# Minimum number of seconds between two fetches from the IdP
+JWKS_MIN_REFETCH_INTERVAL = 60
+JWKS_FETCH_TIMEOUT = 5
+
+MAX_AGE_REGEX = re.compile(r'max-age=(\d+)')
+
+
+class JWKSKeyStore:
+    """
+    Caches the issuer's RSA public keys by `kid`
+
+    Keys are kept parsed in-process and the raw JWKS document is shared
+    between workers through the Redis cache, so token verification does not
+    touch the network in steady state.
+    * Expired key sets keep being served while a background refetch runs,
+      so an IdP outage does not lock users out
+    * An unknown `kid` triggers at most one background refetch per
+      JWKS_MIN_REFETCH_INTERVAL
+    """
+
+    def __init__(self, url: str = JWKS_URL, cache_key: str = JWKS_CACHE_KEY):
+        self.url = url
+        self.endpoint = IntegrationEndpoint(
+            name='jwks', url=url, timeout=JWKS_FETCH_TIMEOUT)
+        self.cache_key = cache_key
+        self._keys = {}
+        self._expires_at = 0.0
+        self._last_fetch_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get_key(self, kid: str):
+        if not self._keys and not self._load_from_shared_cache():
+            # CASE: Cold start, nothing to serve until keys are fetched
+            if self._can_refetch():
+                self._refresh()
+
+        if time.time() >= self._expires_at and self._can_refetch():
+            # CASE: Keys are stale, check if another worker refreshed them
+            if not self._load_from_shared_cache():
+                self._refresh_in_background()
+
+        public_key = self._keys.get(kid)
+        if public_key is None:
+            # CASE: Signing keys were probably rotated
+            self._refresh_in_background()
+        return public_key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys = {}
+            self._expires_at = 0.0
+            self._last_fetch_at = 0.0
+
+    def _load_from_shared_cache(self) -> bool:
+        try:
+            cached = cache.get(self.cache_key)
+        except Exception:
+            logger.warning("Unable to read JWKS from cache", exc_info=True)
+            return False
+
+        if not cached or cached['expires_at'] <= time.time():
+            return False
+        self._set_keys(cached['jwks'], cached['expires_at'])
+        return True
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing or not self._can_refetch():
+                return
+            self._refreshing = True
+        thread = threading.Thread(target=self._refresh, daemon=True)
+        thread.start()
+
+    def _can_refetch(self) -> bool:
+        return time.time() - self._last_fetch_at >= JWKS_MIN_REFETCH_INTERVAL
+
+    def _refresh(self) -> bool:
+        with self._lock:
+            self._last_fetch_at = time.time()
+        try:
+            response = self.endpoint.get()
+            jwks = response.json()
+        except (requests.RequestException, ValueError):
+            logger.warning("Unable to fetch JWKS from %s", self.url,
+                           exc_info=True)
+            return False
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+        max_age = _get_max_age(response.headers.get('Cache-Control', ''))
+        expires_at = time.time() + max_age
+        self._set_keys(jwks, expires_at)
+        try:
+            cache.set(
+                self.cache_key,
+                {'jwks': jwks, 'expires_at': expires_at},
+                timeout=max_age)
+        except Exception:
+            logger.warning("Unable to write JWKS to cache", exc_info=True)
+        return True
+
+    def _set_keys(self, jwks: dict, expires_at: float) -> None:
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kty') != 'RSA' or 'kid' not in jwk:
+                continue
+            keys[jwk['kid']] = jwt.algorithms.RSAAlgorithm.from_jwk(
+                json.dumps(jwk))
+        if not keys:
+            return
+        with self._lock:
+            self._keys = keys
+            self._expires_at = expires_at
+
+
+def _get_max_age(cache_control: str) -> int:
+    if 'no-cache' in cache_control or 'no-store' in cache_control:
+        return JWKS_MIN_REFETCH_INTERVAL
+    match = MAX_AGE_REGEX.search(cache_control)
+    if not match:
+        return JWKS_DEFAULT_MAX_AGE
+    return max(JWKS_MIN_REFETCH_INTERVAL,
+               min(int(match.group(1)), JWKS_MAX_MAX_AGE))
+
+
+jwks_key_store = JWKSKeyStore()
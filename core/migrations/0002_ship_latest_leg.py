@@ -0,0 +1,39 @@
+# Generated by Django 4.1.1 on 2026-10-18 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_latest_leg(apps, schema_editor):
+    Ship = apps.get_model("core", "Ship")
+    VoyageLeg = apps.get_model("vesselreporting", "VoyageLeg")
+    latest_legs = (
+        VoyageLeg.objects.order_by("voyage__ship_id", "-created_at")
+        .distinct("voyage__ship_id")
+        .values_list("voyage__ship_id", "id")
+    )
+    for ship_id, leg_id in latest_legs:
+        Ship.objects.filter(pk=ship_id).update(latest_leg_id=leg_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vesselreporting", "0003_alter_freshwaterdata_ccdata_and_more"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ship",
+            name="latest_leg",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="vesselreporting.voyageleg",
+            ),
+        ),
+        migrations.RunPython(populate_latest_leg, migrations.RunPython.noop),
+    ]
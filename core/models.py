@@ -85,6 +85,14 @@ class Ship(BaseModel):
     )
     status = models.PositiveSmallIntegerField(
         choices=Status.choices, default=Status.ACTIVE)
+    # Denormalized pointer to the most recently created leg
+    # Maintained by vesselreporting when legs are created
+    latest_leg = models.ForeignKey(
+        'vesselreporting.VoyageLeg',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+')
 
     class Meta:
         db_table = "ships"
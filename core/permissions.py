@@ -0,0 +1,31 @@
+from rest_framework import permissions
+
+from core.access import get_request_ships
+
+
+class HasShipAccess(permissions.BasePermission):
+    """
+    Allows views routed on a ship's imo_reg only for users assigned to it
+    """
+
+    def has_permission(self, request, view):
+        imo_reg = view.kwargs.get('imo_reg')
+        if imo_reg is None:
+            return True
+        return int(imo_reg) in get_request_ships(request).imo_regs
+
+
+class ShipAccessQuerysetMixin:
+    """
+    Limits a view's queryset to ships the user is assigned to
+    Filters `ship_access_field` on the cached ship ids instead of joining
+    ship_users
+    """
+    ship_access_field = 'ship_id'
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return queryset.filter(**{
+            '{}__in'.format(self.ship_access_field):
+                get_request_ships(self.request).ids,
+        })
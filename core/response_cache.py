@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import time
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.access import get_request_ships
+from core.models import Ship
+
+logger = logging.getLogger(__name__)
+
+
+SHIP_VERSION_CACHE_KEY = 'core:ship_version:{}'
+RESPONSE_CACHE_KEY = 'core:response:{}'
+# Safety net only, entries are orphaned when a ship's version is bumped
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+
+
+def _new_ship_version() -> int:
+    # CASE: A version key evicted from Redis restarts from the clock, so it
+    # never comes back at a version older responses were cached under
+    return time.time_ns() // 1000
+
+
+def get_ship_versions(ship_ids: Iterable[int]) -> dict[int, int]:
+    """Current cache version of each ship, see bump_ship_version"""
+    keys = {
+        SHIP_VERSION_CACHE_KEY.format(ship_id): ship_id
+        for ship_id in ship_ids}
+    found = cache.get_many(keys)
+    versions = {}
+    for key, ship_id in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _new_ship_version()
+            if not cache.add(key, version, timeout=None):
+                version = cache.get(key, version)
+        versions[ship_id] = version
+    return versions
+
+
+def bump_ship_version(ship_id: int) -> None:
+    """
+    Orphans every cached response showing a ship
+    Bumped now, and again once the current transaction commits, so a read
+    racing the commit cannot leave a stale response cached
+    """
+    cache_key = SHIP_VERSION_CACHE_KEY.format(ship_id)
+
+    def bump():
+        try:
+            try:
+                cache.incr(cache_key)
+            except ValueError:
+                # Key is missing
+                cache.set(cache_key, _new_ship_version(), timeout=None)
+        except Exception:
+            logger.warning("Unable to bump ship version", exc_info=True)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_response_cache_key(etag: str) -> str:
+    return RESPONSE_CACHE_KEY.format(etag.strip('"'))
+
+
+def is_etag_matched(request, etag: str) -> bool:
+    if_none_match = request.headers.get('If-None-Match')
+    return bool(if_none_match) and etag in parse_etags(if_none_match)
+
+
+class ShipCachedResponseMixin:
+    """
+    Caches a view's GET responses in Redis under the versions of the ships
+    they show, so filing a report for a ship retires its cached responses
+    * get_cache_ship_ids: ships the response shows, by default the ship
+      routed on imo_reg. None skips the cache
+    * Responses carry an ETag derived from the cache key, so a matching
+      If-None-Match gets a 304 after a single ship id lookup, without
+      serializing anything
+    """
+    response_cache_timeout = RESPONSE_CACHE_TIMEOUT
+
+    def get_cache_ship_ids(self) -> Optional[list[int]]:
+        imo_reg = self.kwargs.get('imo_reg')
+        if imo_reg is None:
+            return None
+        ship_id = Ship.objects.filter(
+            imo_reg=imo_reg,
+        ).values_list(
+            'id', flat=True,
+        ).first()
+        return [ship_id] if ship_id is not None else None
+
+    def get_response_etag(self, request) -> Optional[str]:
+        ship_ids = self.get_cache_ship_ids()
+        if ship_ids is None:
+            return None
+        versions = get_ship_versions(ship_ids)
+        key = '|'.join([
+            type(self).__name__,
+            request.build_absolute_uri(),
+            *('{}:{}'.format(ship_id, version)
+              for ship_id, version in sorted(versions.items())),
+        ])
+        return '"{}"'.format(hashlib.sha1(key.encode()).hexdigest())
+
+    def read_response_etag(self, request) -> Optional[str]:
+        """ETag of the response, None if the cache can't be used"""
+        try:
+            return self.get_response_etag(request)
+        except Exception:
+            logger.warning("Unable to read ship versions from cache",
+                           exc_info=True)
+            return None
+
+    def get(self, request, *args, **kwargs):
+        etag = self.read_response_etag(request)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+
+        if is_etag_matched(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+
+        cache_key = get_response_cache_key(etag)
+        try:
+            data = cache.get(cache_key)
+        except Exception:
+            logger.warning("Unable to read response from cache",
+                           exc_info=True)
+            data = None
+
+        if data is not None:
+            response = Response(data)
+        else:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            try:
+                cache.set(cache_key, response.data,
+                          timeout=self.response_cache_timeout)
+            except Exception:
+                logger.warning("Unable to write response to cache",
+                               exc_info=True)
+        response['ETag'] = etag
+        return response
+
+
+class AccessibleShipsCachedResponseMixin(ShipCachedResponseMixin):
+    """Caches responses listing every ship the user is assigned to"""
+
+    def get_cache_ship_ids(self) -> Optional[list[int]]:
+        return sorted(get_request_ships(self.request).ids)
@@ -0,0 +1,50 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.access import invalidate_accessible_ships
+from core.models import Ship, ShipUser
+
+
+@receiver(pre_save, sender=ShipUser)
+def remember_previous_ship_user(sender, instance, **kwargs):
+    # CASE: Reassigning a row to another user changes both users' ships
+    instance._previous_user_id = None
+    if instance.pk is not None:
+        instance._previous_user_id = ShipUser.objects.filter(
+            pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=ShipUser)
+def invalidate_ship_user_on_save(sender, instance, **kwargs):
+    invalidate_accessible_ships(instance.user_id)
+    previous_user_id = getattr(instance, '_previous_user_id', None)
+    if previous_user_id not in (None, instance.user_id):
+        invalidate_accessible_ships(previous_user_id)
+
+
+@receiver(post_delete, sender=ShipUser)
+def invalidate_ship_user_on_delete(sender, instance, **kwargs):
+    invalidate_accessible_ships(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Ship.assigned_users.through)
+def invalidate_assigned_users(sender, instance, action, reverse, pk_set,
+                              **kwargs):
+    # CASE: ship.assigned_users.add() and friends skip the ShipUser
+    # save/delete signals
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance is a User
+        invalidate_accessible_ships(instance.pk)
+    elif action == 'pre_clear':
+        for user_id in instance.assigned_users.values_list('pk', flat=True):
+            invalidate_accessible_ships(user_id)
+    else:
+        for user_id in pk_set:
+            invalidate_accessible_ships(user_id)
@@ -0,0 +1,29 @@
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from core.instrumentation import get_query_budget
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin checking requests against the query_budget declared on
+    their view, see core.instrumentation
+    * Unlike assertNumQueries, fewer queries than the budget pass
+    """
+
+    def assertWithinQueryBudget(self, url: str, method: str = 'get', **kwargs):
+        view_func = resolve(urlsplit(url).path).func
+        query_budget = get_query_budget(view_func)
+        if query_budget is None:
+            self.fail("{} declares no query_budget".format(url))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        if len(queries) > query_budget:
+            self.fail("{} {} ran {} queries, its budget is {}:\n{}".format(
+                method.upper(), url, len(queries), query_budget,
+                '\n'.join(query['sql'] for query in queries)))
+        return response
@@ -1,3 +1,507 @@
-from django.test import TestCase
+import json
+from collections import defaultdict
+from unittest import mock
 
-# Create your tests here.
+import jwt
+import requests
+from asgiref.sync import sync_to_async
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+
+from core.authentication import (
+    VERIFIED_TOKEN_CACHE_MAX_TTL,
+    CachedJSONWebTokenAuthentication,
+    VerifiedTokenCache,
+    verified_token_cache,
+)
+from core import instrumentation
+from core.instrumentation import (
+    MetricsRegistry,
+    RequestMetrics,
+    RequestMetricsMiddleware,
+    record_query,
+)
+from core.jwks import JWKS_MIN_REFETCH_INTERVAL, JWKSKeyStore
+from core.models import User
+from core.views import metrics
+from utils import http_utils
+from utils.http_utils import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    CircuitOpenError,
+    IntegrationEndpoint,
+)
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+class MetricsStore:
+    """In-memory stand-in for the metric totals shared through Redis"""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+
+    def increment(self, increments: dict) -> None:
+        for key, value in increments.items():
+            self.totals[key] += value
+
+    def get_totals(self) -> dict:
+        return dict(self.totals)
+
+
+def create_jwk(kid: str) -> dict:
+    private_key = rsa.generate_private_key(
+        public_exponent=65537, key_size=2048)
+    jwk = json.loads(
+        jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk['kid'] = kid
+    return jwk
+
+
+class SynchronousThread:
+    """Runs background refreshes inline, so tests can check their result"""
+
+    def __init__(self, target, daemon=None):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class JWKSKeyStoreTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_700_000_000.0
+        self.store = JWKSKeyStore(
+            url='https://issuer.test/.well-known/jwks.json',
+            cache_key='core:jwks:test')
+        self.store.endpoint = mock.Mock()
+        self.jwks = {'keys': [create_jwk('key-1')]}
+        self.store.endpoint.get.side_effect = lambda: mock.Mock(
+            headers={'Cache-Control': 'max-age=3600'},
+            json=mock.Mock(return_value=self.jwks))
+
+        patchers = [
+            mock.patch('core.jwks.time.time', side_effect=lambda: self.now),
+            mock.patch('core.jwks.threading.Thread', SynchronousThread),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_cold_start_fetches_keys(self):
+        self.assertIsNotNone(self.store.get_key('key-1'))
+        self.assertIsNotNone(self.store.get_key('key-1'))
+        self.assertEqual(self.store.endpoint.get.call_count, 1)
+
+    def test_unknown_kid_refetches_rotated_keys(self):
+        self.assertIsNotNone(self.store.get_key('key-1'))
+        self.jwks = {'keys': [create_jwk('key-2')]}
+
+        # CASE: Within the refetch interval, the unknown kid is not fetched
+        self.now += JWKS_MIN_REFETCH_INTERVAL - 1
+        self.assertIsNone(self.store.get_key('key-2'))
+        self.assertEqual(self.store.endpoint.get.call_count, 1)
+
+        # CASE: The refetch runs in the background, later calls get the key
+        self.now += 1
+        self.assertIsNone(self.store.get_key('key-2'))
+        self.assertEqual(self.store.endpoint.get.call_count, 2)
+        self.assertIsNotNone(self.store.get_key('key-2'))
+        self.assertIsNone(self.store.get_key('key-1'))
+
+    def test_failed_refetch_keeps_serving_keys(self):
+        self.assertIsNotNone(self.store.get_key('key-1'))
+        self.store.endpoint.get.side_effect = ValueError("Invalid JSON")
+
+        self.now += 3600
+        with self.assertLogs('core.jwks', 'WARNING'):
+            self.assertIsNotNone(self.store.get_key('key-1'))
+        self.assertEqual(self.store.endpoint.get.call_count, 2)
+
+
+class VerifiedTokenCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.user = User(username="fleet.manager")
+        self.token_cache = VerifiedTokenCache(max_size=2)
+        patcher = mock.patch(
+            'core.authentication.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entry_expires_at_token_exp(self):
+        self.token_cache.set('token', {'exp': self.now + 60}, self.user)
+        self.now += 59
+        self.assertIsNotNone(self.token_cache.get('token'))
+        self.now += 1
+        self.assertIsNone(self.token_cache.get('token'))
+
+    def test_entry_expires_after_max_ttl(self):
+        self.token_cache.set('token', {'exp': self.now + 24 * 60 * 60},
+                             self.user)
+        self.now += VERIFIED_TOKEN_CACHE_MAX_TTL - 1
+        self.assertIsNotNone(self.token_cache.get('token'))
+        self.now += 1
+        self.assertIsNone(self.token_cache.get('token'))
+
+    def test_expired_token_is_not_cached(self):
+        self.token_cache.set('token', {'exp': self.now}, self.user)
+        self.assertIsNone(self.token_cache.get('token'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        payload = {'exp': self.now + 60}
+        self.token_cache.set('token-1', payload, self.user)
+        self.token_cache.set('token-2', payload, self.user)
+        self.token_cache.get('token-1')
+        self.token_cache.set('token-3', payload, self.user)
+        self.assertIsNotNone(self.token_cache.get('token-1'))
+        self.assertIsNone(self.token_cache.get('token-2'))
+
+
+class CachedJSONWebTokenAuthenticationTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.user = User(username="fleet.manager")
+        self.payload = {'sub': 'fleet.manager', 'exp': self.now + 60}
+        self.request = RequestFactory().get(
+            '/', HTTP_AUTHORIZATION='Bearer token')
+        verified_token_cache.clear()
+        self.addCleanup(verified_token_cache.clear)
+
+        def verify(authentication, request):
+            authentication.authenticate_credentials(self.payload)
+            return self.user, 'token'
+
+        patchers = [
+            mock.patch('core.authentication.time.time',
+                       side_effect=lambda: self.now),
+            mock.patch.object(JSONWebTokenAuthentication,
+                              'authenticate_credentials',
+                              return_value=self.user),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(
+            JSONWebTokenAuthentication, 'authenticate', autospec=True,
+            side_effect=verify)
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_verified_token_skips_verification(self):
+        authentication = CachedJSONWebTokenAuthentication()
+        self.assertEqual(authentication.authenticate(self.request),
+                         (self.user, 'token'))
+        self.assertEqual(authentication.authenticate(self.request),
+                         (self.user, 'token'))
+        self.assertEqual(self.verify.call_count, 1)
+
+    def test_token_is_verified_again_after_exp(self):
+        authentication = CachedJSONWebTokenAuthentication()
+        authentication.authenticate(self.request)
+        self.now += 60
+        authentication.authenticate(self.request)
+        self.assertEqual(self.verify.call_count, 2)
+
+    def test_missing_token_is_anonymous(self):
+        authentication = CachedJSONWebTokenAuthentication()
+        self.assertIsNone(
+            authentication.authenticate(RequestFactory().get('/')))
+        self.assertEqual(self.verify.call_count, 0)
+
+
+def create_response(status_code: int) -> mock.Mock:
+    response = mock.Mock(status_code=status_code)
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(
+            "{} Error".format(status_code), response=response)
+    return response
+
+
+class IntegrationEndpointTest(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.session = mock.Mock()
+        self.session.request.return_value = create_response(200)
+        self.metrics_store = MetricsStore()
+        patchers = [
+            mock.patch.dict(http_utils._endpoints, clear=True),
+            mock.patch.object(
+                http_utils, 'increment_metrics',
+                side_effect=self.metrics_store.increment),
+            mock.patch.object(
+                http_utils, 'get_session', return_value=self.session),
+            mock.patch.object(
+                http_utils.time, 'monotonic', side_effect=lambda: self.now),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.endpoint = IntegrationEndpoint(
+            name='test-lambda', url='https://lambda.test/')
+
+    def fail_requests(self, times: int, status_code: int = 502) -> bool:
+        """Whether the failed requests opened the circuit"""
+        self.session.request.return_value = create_response(status_code)
+        with self.assertLogs(http_utils.logger, 'WARNING') as logs:
+            for _ in range(times):
+                with self.assertRaises(requests.HTTPError):
+                    self.endpoint.get()
+        return any(record.levelname == 'ERROR' for record in logs.records)
+
+    def succeed_request(self) -> None:
+        self.session.request.return_value = create_response(200)
+        self.endpoint.get()
+
+    def test_circuit_opens_after_failure_threshold(self):
+        self.assertFalse(self.fail_requests(CIRCUIT_FAILURE_THRESHOLD - 1))
+        self.assertFalse(self.endpoint.is_open())
+        self.assertTrue(self.fail_requests(1))
+        self.assertTrue(self.endpoint.is_open())
+
+    def test_open_circuit_does_not_call_endpoint(self):
+        self.fail_requests(CIRCUIT_FAILURE_THRESHOLD)
+        call_count = self.session.request.call_count
+
+        self.now += CIRCUIT_RESET_TIMEOUT - 1
+        with self.assertRaises(CircuitOpenError):
+            self.endpoint.get()
+        self.assertEqual(self.session.request.call_count, call_count)
+
+    def test_circuit_reopens_on_first_failure_after_reset_timeout(self):
+        self.fail_requests(CIRCUIT_FAILURE_THRESHOLD)
+        self.now += CIRCUIT_RESET_TIMEOUT
+        self.assertFalse(self.endpoint.is_open())
+
+        self.fail_requests(1)
+        self.assertTrue(self.endpoint.is_open())
+
+        # CASE: A success after the reset timeout closes the circuit
+        self.now += CIRCUIT_RESET_TIMEOUT
+        self.succeed_request()
+        self.assertFalse(
+            self.fail_requests(CIRCUIT_FAILURE_THRESHOLD - 1))
+        self.assertFalse(self.endpoint.is_open())
+
+    def test_success_resets_failure_count(self):
+        self.fail_requests(CIRCUIT_FAILURE_THRESHOLD - 1)
+        self.succeed_request()
+        self.assertFalse(
+            self.fail_requests(CIRCUIT_FAILURE_THRESHOLD - 1))
+        self.assertFalse(self.endpoint.is_open())
+
+    def test_client_errors_do_not_open_circuit(self):
+        self.assertFalse(self.fail_requests(
+            CIRCUIT_FAILURE_THRESHOLD, status_code=404))
+        self.assertFalse(self.endpoint.is_open())
+
+        # CASE: Rate limiting means the endpoint is struggling
+        self.assertTrue(self.fail_requests(
+            CIRCUIT_FAILURE_THRESHOLD, status_code=429))
+        self.assertTrue(self.endpoint.is_open())
+
+    def test_metrics(self):
+        def slow_request(method, url, **kwargs):
+            self.now += 0.5
+            return create_response(200)
+
+        self.session.request.side_effect = slow_request
+        self.endpoint.get()
+        self.session.request.side_effect = None
+        self.fail_requests(CIRCUIT_FAILURE_THRESHOLD)
+        with self.assertRaises(CircuitOpenError):
+            self.endpoint.get()
+
+        self.assertEqual(http_utils.get_endpoint_metrics(), {
+            'test-lambda': {
+                'requests': CIRCUIT_FAILURE_THRESHOLD + 1,
+                'errors': CIRCUIT_FAILURE_THRESHOLD,
+                'circuit_opened': 1,
+                'latency_seconds': 0.5,
+                'circuit_open': True,
+            }})
+        by_endpoint = (('endpoint', 'test-lambda'),)
+        self.assertEqual(self.metrics_store.get_totals(), {
+            ('marinanet_integration_requests_total', by_endpoint):
+                CIRCUIT_FAILURE_THRESHOLD + 1,
+            ('marinanet_integration_errors_total', by_endpoint):
+                CIRCUIT_FAILURE_THRESHOLD,
+            ('marinanet_integration_circuit_opened_total', by_endpoint): 1,
+            ('marinanet_integration_latency_seconds_total', by_endpoint):
+                0.5,
+        })
+
+
+def run_queries(count: int) -> None:
+    """Runs count queries through the query recorder, without a database"""
+    for _ in range(count):
+        record_query(
+            lambda sql, params, many, context: None, 'SELECT 1', None,
+            False, {})
+
+
+def create_view(query_budget: int) -> mock.Mock:
+    view = mock.Mock()
+    view.view_class.query_budget = query_budget
+    return view
+
+
+class RequestMetricsMiddlewareTest(SimpleTestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/api/marinanet/ships/1/')
+        self.request.resolver_match = mock.Mock(
+            route='api/marinanet/ships/<int:imo_reg>/',
+            view_name='ship-detail',
+            func=create_view(query_budget=2),
+        )
+        patcher = mock.patch.object(instrumentation.registry, 'record')
+        self.record = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assert_recorded(self, query_count: int, over_budget: bool) -> None:
+        endpoint, method, status_code, metrics = self.record.call_args.args
+        self.assertEqual(
+            (endpoint, method, status_code),
+            ('api/marinanet/ships/<int:imo_reg>/', 'GET', 200))
+        self.assertEqual(metrics.query_count, query_count)
+        self.assertEqual(
+            self.record.call_args.kwargs['over_budget'], over_budget)
+
+    def test_sync_request_counts_its_queries(self):
+        def view(request):
+            run_queries(2)
+            return HttpResponse()
+
+        with self.assertLogs(instrumentation.logger, 'INFO') as logs:
+            RequestMetricsMiddleware(view)(self.request)
+        self.assert_recorded(query_count=2, over_budget=False)
+        self.assertEqual(json.loads(logs.records[0].getMessage())[
+            'db_queries'], 2)
+
+        # CASE: Queries outside a request are not counted
+        run_queries(1)
+        self.assertEqual(self.record.call_count, 1)
+
+    async def test_async_request_counts_queries_in_threads(self):
+        async def view(request):
+            run_queries(1)
+            await sync_to_async(run_queries)(2)
+            return HttpResponse()
+
+        with self.assertLogs(instrumentation.logger, 'WARNING'):
+            await RequestMetricsMiddleware(view)(self.request)
+        self.assert_recorded(query_count=3, over_budget=True)
+
+
+class MetricsRegistryTest(SimpleTestCase):
+    def setUp(self):
+        store = MetricsStore()
+        patchers = [
+            mock.patch.object(
+                instrumentation, 'increment_metrics',
+                side_effect=store.increment),
+            mock.patch.object(
+                instrumentation, 'get_metric_totals',
+                side_effect=store.get_totals),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def record(self, registry: MetricsRegistry, duration: float,
+               query_count: int, status_code: int = 200) -> None:
+        metrics = RequestMetrics()
+        metrics.duration = duration
+        metrics.query_count = query_count
+        metrics.db_time = 0.25
+        registry.record(
+            'api/ships/', 'GET', status_code, metrics,
+            over_budget=query_count > 10)
+
+    def test_render_adds_up_every_worker(self):
+        # CASE: Each worker process has its own registry
+        workers = [MetricsRegistry(), MetricsRegistry()]
+        self.record(workers[0], duration=0.02, query_count=3)
+        self.record(workers[1], duration=0.3, query_count=12)
+        self.record(workers[1], duration=0.04, query_count=1,
+                    status_code=404)
+
+        lines = workers[0].render().splitlines()
+        self.assertEqual(lines, workers[1].render().splitlines())
+        for line in (
+            '# TYPE marinanet_http_requests_total counter',
+            'marinanet_http_requests_total{endpoint="api/ships/",'
+            'method="GET",status="200"} 2',
+            'marinanet_http_requests_total{endpoint="api/ships/",'
+            'method="GET",status="404"} 1',
+            '# TYPE marinanet_http_request_duration_seconds histogram',
+            'marinanet_http_request_duration_seconds_bucket{'
+            'endpoint="api/ships/",le="0.01"} 0',
+            'marinanet_http_request_duration_seconds_bucket{'
+            'endpoint="api/ships/",le="0.025"} 1',
+            'marinanet_http_request_duration_seconds_bucket{'
+            'endpoint="api/ships/",le="0.05"} 2',
+            'marinanet_http_request_duration_seconds_bucket{'
+            'endpoint="api/ships/",le="+Inf"} 3',
+            'marinanet_http_request_duration_seconds_count{'
+            'endpoint="api/ships/"} 3',
+            'marinanet_db_queries_per_request_bucket{'
+            'endpoint="api/ships/",le="5"} 2',
+            'marinanet_db_queries_per_request_sum{endpoint="api/ships/"} 16',
+            'marinanet_db_query_duration_seconds_total{'
+            'endpoint="api/ships/"} 0.75',
+            'marinanet_query_budget_exceeded_total{'
+            'endpoint="api/ships/"} 1',
+        ):
+            self.assertIn(line, lines)
+        # Buckets in bound order, then sum and count
+        bucket_lines = [
+            line for line in lines if line.startswith(
+                'marinanet_http_request_duration_seconds_')]
+        self.assertEqual(len(bucket_lines), 13)
+        self.assertIn('le="10"', bucket_lines[9])
+        self.assertTrue(bucket_lines[-1].startswith(
+            'marinanet_http_request_duration_seconds_count'))
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        metrics = RequestMetrics()
+        registry.record('api/"quoted"\\path/', 'GET', 200, metrics)
+        self.assertIn(
+            'marinanet_http_requests_total{'
+            'endpoint="api/\\"quoted\\"\\\\path/",method="GET",'
+            'status="200"} 1',
+            registry.render().splitlines())
+
+
+@override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsViewTest(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(
+            instrumentation, 'get_metric_totals', return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **meta) -> int:
+        request = RequestFactory().get('/api/metrics', **meta)
+        return metrics(request).status_code
+
+    def test_proxied_scrape_is_allowed_by_real_ip(self):
+        # CASE: Through the unix socket there is no REMOTE_ADDR
+        self.assertEqual(
+            self.get(REMOTE_ADDR='', HTTP_X_REAL_IP='127.0.0.1'), 200)
+        self.assertEqual(
+            self.get(REMOTE_ADDR='', HTTP_X_REAL_IP='203.0.113.5'), 403)
+
+    def test_real_ip_is_ignored_over_tcp(self):
+        self.assertEqual(self.get(REMOTE_ADDR='127.0.0.1'), 200)
+        self.assertEqual(
+            self.get(REMOTE_ADDR='203.0.113.5', HTTP_X_REAL_IP='127.0.0.1'),
+            403)
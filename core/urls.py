@@ -6,4 +6,5 @@ urlpatterns = [
     path('public', views.public),
     path('private', views.private),
     path('private-scoped', views.private_scoped),
+    path('metrics', views.metrics),
 ]
@@ -1,9 +1,7 @@
-import json
-
 from django.contrib.auth import authenticate
 import jwt
-import requests
 
+from core.jwks import jwks_key_store
 from marinanet.secrets import JWT_AUDIENCE, JWT_ISSUER
 
 
@@ -15,16 +13,10 @@ def jwt_get_username_from_payload_handler(payload):
 
 def jwt_decode_token(token):
     header = jwt.get_unverified_header(token)
-    jwks = requests.get('https://{}/.well-known/jwks.json'
-                        .format(JWT_ISSUER)).json()
-    public_key = None
-
-    for jwk in jwks['keys']:
-        if jwk['kid'] == header['kid']:
-            public_key = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
+    public_key = jwks_key_store.get_key(header.get('kid'))
 
     if public_key is None:
-        raise Exception('Public key not found.')
+        raise jwt.InvalidTokenError('Public key not found.')
 
     issuer = 'https://{}/'.format(JWT_ISSUER)
     return jwt.decode(token, public_key, audience=JWT_AUDIENCE, issuer=issuer,
@@ -2,12 +2,14 @@ from functools import wraps
 
 import jwt
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import render
 from rest_framework import generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 
+from core.instrumentation import registry
 from core.serializers import UserSerializer
 
 
@@ -48,6 +50,25 @@ def requires_scope(required_scope):
         return decorated
     return require_scope
 
+
+def get_client_ip(request) -> str:
+    """
+    The client's address
+    * Requests through the unix socket have no REMOTE_ADDR, only the local
+      proxy can connect to it and passes the client on in X-Real-IP
+    """
+    return request.META.get('REMOTE_ADDR') or \
+        request.META.get('HTTP_X_REAL_IP', '')
+
+
+def metrics(request):
+    """Request metrics of every worker, in Prometheus text format"""
+    if get_client_ip(request) not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Create your views here.
 
 
@@ -0,0 +1,143 @@
+from datetime import timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable, Optional
+
+from django.db import connection, transaction
+
+from carboncalc.logic.fleet_cii_logic import recalculate_fleet_cii
+from carboncalc.models import CIIRawData
+from carboncalc.utils.cii_utils import CII_FUEL_TYPE_MAP
+from core.models import Ship
+from dcsreporting.models import DCSVoyage
+
+# Fuel dicts adding up to a voyage's fuel consumption. In the KR DCS
+# template a voyage's consumption includes its at berth consumption, and
+# corrections cover time outside of voyages
+DCS_FUEL_CONSUMPTION_FIELDS = ('net_consumption', 'correction_consumption')
+
+
+def aggregate_dcs_voyages(
+    year: int,
+    ship_ids: Optional[Iterable[int]] = None,
+    company_id: Optional[int] = None,
+) -> dict[int, dict]:
+    """
+    Annual IMO DCS totals of each ship's DCSVoyages in a year
+    * One query for the whole fleet-year, fuel dicts are summed by key in
+      PostgreSQL with jsonb_each_text
+    * Distance and hours include the file's corrections
+    Returns {ship id: totals}, fuel is keyed by CIIFuelType, in tonnes
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(*_get_aggregation_query(year, ship_ids, company_id))
+        rows = cursor.fetchall()
+
+    totals = {}
+    for ship_id, voyage_count, distance, hours, start_date, end_date, \
+            fuel_burned in rows:
+        fuel_oil_burned = {}
+        for fuel, burned in (fuel_burned or {}).items():
+            cii_fuel = CII_FUEL_TYPE_MAP[fuel]
+            fuel_oil_burned[cii_fuel] = \
+                fuel_oil_burned.get(cii_fuel, Decimal(0)) + Decimal(burned)
+        totals[ship_id] = {
+            'voyage_count': voyage_count,
+            'distance_travelled': distance,
+            'hours': hours,
+            'start_date': start_date.astimezone(timezone.utc).date(),
+            'end_date': end_date.astimezone(timezone.utc).date(),
+            'fuel_oil_burned': fuel_oil_burned,
+        }
+    return totals
+
+
+@transaction.atomic
+def update_cii_raw_data_from_dcs_voyages(
+    year: int,
+    ship_ids: Optional[Iterable[int]] = None,
+    company_id: Optional[int] = None,
+    calculate_cii: bool = True,
+) -> list[CIIRawData]:
+    """
+    Writes the year's DCSVoyage totals as CIIRawData, one upsert per
+    fleet-year, replacing data from standardized data reporting files
+    * calculate_cii: also recomputes CalculatedCII for the ships
+    """
+    totals = aggregate_dcs_voyages(
+        year=year, ship_ids=ship_ids, company_id=company_id)
+    cii_raw_data = [
+        CIIRawData(
+            ship_id=ship_id,
+            year=year,
+            start_date=ship_totals['start_date'],
+            end_date=ship_totals['end_date'],
+            distance_sailed=int(ship_totals['distance_travelled'].quantize(
+                Decimal(1), rounding=ROUND_HALF_UP)),
+            fuel_oil_burned={
+                fuel: str(burned)
+                for fuel, burned in ship_totals['fuel_oil_burned'].items()},
+        )
+        for ship_id, ship_totals in totals.items()
+    ]
+    if not cii_raw_data:
+        return []
+
+    CIIRawData.objects.bulk_create(
+        cii_raw_data,
+        update_conflicts=True,
+        unique_fields=['ship', 'year'],
+        update_fields=[
+            'start_date', 'end_date', 'distance_sailed', 'fuel_oil_burned',
+            'modified_at'],
+    )
+    if calculate_cii:
+        recalculate_fleet_cii(year=year, ship_ids=list(totals))
+    return cii_raw_data
+
+
+def _get_aggregation_query(
+    year: int,
+    ship_ids: Optional[Iterable[int]],
+    company_id: Optional[int],
+) -> tuple[str, list]:
+    quote_name = connection.ops.quote_name
+    tables = {
+        'voyages': quote_name(DCSVoyage._meta.db_table),
+        'ships': quote_name(Ship._meta.db_table),
+    }
+
+    filters = ['v.year = %s']
+    params = [year]
+    if ship_ids is not None:
+        filters.append('v.ship_id = ANY(%s)')
+        params.append(list(ship_ids))
+    if company_id is not None:
+        filters.append('s.company_id = %s')
+        params.append(company_id)
+
+    fuel_entries = ' UNION ALL '.join(
+        'SELECT key, value FROM jsonb_each_text(v.{})'.format(
+            quote_name(field))
+        for field in DCS_FUEL_CONSUMPTION_FIELDS)
+    sql = (
+        'WITH voyages AS ('
+        'SELECT v.* FROM {voyages} v '
+        'JOIN {ships} s ON s.id = v.ship_id '
+        'WHERE {filters}'
+        '), fuel AS ('
+        'SELECT v.ship_id, f.key, SUM(f.value::numeric) AS burned '
+        'FROM voyages v CROSS JOIN LATERAL ({fuel_entries}) f '
+        'GROUP BY v.ship_id, f.key'
+        ') '
+        'SELECT v.ship_id, COUNT(*), '
+        'SUM(v.distance_travelled + v.correction_distance_travelled), '
+        'SUM(v.time_at_sea + v.correction_time_at_sea), '
+        'MIN(v.departure_date), MAX(v.arrival_date), '
+        '(SELECT jsonb_object_agg(f.key, f.burned::text) '
+        'FROM fuel f WHERE f.ship_id = v.ship_id) '
+        'FROM voyages v '
+        'GROUP BY v.ship_id '
+        'ORDER BY v.ship_id'
+    ).format(filters=' AND '.join(filters), fuel_entries=fuel_entries,
+             **tables)
+    return sql, params
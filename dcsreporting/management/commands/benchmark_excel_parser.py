@@ -0,0 +1,59 @@
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.enums import FuelType
+from dcsreporting.logic.excel_parser_logic import (
+    DCS_VOYAGE_BATCH_SIZE,
+    KRDCSColumns,
+    parse_kr_dcs_rows,
+)
+from utils.excel_utils import iter_xlsx_rows, iter_xlsx_rows_in_pool
+
+
+class Command(BaseCommand):
+    help = "Times the local Excel parser on a local XLSX file, no writes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--pool',
+            action='store_true',
+            help="Parse in the process pool instead of in process")
+        parser.add_argument(
+            '--kr-dcs',
+            action='store_true',
+            dest='kr_dcs',
+            help="Also parse the rows as KR DCS voyages, for every fuel")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            try:
+                row_count = self._parse(options)
+            except (OSError, KeyError, ValueError) as e:
+                raise CommandError(e)
+            timings.append(time.perf_counter() - start)
+
+        best = min(timings)
+        self.stdout.write(self.style.SUCCESS(
+            "{} rows, best of {}: {:.3f}s ({:.0f} rows/s)".format(
+                row_count, len(timings), best, row_count / best)))
+
+    def _parse(self, options) -> int:
+        if options['pool']:
+            rows = iter_xlsx_rows_in_pool(options['path'])
+        else:
+            rows = iter_xlsx_rows(options['path'])
+        if not options['kr_dcs']:
+            return sum(1 for _ in rows)
+
+        header = next(rows)
+        columns = KRDCSColumns(header, fuel_options=list(FuelType))
+        row_count = 0
+        while batch := list(islice(rows, DCS_VOYAGE_BATCH_SIZE)):
+            row_count += len(parse_kr_dcs_rows(batch, columns))
+        return row_count
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from core.serializers import ShipSerializer
+from dcsreporting.enums import DCSType
 from dcsreporting.models import DCSUploadedFile
 
 class DCSUploadedFileSerializer(serializers.ModelSerializer):
@@ -9,4 +10,12 @@ class DCSUploadedFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = DCSUploadedFile
         fields = ['uuid', 'file_name', 's3_file_path',
-                  'ship', 'year']
+                  'ship', 'year', 'dcs_type']
+
+    def validate_dcs_type(self, value):
+        # CASE: Only Type 1 files can be parsed so far, see
+        # process_dcs_uploaded_file_task
+        if value != DCSType.TYPE_1:
+            raise serializers.ValidationError(
+                "Only DCS Type 1 files are supported.")
+        return value
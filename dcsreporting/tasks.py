@@ -0,0 +1,46 @@
+import logging
+from typing import Optional
+
+from celery import shared_task
+
+from core.models import Company
+from dcsreporting.enums import DCSType
+from dcsreporting.logic.aggregation_logic import (
+    update_cii_raw_data_from_dcs_voyages,
+)
+from dcsreporting.logic.excel_parser_logic import process_dcs_type_1_excel
+from dcsreporting.models import DCSUploadedFile
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task()
+def process_dcs_uploaded_file_task(
+    file_uuid: str,
+):
+    dcs_file = DCSUploadedFile.objects.select_related(
+        'ship__shipspecs').get(uuid=file_uuid)
+    # CASE: Type 2 uploads are rejected by DCSUploadedFileSerializer, rows
+    # created some other way are skipped rather than parsed as Type 1
+    if dcs_file.dcs_type != DCSType.TYPE_1:
+        logger.warning(
+            "Skipping DCS file %s of ship %s: %s files are not supported",
+            dcs_file.uuid, dcs_file.ship_id, dcs_file.get_dcs_type_display())
+        return 0
+    voyage_count = process_dcs_type_1_excel(dcs_file)
+    update_cii_raw_data_from_dcs_voyages(
+        year=dcs_file.year, ship_ids=[dcs_file.ship_id])
+    return voyage_count
+
+
+@shared_task()
+def aggregate_dcs_voyages_task(
+    year: int,
+    company_uuid: Optional[str] = None,
+):
+    company_id = None
+    if company_uuid is not None:
+        company_id = Company.objects.get(uuid=company_uuid).pk
+    cii_raw_data = update_cii_raw_data_from_dcs_voyages(
+        year=year, company_id=company_id)
+    return len(cii_raw_data)
@@ -1,3 +1,418 @@
-from django.test import TestCase
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from rest_framework.exceptions import ValidationError
+
+from carboncalc.enums import CIIFuelType
+from carboncalc.models import CIIRawData
+from core.enums import CargoUnits, FuelType, ShipType
+from core.models import Company, Ship, ShipSpecs
+from dcsreporting import tasks
+from dcsreporting.enums import DCSType
+from dcsreporting.logic import aggregation_logic, excel_parser_logic
+from dcsreporting.logic.aggregation_logic import (
+    aggregate_dcs_voyages,
+    update_cii_raw_data_from_dcs_voyages,
+)
+from dcsreporting.logic.excel_parser_logic import (
+    KR_DCS_FUEL_COLUMN_MAP,
+    KRDCSColumns,
+    import_kr_dcs_rows,
+    parse_kr_dcs_rows,
+    parse_utc_datetimes,
+)
+from dcsreporting.models import DCSUploadedFile, DCSVoyage
+from dcsreporting.serializers.file_serializers import (
+    DCSUploadedFileSerializer,
+)
+
+# A KR DCS row by column, spelt as in the template where spacing and case
+# vary, with HFO columns and LPG (Butane) consumption only
+KR_DCS_ROW = {
+    "Voyage no.": 12.0,
+    "Port code (DEPARTURE)": " SGSIN ",
+    "Departure Date (UTC)": datetime(2023, 1, 1),
+    "Departure time (UTC)": "08:30",
+    "Departure Cargo operation (YES/NO)": "yes ",
+    "Port code (ARRIVAL)": "KRPUS",
+    "Arrival Date (UTC)": "2023-01-06",
+    "Arrival time (UTC)": "14:00",
+    "Time spent at sea (hours)": 120.5,
+    "Distance travelled (nm)": 1500,
+    "Total idle spent time at anchorage (hours)": None,
+    "Cargo carried: Passenger": '',
+    "Cargo carried: Weight or Volume": 50000,
+    "Transport Work: Passenger": 0,
+    "Transport Work: Weight or Volume": 75000000,
+    "Time spent at sea": 0,
+    "Distance travelled": 0,
+    **{column.format(fuel_oil="HFO"): 10.25
+       for column in KR_DCS_FUEL_COLUMN_MAP.values()},
+    "LPG(Butane) Consumption (MT)": 3,
+}
+
+
+def create_ship(company: Company, imo_reg: int) -> Ship:
+    ship = Ship.objects.create(
+        name="Ship {}".format(imo_reg),
+        imo_reg=imo_reg,
+        company=company,
+        ship_type=ShipType.BULK_CARRIER,
+    )
+    ShipSpecs.objects.create(
+        ship=ship,
+        flag="SG",
+        call_sign="9V0000",
+        mmsi=563000000,
+        delivery_date=date(2015, 1, 1),
+        class_society="DNV",
+        gross_tonnage=20000,
+        deadweight_tonnage=30000,
+        net_tonnage=12000,
+        cargo_unit=CargoUnits.MT,
+        cargo_capacity=28000,
+        propeller_pitch=1,
+        fuel_options=[FuelType.HFO, FuelType.LPG_BUTANE],
+    )
+    return ship
+
+
+class DCSTypeTest(SimpleTestCase):
+    def test_type_2_upload_is_rejected(self):
+        serializer = DCSUploadedFileSerializer()
+        self.assertEqual(
+            serializer.validate_dcs_type(DCSType.TYPE_1), DCSType.TYPE_1)
+        with self.assertRaises(ValidationError):
+            serializer.validate_dcs_type(DCSType.TYPE_2)
+
+    def test_type_2_file_is_skipped(self):
+        dcs_file = DCSUploadedFile(
+            ship_id=1, year=2023, dcs_type=DCSType.TYPE_2)
+        with mock.patch.object(DCSUploadedFile, 'objects') as objects, \
+                mock.patch.object(
+                    tasks, 'process_dcs_type_1_excel') as process_excel, \
+                self.assertLogs(tasks.logger, 'WARNING'):
+            objects.select_related.return_value.get.return_value = dcs_file
+            self.assertEqual(tasks.process_dcs_uploaded_file_task(
+                file_uuid=str(dcs_file.uuid)), 0)
+        process_excel.assert_not_called()
+
+
+class KRDCSParserTest(SimpleTestCase):
+    fuel_options = [FuelType.HFO, FuelType.LPG_BUTANE, FuelType.MGO]
+
+    def setUp(self):
+        self.header = list(KR_DCS_ROW)
+        self.columns = KRDCSColumns(self.header, self.fuel_options)
+
+    def _create_row(self, **values) -> tuple:
+        return tuple({**KR_DCS_ROW, **values}.values())
+
+    def test_headers_match_ignoring_case_and_spacing(self):
+        self.assertEqual(
+            self.columns.text['voyage_num'], self.header.index("Voyage no."))
+        self.assertEqual(
+            self.columns.fuel['net_consumption'], [
+                (FuelType.HFO, self.header.index("HFO Consumption (MT)")),
+                (FuelType.LPG_BUTANE,
+                 self.header.index("LPG(Butane) Consumption (MT)")),
+            ])
+
+    def test_fuels_without_columns_are_left_out(self):
+        self.assertEqual(
+            [fuel_oil for fuel_oil, _ in self.columns.fuel['rob_at_arrival']],
+            [FuelType.HFO])
+        self.assertTrue(all(
+            fuel_oil != FuelType.MGO
+            for fuel_positions in self.columns.fuel.values()
+            for fuel_oil, _ in fuel_positions))
+
+    def test_fuels_outside_options_are_left_out(self):
+        columns = KRDCSColumns(self.header, [FuelType.LPG_BUTANE])
+        self.assertEqual(columns.fuel['rob_at_arrival'], [])
+        self.assertEqual(
+            columns.fuel['net_consumption'], [
+                (FuelType.LPG_BUTANE,
+                 self.header.index("LPG(Butane) Consumption (MT)"))])
+
+    def test_missing_column(self):
+        header = [
+            column for column in self.header
+            if column != "Port code (ARRIVAL)"]
+        with self.assertRaisesMessage(ValueError, "Port code (ARRIVAL)"):
+            KRDCSColumns(header, self.fuel_options)
+
+    def test_parse_rows(self):
+        voyage, = parse_kr_dcs_rows([self._create_row()], self.columns)
+
+        self.assertEqual(voyage.voyage_num, "12")
+        self.assertEqual(voyage.departure_port, "SGSIN")
+        self.assertTrue(voyage.departure_cargo_operation)
+        self.assertEqual(
+            voyage.departure_date,
+            datetime(2023, 1, 1, 8, 30, tzinfo=timezone.utc))
+        self.assertEqual(
+            voyage.arrival_date,
+            datetime(2023, 1, 6, 14, tzinfo=timezone.utc))
+        self.assertEqual(voyage.time_at_sea, Decimal("120.5"))
+        self.assertEqual(voyage.time_idle_at_anchorage, Decimal(0))
+        self.assertEqual(voyage.cargo_carried_passenger, Decimal(0))
+        self.assertEqual(
+            voyage.net_consumption, {
+                FuelType.HFO: Decimal("10.25"),
+                FuelType.LPG_BUTANE: Decimal(3),
+            })
+        self.assertEqual(
+            voyage.rob_at_arrival, {FuelType.HFO: Decimal("10.25")})
+
+    def test_parse_rows_keeps_order(self):
+        rows = [
+            self._create_row(**{
+                "Voyage no.": "V{}".format(day),
+                "Arrival Date (UTC)": "2023-01-{:02d}".format(day),
+                "Departure Cargo operation (YES/NO)": "NO",
+            })
+            for day in (3, 2, 3)]
+
+        voyages = parse_kr_dcs_rows(rows, self.columns)
+
+        self.assertEqual(
+            [voyage.voyage_num for voyage in voyages], ["V3", "V2", "V3"])
+        self.assertEqual(
+            [voyage.arrival_date.day for voyage in voyages], [3, 2, 3])
+        self.assertFalse(any(
+            voyage.departure_cargo_operation for voyage in voyages))
+
+    def test_parse_utc_datetimes(self):
+        self.assertEqual(
+            parse_utc_datetimes([
+                "2023-01-06T14:00",
+                "6 Jan 2023 14:00",
+                "2023-01-06T14:00",
+            ]),
+            [datetime(2023, 1, 6, 14, tzinfo=timezone.utc)] * 3)
+
+    def test_parse_utc_datetimes_parses_each_value_once(self):
+        with mock.patch.object(
+                excel_parser_logic, 'parse',
+                return_value=datetime(2023, 1, 6)) as parse:
+            dates = parse_utc_datetimes(["6 Jan 2023"] * 3)
+        parse.assert_called_once_with("6 Jan 2023")
+        self.assertEqual(
+            dates, [datetime(2023, 1, 6, tzinfo=timezone.utc)] * 3)
+
+
+class KRDCSImportTest(TestCase):
+    def setUp(self):
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship(company, 9000001)
+        self.dcs_file = DCSUploadedFile.objects.create(
+            ship=self.ship,
+            year=2023,
+            file_name="kr_dcs.xlsx",
+            s3_file_path="dcs/kr_dcs.xlsx",
+        )
+        self.header = list(KR_DCS_ROW)
+
+    def _create_rows(self, count: int) -> list[tuple]:
+        return [
+            tuple({**KR_DCS_ROW, "Voyage no.": str(number)}.values())
+            for number in range(count)]
+
+    def _import(self, rows: list[tuple]) -> int:
+        return import_kr_dcs_rows(self.dcs_file, self.header, rows)
+
+    def test_rows_are_inserted_in_batches(self):
+        bulk_create = mock.Mock(wraps=DCSVoyage.objects.bulk_create)
+        with mock.patch.object(
+                excel_parser_logic, 'DCS_VOYAGE_BATCH_SIZE', 2), \
+                mock.patch.object(
+                    DCSVoyage.objects, 'bulk_create', bulk_create):
+            voyage_count = self._import(iter(self._create_rows(5)))
+
+        self.assertEqual(voyage_count, 5)
+        self.assertEqual(
+            [len(args[0]) for args, _ in bulk_create.call_args_list],
+            [2, 2, 1])
+        self.assertEqual(
+            sorted(DCSVoyage.objects.filter(
+                ship=self.ship, year=2023,
+            ).values_list('voyage_num', flat=True)),
+            ["0", "1", "2", "3", "4"])
+
+    def test_import_replaces_voyages_of_ship_and_year(self):
+        self._import(self._create_rows(3))
+        self.dcs_file.year = 2022
+        self._import(self._create_rows(2))
+        self.dcs_file.year = 2023
+
+        self.assertEqual(self._import(self._create_rows(1)), 1)
+        self.assertEqual(
+            DCSVoyage.objects.filter(ship=self.ship, year=2023).count(), 1)
+        self.assertEqual(
+            DCSVoyage.objects.filter(ship=self.ship, year=2022).count(), 2)
+
+    def test_file_without_rows(self):
+        with self.assertRaisesMessage(ValueError, "no rows"):
+            import_kr_dcs_rows(self.dcs_file, [], iter(()))
+
+
+class DCSAggregationTest(TestCase):
+    def setUp(self):
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        other_company = Company.objects.create(
+            name="Other Shipping", link="https://other.example")
+        self.ship = create_ship(company, 9000001)
+        self.other_ship = create_ship(company, 9000002)
+        self.other_company_ship = create_ship(other_company, 9000003)
+
+        self._create_voyage(
+            self.ship, 1, 10, "1000.4", "50.0",
+            net_consumption={FuelType.HFO: "10.5", FuelType.MDO: "1.25"},
+            correction_consumption={FuelType.MGO: "0.75"},
+            correction_distance_travelled="12.3",
+            correction_time_at_sea="1.5")
+        self._create_voyage(
+            self.ship, 12, 20, "800.0", "40.0",
+            net_consumption={FuelType.HFO: "8", FuelType.MGO: "2"})
+        self._create_voyage(
+            self.other_ship, 5, 9, "300.0", "20.0",
+            net_consumption={FuelType.LPG_BUTANE: "4"})
+        self._create_voyage(
+            self.other_company_ship, 2, 3, "100.0", "5.0",
+            net_consumption={FuelType.HFO: "1"})
+        # CASE: Voyages of other years are left out
+        self._create_voyage(
+            self.ship, 1, 10, "999.0", "99.0",
+            net_consumption={FuelType.HFO: "99"}, year=2022)
+
+    def _create_voyage(
+        self,
+        ship: Ship,
+        departure_day: int,
+        arrival_day: int,
+        distance_travelled: str,
+        time_at_sea: str,
+        net_consumption: dict,
+        correction_consumption: Optional[dict] = None,
+        correction_distance_travelled: str = "0",
+        correction_time_at_sea: str = "0",
+        year: int = 2023,
+    ) -> DCSVoyage:
+        return DCSVoyage.objects.create(
+            ship=ship,
+            year=year,
+            voyage_num="V{}".format(departure_day),
+            departure_port="SGSIN",
+            departure_date=datetime(
+                year, 3, departure_day, 8, tzinfo=timezone.utc),
+            departure_cargo_operation=True,
+            arrival_port="KRPUS",
+            arrival_date=datetime(
+                year, 3, arrival_day, 20, tzinfo=timezone.utc),
+            time_at_sea=Decimal(time_at_sea),
+            distance_travelled=Decimal(distance_travelled),
+            time_idle_at_anchorage=Decimal(0),
+            cargo_carried_passenger=Decimal(0),
+            cargo_carried_weight_volume=Decimal(50000),
+            transport_work_passenger=Decimal(0),
+            transport_work_weight_volume=Decimal(75000000),
+            net_consumption=net_consumption,
+            correction_consumption=correction_consumption or {},
+            correction_distance_travelled=Decimal(
+                correction_distance_travelled),
+            correction_time_at_sea=Decimal(correction_time_at_sea),
+        )
+
+    def test_totals_per_ship(self):
+        totals = aggregate_dcs_voyages(2023)
+
+        self.assertEqual(
+            list(totals), [
+                self.ship.pk, self.other_ship.pk, self.other_company_ship.pk])
+        ship_totals = totals[self.ship.pk]
+        self.assertEqual(ship_totals['voyage_count'], 2)
+        self.assertEqual(ship_totals['start_date'], date(2023, 3, 1))
+        self.assertEqual(ship_totals['end_date'], date(2023, 3, 20))
+        self.assertEqual(
+            totals[self.other_ship.pk]['fuel_oil_burned'],
+            {CIIFuelType.LPG_BUTANE: Decimal(4)})
+
+    def test_corrections_are_added(self):
+        ship_totals = aggregate_dcs_voyages(2023)[self.ship.pk]
+
+        self.assertEqual(ship_totals['distance_travelled'], Decimal("1812.7"))
+        self.assertEqual(ship_totals['hours'], Decimal("91.5"))
+
+    def test_mdo_and_mgo_are_folded_into_mdgo(self):
+        ship_totals = aggregate_dcs_voyages(2023)[self.ship.pk]
+
+        self.assertEqual(
+            ship_totals['fuel_oil_burned'], {
+                CIIFuelType.HFO: Decimal("18.5"),
+                CIIFuelType.MDGO: Decimal("4.00"),
+            })
+
+    def test_filter_by_ship(self):
+        totals = aggregate_dcs_voyages(2023, ship_ids=[self.other_ship.pk])
+        self.assertEqual(list(totals), [self.other_ship.pk])
+
+    def test_filter_by_company(self):
+        totals = aggregate_dcs_voyages(
+            2023, company_id=self.other_company_ship.company_id)
+        self.assertEqual(list(totals), [self.other_company_ship.pk])
+
+        totals = aggregate_dcs_voyages(
+            2023,
+            ship_ids=[self.ship.pk, self.other_company_ship.pk],
+            company_id=self.ship.company_id)
+        self.assertEqual(list(totals), [self.ship.pk])
+
+    def test_no_voyages(self):
+        self.assertEqual(aggregate_dcs_voyages(2021), {})
+        self.assertEqual(update_cii_raw_data_from_dcs_voyages(2021), [])
+
+    def test_cii_raw_data_is_upserted(self):
+        # CASE: Replaces data from a standardized data reporting file
+        CIIRawData.objects.create(
+            ship=self.ship,
+            year=2023,
+            start_date=date(2023, 1, 1),
+            end_date=date(2023, 12, 31),
+            distance_sailed=61234,
+            fuel_oil_burned={CIIFuelType.HFO: "4000"},
+        )
+
+        with mock.patch.object(
+                aggregation_logic, 'recalculate_fleet_cii') as recalculate:
+            update_cii_raw_data_from_dcs_voyages(
+                2023, ship_ids=[self.ship.pk, self.other_ship.pk])
+
+        recalculate.assert_called_once_with(
+            year=2023, ship_ids=[self.ship.pk, self.other_ship.pk])
+        self.assertEqual(CIIRawData.objects.count(), 2)
+        raw_data = CIIRawData.objects.get(ship=self.ship, year=2023)
+        self.assertEqual(raw_data.start_date, date(2023, 3, 1))
+        self.assertEqual(raw_data.end_date, date(2023, 3, 20))
+        self.assertEqual(raw_data.distance_sailed, 1813)
+        self.assertEqual(
+            {fuel: Decimal(burned)
+             for fuel, burned in raw_data.fuel_oil_burned.items()},
+            {CIIFuelType.HFO: Decimal("18.5"),
+             CIIFuelType.MDGO: Decimal(4)})
+        self.assertTrue(CIIRawData.objects.filter(
+            ship=self.other_ship, year=2023, distance_sailed=300).exists())
+
+    def test_cii_is_not_recalculated_on_request(self):
+        with mock.patch.object(
+                aggregation_logic, 'recalculate_fleet_cii') as recalculate:
+            cii_raw_data = update_cii_raw_data_from_dcs_voyages(
+                2023, calculate_cii=False)
+
+        recalculate.assert_not_called()
+        self.assertEqual(len(cii_raw_data), 3)
@@ -1,9 +1,11 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
 
 from core.models import Ship
 from dcsreporting.serializers.file_serializers import DCSUploadedFileSerializer
+from dcsreporting.tasks import process_dcs_uploaded_file_task
 
 
 class DCSUploadedFileView(generics.CreateAPIView):
@@ -15,7 +17,15 @@ class DCSUploadedFileView(generics.CreateAPIView):
             data=request.data, many=isinstance(request.data, list))
         # TODO: Handle multiple files
         serializer.is_valid(raise_exception=True)
-        serializer.save(ship=ship)
+        files = serializer.save(ship=ship)
+        if not isinstance(files, list):
+            files = [files]
+        file_uuids = [str(file.uuid) for file in files]
+
+        def process_files():
+            for file_uuid in file_uuids:
+                process_dcs_uploaded_file_task.delay(file_uuid=file_uuid)
+        transaction.on_commit(process_files)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED,
                         headers=headers)
@@ -0,0 +1,22 @@
+"""
+Gunicorn settings for serving marinanet.asgi with uvicorn workers
+
+    gunicorn -c marinanet/gunicorn_asgi.py marinanet.asgi:application
+
+Each worker runs an event loop, so requests to the async views under
+api/marinanet/async/ wait on PostgreSQL without holding a worker. Sync
+DRF views still work, Django runs them in a thread per request.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', 'unix:/run/gunicorn.sock')
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS', multiprocessing.cpu_count() + 1))
+worker_class = 'uvicorn.workers.UvicornWorker'
+accesslog = '-'
+# Workers are recycled to bound memory growth, jittered so they don't all
+# restart together
+max_requests = 5000
+max_requests_jitter = 500
+graceful_timeout = 30
@@ -71,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -165,7 +166,7 @@ AUTH_USER_MODEL = "core.User"
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_jwt.authentication.JSONWebTokenAuthentication",
+        "core.authentication.CachedJSONWebTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ),
@@ -213,9 +214,19 @@ LOGGING = {
             "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
             "propagate": False,
         },
+        # One JSON line per request, see core.instrumentation
+        "core.instrumentation": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
     },
 }
 
+# Addresses allowed to scrape /api/metrics, comma separated. Behind the
+# proxy this is the X-Real-IP it forwards, see core.views.get_client_ip
+METRICS_ALLOWED_IPS = os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1").split(",")
+
 CORS_ORIGIN_ALLOW_ALL = True
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:8080", "https://localhost:8080"]
@@ -240,3 +251,8 @@ CACHES = {
 
 # Celery Settings
 CELERY_BROKER_URL = 'redis://localhost:6379'
+
+
+# Excel Parsing
+# Backends tried in order for uploaded XLSX files, see utils/excel_utils.py
+EXCEL_PARSER_BACKENDS = ['local', 'lambda']
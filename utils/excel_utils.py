@@ -0,0 +1,218 @@
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from multiprocessing.managers import SyncManager
+from typing import Callable, Iterator, Optional
+
+import openpyxl
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+
+# Tried in order, each parser is given a backend for every name it knows
+DEFAULT_EXCEL_PARSER_BACKENDS = ['local', 'lambda']
+# Files this large or larger are parsed in the process pool
+EXCEL_PARSER_POOL_MIN_FILE_SIZE = 1024 * 1024
+EXCEL_PARSER_POOL_SIZE = 2
+# Seconds to wait on the pool for the next rows, or on the caller to take
+# them
+EXCEL_PARSER_POOL_TIMEOUT = 120
+# Rows sent back from the pool at a time, and chunks buffered before the
+# pool process waits for the caller to catch up
+EXCEL_PARSER_POOL_CHUNK_SIZE = 500
+EXCEL_PARSER_POOL_MAX_CHUNKS = 4
+# Seconds between checks that the pool process is still alive
+EXCEL_PARSER_POOL_POLL_INTERVAL = 1
+
+_pool = None
+_pool_manager = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def normalize_label(label: str) -> str:
+    """Label as matched against a template, ignoring case and spacing"""
+    return ''.join(str(label).split()).lower()
+
+
+def parse_with_backends(backends: dict[str, Callable], *args, **kwargs):
+    """
+    Parses with the first backend in settings.EXCEL_PARSER_BACKENDS that
+    succeeds, e.g. reading the file in process and falling back to a Lambda
+    * Errors of every backend but the last are logged and skipped
+    """
+    names = [
+        name for name in getattr(
+            settings, 'EXCEL_PARSER_BACKENDS', DEFAULT_EXCEL_PARSER_BACKENDS)
+        if name in backends]
+    if not names:
+        raise ValueError("No Excel parser backend enabled")
+    for name in names[:-1]:
+        try:
+            return backends[name](*args, **kwargs)
+        except Exception:
+            logger.warning("%s Excel parser failed, falling back",
+                           name, exc_info=True)
+    return backends[names[-1]](*args, **kwargs)
+
+
+def iter_stored_xlsx_rows(
+    file_path: str,
+    sheet_name: Optional[str] = None,
+) -> Iterator[tuple]:
+    """
+    Rows of an uploaded XLSX file as tuples of cell values
+    * The file is copied out of storage once, then read with a read only
+      workbook, so rows stream without loading the sheet into memory
+    * Files of EXCEL_PARSER_POOL_MIN_FILE_SIZE or more are parsed in the
+      process pool instead, see iter_xlsx_rows_in_pool
+    * Empty rows are skipped
+    """
+    with tempfile.NamedTemporaryFile(suffix='.xlsx') as local_file:
+        with default_storage.open(file_path, 'rb') as stored_file:
+            shutil.copyfileobj(stored_file, local_file)
+        local_file.flush()
+
+        if os.path.getsize(local_file.name) >= \
+                EXCEL_PARSER_POOL_MIN_FILE_SIZE and _can_use_pool():
+            yield from iter_xlsx_rows_in_pool(local_file.name, sheet_name)
+        else:
+            yield from iter_xlsx_rows(local_file.name, sheet_name)
+
+
+def iter_xlsx_rows(
+    path: str,
+    sheet_name: Optional[str] = None,
+) -> Iterator[tuple]:
+    """Rows of a local XLSX file, first sheet by default, streamed"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            worksheet = workbook.worksheets[0]
+        else:
+            worksheet = workbook[sheet_name]
+        for row in worksheet.iter_rows(values_only=True):
+            if any(value is not None for value in row):
+                yield row
+    finally:
+        workbook.close()
+
+
+def iter_xlsx_rows_in_pool(
+    path: str,
+    sheet_name: Optional[str] = None,
+) -> Iterator[tuple]:
+    """
+    Rows of a local XLSX file, parsed in another process
+    * Parsing is CPU bound, so it runs in parallel with the caller's
+      threads, and a file blowing up openpyxl's memory takes down a pool
+      process rather than the worker
+    * Rows come back in chunks as they are parsed, through a bounded
+      queue, so the caller can insert while the file is still parsing and
+      only EXCEL_PARSER_POOL_MAX_CHUNKS chunks are held at a time
+    """
+    global _pool
+    pool, manager = _get_pool()
+    chunks = manager.Queue(maxsize=EXCEL_PARSER_POOL_MAX_CHUNKS)
+    cancelled = manager.Event()
+    future = pool.submit(
+        put_xlsx_row_chunks, chunks, cancelled, path, sheet_name)
+    try:
+        while (chunk := _get_row_chunk(chunks, future)) is not None:
+            yield from chunk
+        # CASE: Errors parsing the file are raised here
+        future.result()
+    except BrokenProcessPool:
+        # CASE: A pool process died, the next file gets a new pool
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
+    finally:
+        # CASE: The caller stopped reading early, e.g. on a bad header, the
+        # pool process is unblocked and stops parsing
+        if not future.done():
+            cancelled.set()
+            _drain(chunks)
+
+
+def put_xlsx_row_chunks(
+    chunks: queue.Queue,
+    cancelled: threading.Event,
+    path: str,
+    sheet_name: Optional[str] = None,
+) -> None:
+    """
+    Runs in the pool, puts the rows of a local XLSX file on chunks as
+    lists of EXCEL_PARSER_POOL_CHUNK_SIZE rows, then None once done
+    * Stops early once cancelled is set
+    """
+    try:
+        rows = iter_xlsx_rows(path, sheet_name)
+        while not cancelled.is_set() and \
+                (chunk := list(islice(rows, EXCEL_PARSER_POOL_CHUNK_SIZE))):
+            chunks.put(chunk, timeout=EXCEL_PARSER_POOL_TIMEOUT)
+    finally:
+        # CASE: Also sent if parsing fails, the caller then gets the error
+        # from the future rather than waiting out the timeout
+        chunks.put(None, timeout=EXCEL_PARSER_POOL_TIMEOUT)
+
+
+def _get_row_chunk(chunks: queue.Queue, future: Future) -> Optional[list]:
+    waited = 0
+    while True:
+        try:
+            return chunks.get(timeout=EXCEL_PARSER_POOL_POLL_INTERVAL)
+        except queue.Empty:
+            # CASE: A pool process that died never sends None, its future
+            # raises BrokenProcessPool instead
+            if future.done():
+                future.result()
+                continue
+            waited += EXCEL_PARSER_POOL_POLL_INTERVAL
+            if waited >= EXCEL_PARSER_POOL_TIMEOUT:
+                raise TimeoutError(
+                    "Excel parser pool sent no rows for {}s".format(waited))
+
+
+def _drain(chunks: queue.Queue) -> None:
+    while True:
+        try:
+            chunks.get_nowait()
+        except queue.Empty:
+            return
+
+
+def _can_use_pool() -> bool:
+    # CASE: Daemonic processes, e.g. multiprocessing workers, cannot start
+    # child processes
+    return not multiprocessing.current_process().daemon
+
+
+def _get_pool() -> tuple[ProcessPoolExecutor, SyncManager]:
+    """The process pool, and the manager serving its row queues"""
+    global _pool, _pool_manager, _pool_pid
+    pid = os.getpid()
+    with _pool_lock:
+        # Spawned, so pool processes share no connections or state with the
+        # Django process
+        mp_context = multiprocessing.get_context('spawn')
+        if _pool_manager is None or _pool_pid != pid:
+            _pool_manager = mp_context.Manager()
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=EXCEL_PARSER_POOL_SIZE,
+                mp_context=mp_context,
+            )
+        _pool_pid = pid
+        return _pool, _pool_manager
@@ -0,0 +1,191 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics_utils import increment_metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds to connect to, then to wait on, an endpoint
+DEFAULT_TIMEOUT = (5, 30)
+# Keep-alive connections kept per host, and hosts kept per process
+POOL_MAXSIZE = 10
+POOL_CONNECTIONS = 10
+# Retried in the adapter with 0.5s, 1s backoff. Reads are not retried, a
+# read timeout has already waited out the endpoint once
+MAX_RETRIES = Retry(
+    total=2,
+    connect=2,
+    read=0,
+    status=2,
+    backoff_factor=0.5,
+    status_forcelist=(429, 502, 503, 504),
+    # Every integration only reads, e.g. Lambdas extracting files from S3
+    allowed_methods=frozenset({'GET', 'POST'}),
+    raise_on_status=False,
+)
+# Consecutive failures opening an endpoint's circuit, and seconds it stays
+# open before calls are let through again
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_endpoints = {}
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of calling an endpoint that keeps failing
+    A RequestException, so callers retrying network errors retry this too
+    """
+
+
+def get_session() -> requests.Session:
+    """
+    Keep-alive session shared by every endpoint in this process
+    * Created per pid, connections must not be shared with forked workers
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=MAX_RETRIES,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session, _session_pid = session, pid
+        return _session
+
+
+class IntegrationEndpoint:
+    """
+    An external HTTP endpoint, called through the pooled session
+    * Calls time out, see DEFAULT_TIMEOUT, and raise for error statuses
+    * CIRCUIT_FAILURE_THRESHOLD failures in a row open the circuit: calls
+      raise CircuitOpenError for CIRCUIT_RESET_TIMEOUT seconds without
+      touching the network. 4xx responses are the caller's fault and do not
+      count
+    * Request, error and latency totals are kept per endpoint, in this
+      process (see get_endpoint_metrics) and across processes (see
+      core.instrumentation.MetricsRegistry)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        timeout=DEFAULT_TIMEOUT,
+    ):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+        self._requests = 0
+        self._errors = 0
+        self._circuit_opened = 0
+        self._latency_seconds = 0.0
+        _endpoints[name] = self
+
+    def get(self, **kwargs) -> requests.Response:
+        return self.request('GET', **kwargs)
+
+    def post(self, **kwargs) -> requests.Response:
+        return self.request('POST', **kwargs)
+
+    def request(self, method: str, **kwargs) -> requests.Response:
+        if self.is_open():
+            raise CircuitOpenError(
+                "Circuit open for {}".format(self.name))
+        kwargs.setdefault('timeout', self.timeout)
+
+        start = time.monotonic()
+        try:
+            response = get_session().request(method, self.url, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            latency = time.monotonic() - start
+            response = getattr(e, 'response', None)
+            self._record(
+                latency,
+                error=True,
+                # CASE: 4xx, the endpoint is up
+                failure=response is None or response.status_code >= 500 or
+                response.status_code == 429)
+            logger.warning(
+                "%s %s failed after %.3fs: %s", method, self.name, latency, e)
+            raise
+        latency = time.monotonic() - start
+        self._record(latency)
+        logger.debug("%s %s took %.3fs", method, self.name, latency)
+        return response
+
+    def is_open(self) -> bool:
+        # CASE: Once the reset timeout passes, calls go through again and the
+        # first failure reopens the circuit
+        return time.monotonic() < self._open_until
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'circuit_opened': self._circuit_opened,
+                'latency_seconds': self._latency_seconds,
+                'circuit_open': self.is_open(),
+            }
+
+    def _record(
+        self,
+        latency: float,
+        error: bool = False,
+        failure: bool = False,
+    ) -> None:
+        by_endpoint = (('endpoint', self.name),)
+        increments = {
+            ('marinanet_integration_requests_total', by_endpoint): 1,
+            ('marinanet_integration_latency_seconds_total', by_endpoint):
+                latency,
+        }
+        if error:
+            increments[
+                ('marinanet_integration_errors_total', by_endpoint)] = 1
+        with self._lock:
+            self._requests += 1
+            self._latency_seconds += latency
+            if error:
+                self._errors += 1
+            if not error:
+                self._failures = 0
+            elif failure:
+                self._failures += 1
+            if failure and self._failures >= CIRCUIT_FAILURE_THRESHOLD:
+                if not self.is_open():
+                    self._circuit_opened += 1
+                    increments[('marinanet_integration_circuit_opened_total',
+                                by_endpoint)] = 1
+                    logger.error(
+                        "Opening circuit for %s after %d failures",
+                        self.name, self._failures)
+                self._open_until = time.monotonic() + CIRCUIT_RESET_TIMEOUT
+        increment_metrics(increments)
+
+
+def get_endpoint_metrics() -> dict[str, dict]:
+    """Totals since the process started, by endpoint name"""
+    return {
+        name: endpoint.get_metrics()
+        for name, endpoint in sorted(_endpoints.items())}
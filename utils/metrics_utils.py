@@ -0,0 +1,48 @@
+import json
+import logging
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of metric totals, shared by every worker process so a scrape
+# of any one worker sees the whole server
+METRICS_KEY = 'marinanet:metrics'
+
+# A metric sample: (name, ((label, value), ...))
+MetricKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def increment_metrics(increments: dict[MetricKey, float]) -> None:
+    """
+    Adds increments to the shared totals in one round trip
+    * Failures are logged, recording metrics never fails the caller
+    """
+    if not increments:
+        return
+    try:
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for key, value in increments.items():
+            pipeline.hincrbyfloat(METRICS_KEY, _encode_key(key), value)
+        pipeline.execute()
+    except RedisError:
+        logger.warning("Could not record metrics", exc_info=True)
+
+
+def get_metric_totals() -> dict[MetricKey, float]:
+    """Totals of every process since the hash was created"""
+    return {
+        _decode_key(field): float(value)
+        for field, value in get_redis_connection().hgetall(
+            METRICS_KEY).items()}
+
+
+def _encode_key(key: MetricKey) -> str:
+    name, labels = key
+    return json.dumps([name, labels])
+
+
+def _decode_key(field) -> MetricKey:
+    name, labels = json.loads(field)
+    return name, tuple(tuple(label) for label in labels)
@@ -0,0 +1,142 @@
+from functools import lru_cache
+
+from django.db.models import Model, Prefetch, QuerySet
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+class PrefetchPlan:
+    """
+    Tree of lookups needed to serialize one model
+    * select_related: chains of single-valued relations from this model
+    * prefetches: many-valued lookups (possibly reached through
+      single-valued relations), each with the plan for the related model
+    """
+
+    def __init__(self, model: type[Model]):
+        self.model = model
+        self.select_related = set()
+        self.prefetches = {}
+
+    def apply(self, queryset: QuerySet) -> QuerySet:
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetches:
+            queryset = queryset.prefetch_related(*[
+                Prefetch(lookup, queryset=plan.apply(
+                    plan.model._default_manager.all()))
+                for lookup, plan in sorted(self.prefetches.items())
+            ])
+        return queryset
+
+
+def prefetch_for_serializer(
+    queryset: QuerySet,
+    serializer_class: type[serializers.BaseSerializer],
+) -> QuerySet:
+    """
+    Applies the select_related / prefetch_related lookups that
+    serializer_class will traverse when serializing instances of queryset
+    """
+    plan = get_prefetch_plan(serializer_class, queryset.model)
+    return plan.apply(queryset)
+
+
+@lru_cache(maxsize=None)
+def get_prefetch_plan(
+    serializer_class: type[serializers.BaseSerializer],
+    model: type[Model],
+) -> PrefetchPlan:
+    plan = PrefetchPlan(model)
+    _plan_serializer(plan, serializer_class(), [])
+    return plan
+
+
+def _plan_serializer(
+    plan: PrefetchPlan,
+    serializer: serializers.BaseSerializer,
+    prefix: list[str],
+) -> None:
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            # Unknown attribute access, cannot be planned
+            continue
+        attrs = prefix + list(field.source_attrs)
+
+        if isinstance(field, serializers.ListSerializer):
+            _plan_path(plan, attrs, field.child)
+        elif isinstance(field, serializers.BaseSerializer):
+            path_plan, path = _plan_path(plan, attrs, None)
+            if path_plan is plan and path == attrs:
+                _plan_serializer(plan, field, attrs)
+        elif isinstance(field, ManyRelatedField):
+            _plan_path(plan, attrs, None)
+        elif isinstance(field, RelatedField):
+            # Related fields only read the foreign key column
+            _plan_path(plan, attrs[:-1], None)
+        else:
+            _plan_path(plan, attrs, None)
+
+
+def _plan_path(
+    plan: PrefetchPlan,
+    attrs: list[str],
+    child_serializer,
+):
+    """
+    Walks attrs from plan.model, recording the relations crossed
+    Returns the plan the walk ended on and the relation path within it
+    """
+    model = plan.model
+    path = []
+    for i, attr in enumerate(attrs):
+        relation = _get_relations(model).get(attr)
+        if relation is None:
+            break
+
+        if relation.many_to_one or relation.one_to_one:
+            path.append(attr)
+            model = relation.related_model
+            continue
+
+        # CASE: Many-valued relation, needs its own query
+        lookup = '__'.join(path + [attr])
+        if path:
+            plan.select_related.add('__'.join(path))
+        child_plan = plan.prefetches.setdefault(
+            lookup, PrefetchPlan(relation.related_model))
+        remaining = attrs[i + 1:]
+        if child_serializer is not None and not remaining:
+            _plan_serializer(child_plan, child_serializer, [])
+        return child_plan, remaining
+
+    if path:
+        plan.select_related.add('__'.join(path))
+    return plan, path
+
+
+@lru_cache(maxsize=None)
+def _get_relations(model: type[Model]) -> dict:
+    """Maps attribute names on model instances to relation fields"""
+    relations = {}
+    for field in model._meta.get_fields():
+        if not field.is_relation or field.related_model is None:
+            continue
+        if field.auto_created and not field.concrete:
+            relations[field.get_accessor_name()] = field
+        else:
+            relations[field.name] = field
+    return relations
+
+
+class PrefetchPlannedMixin:
+    """
+    Generic view mixin that prefetches everything the view's serializer
+    reads, so nested serializers do not issue a query per row
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return prefetch_for_serializer(queryset, self.get_serializer_class())
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class VesselReportingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vesselreporting"
+
+    def ready(self):
+        from vesselreporting import signals  # noqa: F401
@@ -0,0 +1,104 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.permissions import IsAuthenticated
+
+from core.access import get_request_ships
+from core.async_views import AsyncReadAPIView
+from core.models import Ship
+from core.permissions import HasShipAccess
+from core.response_cache import AccessibleShipsCachedResponseMixin
+from utils.prefetch_utils import prefetch_for_serializer
+from vesselreporting.logic.serializer_map import get_serializer_from_report_type
+from vesselreporting.logic.stats_logic import get_ship_daily_stats
+from vesselreporting.models.report_models import ReportHeader, VoyageLegData
+from vesselreporting.serializers.model_serializers import (
+    VoyageLegDataSerializer,
+)
+from vesselreporting.serializers.stats_serializers import (
+    ShipDailyStatSerializer,
+    ShipOverviewSerializer,
+)
+from vesselreporting.views import get_stats_window
+
+""" ASYNC READ VIEWS
+Async counterparts of the dashboard's polled endpoints, served under
+marinanet/async/ with the same responses as the sync views
+"""
+
+
+async def aget_ship_or_404(imo_reg: int) -> Ship:
+    try:
+        return await Ship.objects.aget(imo_reg=imo_reg)
+    except Ship.DoesNotExist:
+        raise Http404
+
+
+class ShipsOverviewAsyncView(AccessibleShipsCachedResponseMixin,
+                             AsyncReadAPIView):
+    """See ShipsOverviewListView"""
+
+    async def get_data(self, request):
+        accessible_ships = await sync_to_async(get_request_ships)(request)
+        queryset = prefetch_for_serializer(
+            Ship.objects.filter(id__in=accessible_ships.ids),
+            ShipOverviewSerializer)
+        ships = [ship async for ship in queryset]
+        return await self.serialize(ShipOverviewSerializer, ships, many=True)
+
+
+class ReportPrefillAsyncView(AsyncReadAPIView):
+    """See ReportPrefillView"""
+    permission_classes = [IsAuthenticated, HasShipAccess]
+
+    async def get_data(self, request, imo_reg):
+        ship = await aget_ship_or_404(imo_reg)
+        queryset = prefetch_for_serializer(
+            VoyageLegData.objects.filter(voyage_leg__voyage__ship=ship),
+            VoyageLegDataSerializer,
+        ).prefetch_related(
+            'voyage_leg__accumulators',
+        )
+        voyage_leg_data = await queryset.order_by('-modified_at').afirst()
+        if voyage_leg_data is None:
+            voyage_leg_data = {}
+        return await self.serialize(VoyageLegDataSerializer, voyage_leg_data)
+
+
+class DailyStatsAsyncView(AsyncReadAPIView):
+    """See DailyStatsList"""
+    permission_classes = [IsAuthenticated, HasShipAccess]
+
+    def get_cache_ship_ids(self):
+        # CASE: Stats are also rebuilt by backfill_ship_daily_stats, which
+        # does not bump ship versions
+        return None
+
+    async def get_data(self, request, imo_reg):
+        days = get_stats_window(request)
+        ship = await aget_ship_or_404(imo_reg)
+        daily_stats = [
+            daily_stat
+            async for daily_stat in get_ship_daily_stats(ship, days)]
+        return await self.serialize(
+            ShipDailyStatSerializer, daily_stats, many=True)
+
+
+class ReportDetailAsyncView(AsyncReadAPIView):
+    """See ReportDetail"""
+
+    def get_cache_ship_ids(self):
+        ship_id = ReportHeader.objects.filter(
+            uuid=self.kwargs['uuid'],
+        ).values_list(
+            'ship_id', flat=True,
+        ).first()
+        return [ship_id] if ship_id is not None else None
+
+    async def get_data(self, request, uuid):
+        try:
+            report_header = await ReportHeader.objects.aget(uuid=uuid)
+        except ReportHeader.DoesNotExist:
+            raise Http404
+        serializer_class = get_serializer_from_report_type(
+            report_header.report_type)
+        return await self.serialize(serializer_class, report_header)
@@ -155,6 +155,20 @@ class TotalConsumptionType(models.TextChoices):
     PORT_TO_PORT = "PORT_TO_PORT", _("Port to Port")
 
 
+class LegSubstance(models.TextChoices):
+    FUEL_OIL = "FO", _("Fuel Oil")
+    LUBRICATING_OIL = "LO", _("Lubricating Oil")
+    FRESH_WATER = "FW", _("Fresh Water")
+
+
+class LegQuantity(models.TextChoices):
+    CONSUMPTION = "CONSUMPTION", _("Consumption")
+    RECEIPT = "RECEIPT", _("Receipt")
+    DEBUNKERING = "DEBUNKERING", _("Debunkering")
+    GENERATION = "GENERATION", _("Generation")
+    DISCHARGE = "DISCHARGE", _("Discharge")
+
+
 class ActualPerformanceType(models.TextChoices):
     PILOT_TO_PILOT = "PILOT_TO_PILOT", _("Pilot to Pilot")
     PORT_TO_PORT = "PORT_TO_PORT", _("Port to Port")
@@ -0,0 +1,49 @@
+from datetime import datetime, time, timezone
+
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class DateRangeFilter(BaseFilterBackend):
+    """
+    Filters on the view's `date_range_field` with `since` (inclusive) and
+    `until` (exclusive) query params
+    Accepts ISO 8601 datetimes or dates, naive values are taken as UTC
+    """
+    since_query_param = 'since'
+    until_query_param = 'until'
+
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, 'date_range_field', None)
+        if field is None:
+            return queryset
+
+        since = self.get_datetime(request, self.since_query_param)
+        if since is not None:
+            queryset = queryset.filter(**{'{}__gte'.format(field): since})
+        until = self.get_datetime(request, self.until_query_param)
+        if until is not None:
+            queryset = queryset.filter(**{'{}__lt'.format(field): until})
+        return queryset
+
+    def get_datetime(self, request, param: str):
+        value = request.query_params.get(param)
+        if not value:
+            return None
+
+        try:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                parsed_date = parse_date(value)
+                if parsed_date is not None:
+                    parsed = datetime.combine(parsed_date, time.min)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError(
+                {param: 'Expected an ISO 8601 date or datetime.'})
+
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
@@ -0,0 +1,240 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction
+
+from vesselreporting.enums import (
+    LegQuantity,
+    LegSubstance,
+    ReportType,
+    TotalConsumptionType,
+)
+from vesselreporting.models.report_models import (
+    ConsumptionConditionData,
+    ReportHeader,
+    VoyageLeg,
+    VoyageLegAccumulator,
+)
+
+# Report types whose fuel oil consumption counts towards each phase
+FUEL_OIL_CONSUMPTION_PHASES = {
+    TotalConsumptionType.PORT_TO_PORT: (
+        ReportType.DEP_COSP,
+        ReportType.NOON,
+        ReportType.ARR_SBY,
+        ReportType.ARR_FWE,
+    ),
+    TotalConsumptionType.PILOT_TO_PILOT: (
+        ReportType.NOON,
+        ReportType.ARR_SBY,
+    ),
+    TotalConsumptionType.IN_HARBOUR_PORT: (
+        ReportType.EVENT_HARBOUR,
+        ReportType.EVENT_PORT,
+        ReportType.NOON_HARBOUR,
+        ReportType.NOON_PORT,
+    ),
+}
+IN_HARBOUR_PORT_REPORT_TYPES = \
+    FUEL_OIL_CONSUMPTION_PHASES[TotalConsumptionType.IN_HARBOUR_PORT]
+
+# Columns identifying an accumulator within a leg, in key tuple order
+ACCUMULATOR_KEY_FIELDS = (
+    'phase', 'substance', 'oil_type', 'quantity', 'consumer')
+
+# VoyageLegData field -> (phase, substance, quantity) it used to total
+LEG_DATA_TOTAL_FIELDS = {
+    'fuel_oil_cons_port_to_port': (
+        TotalConsumptionType.PORT_TO_PORT,
+        LegSubstance.FUEL_OIL,
+        LegQuantity.CONSUMPTION),
+    'fuel_oil_cons_pilot_to_pilot': (
+        TotalConsumptionType.PILOT_TO_PILOT,
+        LegSubstance.FUEL_OIL,
+        LegQuantity.CONSUMPTION),
+    'fuel_oil_cons_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FUEL_OIL,
+        LegQuantity.CONSUMPTION),
+    'fuel_oil_receipt_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FUEL_OIL,
+        LegQuantity.RECEIPT),
+    'fuel_oil_debunker_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FUEL_OIL,
+        LegQuantity.DEBUNKERING),
+    'lube_oil_cons_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.LUBRICATING_OIL,
+        LegQuantity.CONSUMPTION),
+    'lube_oil_receipt_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.LUBRICATING_OIL,
+        LegQuantity.RECEIPT),
+    'lube_oil_debunker_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.LUBRICATING_OIL,
+        LegQuantity.DEBUNKERING),
+    'freshwater_cons_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FRESH_WATER,
+        LegQuantity.CONSUMPTION),
+    'freshwater_gen_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FRESH_WATER,
+        LegQuantity.GENERATION),
+    'freshwater_receipt_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FRESH_WATER,
+        LegQuantity.RECEIPT),
+    'freshwater_discharge_in_harbour_port': (
+        TotalConsumptionType.IN_HARBOUR_PORT,
+        LegSubstance.FRESH_WATER,
+        LegQuantity.DISCHARGE),
+}
+_LEG_DATA_TOTAL_FIELDS_BY_KEY = {
+    key: field for field, key in LEG_DATA_TOTAL_FIELDS.items()}
+
+
+def get_report_increments(
+    report_header: ReportHeader,
+    ccdata: ConsumptionConditionData,
+) -> dict[tuple, Decimal]:
+    """
+    Amounts one report adds to its leg's accumulators
+    Keyed by (phase, substance, oil_type, quantity, consumer)
+    """
+    increments = defaultdict(Decimal)
+    report_type = report_header.report_type
+    in_harbour_port = report_type in IN_HARBOUR_PORT_REPORT_TYPES
+    fo_phases = [
+        phase for phase, report_types in FUEL_OIL_CONSUMPTION_PHASES.items()
+        if report_type in report_types]
+
+    for fuel_oil_data in ccdata.fueloildata_set.all():
+        fo_type = fuel_oil_data.fuel_oil_type
+        for phase in fo_phases:
+            for consumer, val in fuel_oil_data.breakdown.items():
+                if val is None:
+                    continue
+                increments[(phase, LegSubstance.FUEL_OIL, fo_type,
+                            LegQuantity.CONSUMPTION, consumer)] += \
+                    Decimal(str(val))
+        if in_harbour_port:
+            _add_increments(
+                increments, LegSubstance.FUEL_OIL, fo_type, {
+                    LegQuantity.RECEIPT: fuel_oil_data.receipt,
+                    LegQuantity.DEBUNKERING: fuel_oil_data.debunkering,
+                })
+
+    if not in_harbour_port:
+        return dict(increments)
+
+    for lube_oil_data in ccdata.lubricatingoildata_set.all():
+        _add_increments(
+            increments,
+            LegSubstance.LUBRICATING_OIL,
+            lube_oil_data.lubricating_oil_type, {
+                LegQuantity.CONSUMPTION: lube_oil_data.total_consumption,
+                LegQuantity.RECEIPT: lube_oil_data.receipt,
+                LegQuantity.DEBUNKERING: lube_oil_data.debunkering,
+            })
+
+    fw_data = ccdata.freshwaterdata
+    _add_increments(
+        increments, LegSubstance.FRESH_WATER, '', {
+            LegQuantity.CONSUMPTION: fw_data.consumed,
+            LegQuantity.GENERATION: fw_data.generated,
+            LegQuantity.RECEIPT: fw_data.received,
+            LegQuantity.DISCHARGE: fw_data.discharged,
+        })
+    return dict(increments)
+
+
+def _add_increments(increments, substance, oil_type, values: dict) -> None:
+    for quantity, val in values.items():
+        increments[(TotalConsumptionType.IN_HARBOUR_PORT, substance,
+                    oil_type, quantity, '')] += Decimal(val)
+
+
+def increment_leg_accumulators(
+    voyage_leg_id: int,
+    increments: dict[tuple, Decimal],
+) -> None:
+    """
+    Adds increments to a leg's accumulators in a single upsert
+    * Only the touched rows are locked, and always in the same order,
+      so concurrent reports for a leg neither lose updates nor deadlock
+    """
+    if not increments:
+        return
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(VoyageLegAccumulator._meta.db_table)
+    key_columns = ['voyage_leg_id'] + list(ACCUMULATOR_KEY_FIELDS)
+    columns = key_columns + ['value']
+    row_placeholder = '({})'.format(', '.join(['%s'] * len(columns)))
+
+    params = []
+    for key, value in sorted(increments.items()):
+        params.extend((voyage_leg_id, *map(str, key), value))
+
+    sql = (
+        'INSERT INTO {table} ({columns}) VALUES {rows} '
+        'ON CONFLICT ({key_columns}) '
+        'DO UPDATE SET value = {table}.value + EXCLUDED.value'
+    ).format(
+        table=table,
+        columns=', '.join(quote_name(c) for c in columns),
+        rows=', '.join([row_placeholder] * len(increments)),
+        key_columns=', '.join(quote_name(c) for c in key_columns),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+@transaction.atomic(savepoint=False)
+def replace_leg_accumulators(
+    voyage_leg: VoyageLeg,
+    totals: dict[tuple, Decimal],
+) -> None:
+    """Overwrites a leg's accumulators with totals computed from scratch"""
+    VoyageLegAccumulator.objects.filter(voyage_leg=voyage_leg).delete()
+    VoyageLegAccumulator.objects.bulk_create([
+        VoyageLegAccumulator(
+            voyage_leg=voyage_leg,
+            value=value,
+            **dict(zip(ACCUMULATOR_KEY_FIELDS, key)))
+        for key, value in sorted(totals.items())
+    ])
+
+
+def get_leg_data_totals(
+    accumulators: Iterable[VoyageLegAccumulator],
+) -> dict:
+    """
+    Leg totals in the shape of the old VoyageLegData fields
+    * Fuel oil consumption: {fuel type: {consumer: value}}
+    * Other oil totals: {oil type: value}
+    * Fresh water totals: int
+    """
+    totals = {}
+    for field, (_, substance, _) in LEG_DATA_TOTAL_FIELDS.items():
+        totals[field] = 0 if substance == LegSubstance.FRESH_WATER else {}
+
+    for accumulator in accumulators:
+        field = _LEG_DATA_TOTAL_FIELDS_BY_KEY.get((
+            accumulator.phase, accumulator.substance, accumulator.quantity))
+        if field is None:
+            continue
+        if accumulator.substance == LegSubstance.FRESH_WATER:
+            totals[field] += int(accumulator.value)
+        elif accumulator.quantity == LegQuantity.CONSUMPTION and \
+                accumulator.substance == LegSubstance.FUEL_OIL:
+            totals[field].setdefault(accumulator.oil_type, {})[
+                accumulator.consumer] = str(accumulator.value)
+        else:
+            totals[field][accumulator.oil_type] = str(accumulator.value)
+    return totals
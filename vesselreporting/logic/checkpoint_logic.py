@@ -0,0 +1,84 @@
+from copy import deepcopy
+from decimal import Decimal
+
+from vesselreporting.logic.accumulator_logic import (
+    ACCUMULATOR_KEY_FIELDS,
+    LEG_DATA_TOTAL_FIELDS,
+)
+from vesselreporting.models.report_models import (
+    ReportHeader,
+    VoyageLegAccumulator,
+    VoyageLegCheckpoint,
+    VoyageLegData,
+)
+
+# Reports between checkpoints along a leg's chain, which bounds how many
+# reports a recompute replays
+LEG_CHECKPOINT_INTERVAL = 16
+
+# VoyageLegData fields that are not folded from reports
+_UNFOLDED_FIELDS = {
+    'id',
+    'uuid',
+    'created_at',
+    'modified_at',
+    'voyage_leg',
+    'propeller_pitch',
+    *LEG_DATA_TOTAL_FIELDS,
+}
+
+
+def get_folded_fields() -> list:
+    return [
+        field for field in VoyageLegData._meta.concrete_fields
+        if field.name not in _UNFOLDED_FIELDS]
+
+
+def make_checkpoint(
+    report_header: ReportHeader,
+    leg_data: VoyageLegData,
+    totals: dict,
+) -> VoyageLegCheckpoint:
+    return VoyageLegCheckpoint(
+        report_header=report_header,
+        leg_data={
+            field.attname: deepcopy(field.value_from_object(leg_data))
+            for field in get_folded_fields()},
+        totals=[[*key, value] for key, value in sorted(totals.items())],
+    )
+
+
+def load_checkpoint(
+    leg_data: VoyageLegData,
+    totals: dict,
+    checkpoint: VoyageLegCheckpoint,
+) -> None:
+    for field in get_folded_fields():
+        if field.attname in checkpoint.leg_data:
+            setattr(leg_data, field.attname,
+                    field.to_python(checkpoint.leg_data[field.attname]))
+    for *key, value in checkpoint.totals:
+        totals[tuple(key)] = Decimal(value)
+
+
+def checkpoint_leg_data(report_header: ReportHeader) -> VoyageLegCheckpoint:
+    """
+    Writes or refreshes report_header's checkpoint from the leg's stored
+    VoyageLegData and accumulators
+    * Call right after the report is applied, in the same transaction
+    """
+    voyage_leg_id = report_header.voyage_leg_id
+    leg_data = VoyageLegData.objects.get(voyage_leg_id=voyage_leg_id)
+    totals = {
+        tuple(getattr(accumulator, field)
+              for field in ACCUMULATOR_KEY_FIELDS): accumulator.value
+        for accumulator in VoyageLegAccumulator.objects.filter(
+            voyage_leg_id=voyage_leg_id)}
+    checkpoint = make_checkpoint(report_header, leg_data, totals)
+    VoyageLegCheckpoint.objects.update_or_create(
+        report_header=report_header,
+        defaults={
+            'leg_data': checkpoint.leg_data,
+            'totals': checkpoint.totals,
+        })
+    return checkpoint
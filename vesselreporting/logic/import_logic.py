@@ -0,0 +1,157 @@
+import json
+from typing import Iterable, Iterator
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+
+from carboncalc.logic.ytd_cii_logic import rebuild_cii_year_to_date
+from core.models import Ship
+from vesselreporting.enums import ReportType
+from vesselreporting.logic.recompute_logic import recompute_voyage_leg
+from vesselreporting.logic.report_logic import ReportRowBatch
+from vesselreporting.logic.serializer_map import get_serializer_from_report_type
+from vesselreporting.logic.stats_logic import rebuild_ship_daily_stats
+from vesselreporting.logic.voyage_logic import set_latest_leg_for_ship
+from vesselreporting.models.report_models import (
+    Voyage,
+    VoyageLeg,
+    VoyageLegProgress,
+)
+
+# Reports written per flush of the row batch
+IMPORT_BATCH_SIZE = 200
+# Rows per INSERT statement within a flush
+IMPORT_INSERT_BATCH_SIZE = 1000
+# Validation errors collected before an import is abandoned
+IMPORT_MAX_ERRORS = 50
+
+
+def iter_ndjson(lines: Iterable) -> Iterator[tuple[int, dict]]:
+    """
+    Yields (line number, record) for each non-blank line of an NDJSON stream
+    """
+    for line_num, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            raise ValidationError({line_num: 'Invalid JSON: {}'.format(e)})
+        if not isinstance(record, dict):
+            raise ValidationError({line_num: 'Expected a JSON object.'})
+        yield line_num, record
+
+
+@transaction.atomic
+def import_reports(ship: Ship, records: Iterable[tuple[int, dict]]) -> dict:
+    """
+    Imports a ship's historical reports, in chronological order
+    * Records have the same shape as a ReportsList POST
+    * Rows are written in batches, leg data, progress and the ReportEdge
+      chain are recomputed once per leg at the end
+    * All or nothing, any invalid record rolls back the whole import
+    Returns counts of reports and legs imported
+    """
+    batch = ReportRowBatch(batch_size=IMPORT_INSERT_BATCH_SIZE)
+    voyages = {}
+    legs = {}
+    touched_legs = {}
+    errors = {}
+    report_count = 0
+
+    for line_num, record in records:
+        report_type = record.get('report_type')
+        serializer_class = get_serializer_from_report_type(report_type)
+        if serializer_class is None:
+            errors[line_num] = {'report_type': 'Unknown report type.'}
+        else:
+            try:
+                voyage_leg = _get_voyage_leg(
+                    ship, report_type, record.pop('voyage_leg', None),
+                    voyages, legs)
+            except ValidationError as e:
+                errors[line_num] = e.detail
+            else:
+                serializer = serializer_class(data=record)
+                if serializer.is_valid():
+                    if not errors:
+                        serializer.save(voyage_leg=voyage_leg, batch=batch)
+                    touched_legs.setdefault(voyage_leg.pk, voyage_leg)
+                    report_count += 1
+                else:
+                    errors[line_num] = serializer.errors
+
+        if len(errors) >= IMPORT_MAX_ERRORS:
+            break
+        if len(batch.report_headers) >= IMPORT_BATCH_SIZE:
+            batch.flush()
+
+    if errors:
+        raise ValidationError(errors)
+    batch.flush()
+
+    for voyage_leg in touched_legs.values():
+        recompute_voyage_leg(voyage_leg)
+    rebuild_ship_daily_stats([ship.pk])
+    rebuild_cii_year_to_date([ship.pk])
+    return {'reports': report_count, 'legs': len(touched_legs)}
+
+
+def _get_voyage_leg(
+    ship: Ship,
+    report_type: str,
+    voyage_leg_data,
+    voyages: dict,
+    legs: dict,
+) -> VoyageLeg:
+    """
+    Resolves a record's voyage leg the same way ReportsList.create does,
+    creating it for departure standby reports
+    """
+    if not isinstance(voyage_leg_data, dict):
+        raise ValidationError({'voyage_leg': 'This field is required.'})
+
+    leg_uuid = voyage_leg_data.get('uuid')
+    if leg_uuid is not None:
+        # CASE: Leg is referenced directly
+        key = str(leg_uuid)
+        if key not in legs:
+            try:
+                legs[key] = VoyageLeg.objects.select_related('voyage').get(
+                    uuid=leg_uuid, voyage__ship=ship)
+            except (VoyageLeg.DoesNotExist, DjangoValidationError):
+                raise ValidationError({'voyage_leg': 'Voyage leg not found.'})
+        return legs[key]
+
+    if report_type != ReportType.DEP_SBY:
+        raise ValidationError({'voyage_leg': 'Voyage leg uuid is required.'})
+
+    # CASE: Departure standby starts a leg of a voyage
+    voyage_uuid = (voyage_leg_data.get('voyage') or {}).get('uuid')
+    leg_num = voyage_leg_data.get('leg_num')
+    if voyage_uuid is None or leg_num is None:
+        raise ValidationError(
+            {'voyage_leg': 'Voyage uuid and leg_num are required.'})
+
+    voyage_key = str(voyage_uuid)
+    if voyage_key not in voyages:
+        try:
+            voyages[voyage_key] = Voyage.objects.get(
+                uuid=voyage_uuid, ship=ship)
+        except (Voyage.DoesNotExist, DjangoValidationError):
+            raise ValidationError({'voyage_leg': 'Voyage not found.'})
+    voyage = voyages[voyage_key]
+
+    key = (voyage_key, leg_num)
+    if key not in legs:
+        voyage_leg, created = VoyageLeg.objects.get_or_create(
+            voyage=voyage, leg_num=leg_num)
+        if created:
+            VoyageLegProgress.objects.create(voyage_leg=voyage_leg)
+            set_latest_leg_for_ship(voyage_leg)
+        legs[key] = voyage_leg
+    return legs[key]
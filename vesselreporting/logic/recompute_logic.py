@@ -0,0 +1,196 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from rest_framework.serializers import ValidationError
+
+from core.enums import Status
+from core.response_cache import bump_ship_version
+from vesselreporting.logic.accumulator_logic import (
+    get_report_increments,
+    replace_leg_accumulators,
+)
+from vesselreporting.logic.checkpoint_logic import (
+    LEG_CHECKPOINT_INTERVAL,
+    get_folded_fields,
+    load_checkpoint,
+    make_checkpoint,
+)
+from vesselreporting.logic.report_logic import (
+    apply_report_to_leg_data,
+    get_leg_data_sources,
+    get_leg_reports,
+    rebuild_leg_progress,
+)
+from vesselreporting.models.report_models import (
+    ReportEdge,
+    ReportHeader,
+    VoyageLeg,
+    VoyageLegCheckpoint,
+    VoyageLegData,
+)
+
+
+def get_leg_chain(voyage_leg: VoyageLeg) -> list[int]:
+    """Ids of a leg's reports in ReportEdge order"""
+    report_ids = list(ReportHeader.objects.filter(
+        voyage_leg=voyage_leg,
+    ).order_by(
+        'report_date', 'id',
+    ).values_list(
+        'id', flat=True,
+    ))
+    edges = ReportEdge.objects.filter(
+        next_report__voyage_leg=voyage_leg,
+    ).values_list(
+        'previous_report_id', 'next_report_id',
+    )
+    return order_leg_chain(report_ids, edges)
+
+
+def order_leg_chain(
+    report_ids: list[int],
+    edges: Iterable[tuple[Optional[int], int]],
+) -> list[int]:
+    """
+    Orders report ids by following (previous, next) edges
+    * report_ids: the leg's reports in report date order
+    * Reports the chain does not reach, e.g. past a missing edge, follow
+      in report date order
+    """
+    leg_report_ids = set(report_ids)
+    next_ids = {}
+    chained_ids = set()
+    for previous_id, next_id in edges:
+        if previous_id in leg_report_ids:
+            next_ids[previous_id] = next_id
+            chained_ids.add(next_id)
+
+    chain = []
+    visited = set()
+    heads = [pk for pk in report_ids if pk not in chained_ids]
+    for report_id in heads + report_ids:
+        while report_id in leg_report_ids and report_id not in visited:
+            visited.add(report_id)
+            chain.append(report_id)
+            report_id = next_ids.get(report_id)
+    return chain
+
+
+def fold_leg_reports(
+    leg_data: VoyageLegData,
+    totals: defaultdict,
+    reports: Iterable[ReportHeader],
+) -> None:
+    """
+    Folds reports, in order, into leg_data and the leg's running totals
+    * Reads only prefetched rows (see get_leg_reports) and saves nothing
+    * Voided (inactive) reports are skipped
+    """
+    for report_header in reports:
+        if report_header.status == Status.INACTIVE:
+            continue
+        sources = get_leg_data_sources(report_header)
+        ccdata = sources.get('consumption_condition_data')
+        if ccdata is not None:
+            increments = get_report_increments(report_header, ccdata)
+            for key, value in increments.items():
+                totals[key] += value
+        apply_report_to_leg_data(leg_data, report_header, **sources)
+
+
+@transaction.atomic
+def recompute_leg_data(
+    voyage_leg: VoyageLeg,
+    from_report: Optional[ReportHeader] = None,
+) -> VoyageLegData:
+    """
+    Refolds a leg's VoyageLegData and accumulators in ReportEdge order
+    * from_report: first changed report, otherwise the whole leg is replayed
+    * Replay starts after the closest checkpoint before from_report, so
+      a change to a recent report replays only the reports after it
+    """
+    leg_data = VoyageLegData.objects.select_for_update().filter(
+        voyage_leg=voyage_leg).first()
+    if leg_data is None:
+        leg_data = VoyageLegData(
+            voyage_leg=voyage_leg,
+            propeller_pitch=voyage_leg.voyage.ship.
+            shipspecs.propeller_pitch)
+
+    chain = get_leg_chain(voyage_leg)
+    start = 0
+    if from_report is not None:
+        if from_report.pk not in chain:
+            raise ValidationError("Report is not in this voyage leg!")
+        start = chain.index(from_report.pk)
+
+    totals = defaultdict(Decimal)
+    _reset_leg_data(leg_data)
+    checkpoint = _get_latest_checkpoint(chain[:start])
+    fold_start = 0
+    if checkpoint is not None:
+        load_checkpoint(leg_data, totals, checkpoint)
+        fold_start = chain.index(checkpoint.report_header_id) + 1
+
+    # Checkpoints past the replay start may no longer hold
+    replay_ids = chain[fold_start:]
+    VoyageLegCheckpoint.objects.filter(
+        report_header_id__in=replay_ids).delete()
+
+    reports = {
+        report_header.pk: report_header
+        for report_header in get_leg_reports(voyage_leg, replay_ids)}
+    checkpoints = []
+    for position in range(fold_start, len(chain)):
+        report_header = reports[chain[position]]
+        fold_leg_reports(leg_data, totals, [report_header])
+        # CASE: The report before the latest is always checkpointed, so a
+        # correction to the latest report replays just that report
+        if (position + 1) % LEG_CHECKPOINT_INTERVAL == 0 or \
+                position == len(chain) - 2:
+            checkpoints.append(
+                make_checkpoint(report_header, leg_data, totals))
+    VoyageLegCheckpoint.objects.bulk_create(checkpoints)
+
+    leg_data.save()
+    replace_leg_accumulators(voyage_leg, totals)
+    bump_ship_version(voyage_leg.voyage.ship_id)
+    return leg_data
+
+
+@transaction.atomic
+def recompute_voyage_leg(voyage_leg: VoyageLeg) -> VoyageLegData:
+    """
+    Rebuilds a leg's VoyageLegProgress and ReportEdge chain in report date
+    order, then refolds its leg data from the start
+    """
+    reports = list(ReportHeader.objects.filter(
+        voyage_leg=voyage_leg,
+    ).order_by(
+        'report_date', 'id',
+    ))
+    rebuild_leg_progress(voyage_leg, reports)
+    return recompute_leg_data(voyage_leg)
+
+
+def _reset_leg_data(leg_data: VoyageLegData) -> None:
+    for field in get_folded_fields():
+        setattr(leg_data, field.attname, field.get_default())
+
+
+def _get_latest_checkpoint(
+    report_ids: list[int],
+) -> Optional[VoyageLegCheckpoint]:
+    if not report_ids:
+        return None
+    checkpointed_ids = set(VoyageLegCheckpoint.objects.filter(
+        report_header_id__in=report_ids,
+    ).values_list(
+        'report_header_id', flat=True,
+    ))
+    for report_id in reversed(report_ids):
+        if report_id in checkpointed_ids:
+            return VoyageLegCheckpoint.objects.get(report_header_id=report_id)
+    return None
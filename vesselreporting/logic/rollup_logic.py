@@ -0,0 +1,111 @@
+from typing import Callable, Iterable, Optional
+
+from django.db import models, transaction
+
+from vesselreporting.models.report_models import (
+    ConsumptionConditionData,
+    DistanceTimeData,
+    ReportHeader,
+)
+
+BACKFILL_BATCH_SIZE = 500
+
+# (row, report header, distance time data, fuel oil data) -> None, adds one
+# report to a rollup row in place
+AddReport = Callable[
+    [models.Model, ReportHeader, Optional[DistanceTimeData], Iterable],
+    None]
+# report header -> the rollup row's key fields, e.g. ship_id and date
+GetRollupKey = Callable[[ReportHeader], dict]
+
+
+def update_report_rollup(
+    model: type[models.Model],
+    key: dict,
+    add_report: AddReport,
+    report_header: ReportHeader,
+    distance_time_data: Optional[DistanceTimeData] = None,
+    consumption_condition_data: Optional[ConsumptionConditionData] = None,
+) -> models.Model:
+    """
+    Adds a newly created report to the rollup row with these key fields
+    * Constant work per report, earlier reports are not read
+    * The row is locked so concurrent reports for the same row add up,
+      call in a transaction
+    """
+    row, _ = model.objects.select_for_update().get_or_create(**key)
+    fuel_oil_data_set = []
+    if consumption_condition_data is not None:
+        fuel_oil_data_set = consumption_condition_data.fueloildata_set.all()
+    add_report(row, report_header, distance_time_data, fuel_oil_data_set)
+    row.save()
+    return row
+
+
+@transaction.atomic
+def rebuild_report_rollups(
+    model: type[models.Model],
+    reports: models.QuerySet,
+    get_key: GetRollupKey,
+    add_report: AddReport,
+    ship_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """
+    Recomputes rollup rows by folding reports into one row per key
+    * reports: the ReportHeaders to fold in, oldest first
+    * ship_ids: limits the rebuild to these ships, otherwise all ships
+    Returns the number of rows written
+    """
+    reports = reports.select_related(
+        'distancetimedata',
+        'consumptionconditiondata',
+    ).prefetch_related(
+        'consumptionconditiondata__fueloildata_set',
+    ).order_by(
+        'report_date', 'id',
+    )
+    rows = model.objects.all()
+    if ship_ids is not None:
+        ship_ids = list(ship_ids)
+        reports = reports.filter(ship_id__in=ship_ids)
+        rows = rows.filter(ship_id__in=ship_ids)
+
+    rows_by_key = fold_reports(
+        reports.iterator(chunk_size=BACKFILL_BATCH_SIZE),
+        model, get_key, add_report)
+
+    rows.delete()
+    model.objects.bulk_create(
+        rows_by_key.values(), batch_size=BACKFILL_BATCH_SIZE)
+    return len(rows_by_key)
+
+
+def fold_reports(
+    reports: Iterable[ReportHeader],
+    model: type[models.Model],
+    get_key: GetRollupKey,
+    add_report: AddReport,
+) -> dict[tuple, models.Model]:
+    """
+    Unsaved rollup rows by key, with every report added to its row
+    Reports need distancetimedata and consumptionconditiondata with its
+    fueloildata_set prefetched, see rebuild_report_rollups
+    """
+    rows_by_key = {}
+    for report_header in reports:
+        key = get_key(report_header)
+        row_key = tuple(key.values())
+        if row_key not in rows_by_key:
+            rows_by_key[row_key] = model(**key)
+
+        distance_time_data = getattr(report_header, 'distancetimedata', None)
+        ccdata = getattr(report_header, 'consumptionconditiondata', None)
+        fuel_oil_data_set = []
+        if ccdata is not None:
+            fuel_oil_data_set = ccdata.fueloildata_set.all()
+        add_report(
+            rows_by_key[row_key],
+            report_header,
+            distance_time_data,
+            fuel_oil_data_set)
+    return rows_by_key
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from vesselreporting.enums import ReportType
+from vesselreporting.logic.rollup_logic import (
+    rebuild_report_rollups,
+    update_report_rollup,
+)
+from vesselreporting.models.report_models import (
+    ConsumptionConditionData,
+    DistanceTimeData,
+    ReportHeader,
+    ShipDailyStat,
+)
+
+STATS_WINDOWS = (7, 30, 90, 365)
+DEFAULT_STATS_WINDOW = 7
+# Bunker delivery notes are not position reports, they are left out of
+# report counts and the last report of the day
+DAILY_STAT_EXCLUDED_REPORT_TYPES = (ReportType.BDN,)
+# Largest speed (knots) ShipDailyStat.speed can store
+MAX_DAILY_STAT_SPEED = Decimal("999.99")
+
+
+def get_stat_date(report_date: datetime) -> date:
+    return report_date.astimezone(timezone.utc).date()
+
+
+@transaction.atomic(savepoint=False)
+def update_ship_daily_stat(
+    report_header: ReportHeader,
+    distance_time_data: Optional[DistanceTimeData] = None,
+    consumption_condition_data: Optional[ConsumptionConditionData] = None,
+) -> Optional[ShipDailyStat]:
+    """
+    Adds a newly created report to its ship's rollup for the UTC day
+    The row is locked so concurrent reports for the same day add up
+    """
+    if report_header.report_type in DAILY_STAT_EXCLUDED_REPORT_TYPES:
+        return None
+    return update_report_rollup(
+        ShipDailyStat,
+        _get_stat_key(report_header),
+        _add_report_to_stat,
+        report_header,
+        distance_time_data=distance_time_data,
+        consumption_condition_data=consumption_condition_data)
+
+
+def rebuild_ship_daily_stats(ship_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recomputes rollups from the reports themselves
+    * ship_ids: limits the rebuild to these ships, otherwise all ships
+    Returns the number of rows written
+    """
+    return rebuild_report_rollups(
+        ShipDailyStat,
+        ReportHeader.objects.exclude(
+            report_type__in=DAILY_STAT_EXCLUDED_REPORT_TYPES),
+        _get_stat_key,
+        _add_report_to_stat,
+        ship_ids=ship_ids)
+
+
+def get_ship_daily_stats(ship, days: int = DEFAULT_STATS_WINDOW):
+    """Daily rollups for the last `days` UTC days, newest first"""
+    today = datetime.now(timezone.utc).date()
+    return ShipDailyStat.objects.filter(
+        ship=ship,
+        date__gt=today - timedelta(days=days),
+    ).order_by(
+        '-date',
+    )
+
+
+def _get_stat_key(report_header: ReportHeader) -> dict:
+    return {
+        'ship_id': report_header.ship_id,
+        'date': get_stat_date(report_header.report_date),
+    }
+
+
+def _add_report_to_stat(
+    stat: ShipDailyStat,
+    report_header: ReportHeader,
+    distance_time_data: Optional[DistanceTimeData],
+    fuel_oil_data_set,
+) -> None:
+    # CASE: Reports can arrive out of order, only the latest one for the
+    # day sets point-in-time values (distance to go, ROB)
+    is_latest = (stat.last_report_date is None or
+                 report_header.report_date >= stat.last_report_date)
+
+    stat.report_count += 1
+    if is_latest:
+        stat.last_report_type = report_header.report_type
+        stat.last_report_date = report_header.report_date
+
+    if distance_time_data is not None:
+        stat.hours += distance_time_data.hours_since_last
+        stat.distance_observed += \
+            distance_time_data.distance_observed_since_last
+        stat.distance_engine += distance_time_data.distance_engine_since_last
+        if is_latest or stat.distance_to_go is None:
+            stat.distance_to_go = distance_time_data.distance_to_go
+        if stat.hours > 0:
+            speed = (stat.distance_observed / stat.hours).quantize(
+                Decimal("0.01"))
+            # CASE: Minutes of sailing can give a speed the column cannot
+            # hold, the day has no speed until more hours are reported
+            stat.speed = speed if speed <= MAX_DAILY_STAT_SPEED else None
+
+    for fuel_oil_data in fuel_oil_data_set:
+        fo_stats = stat.fuel_oil_stats.setdefault(
+            fuel_oil_data.fuel_oil_type,
+            {'total_consumption': Decimal("0.00"), 'rob': None})
+        fo_stats['total_consumption'] = \
+            Decimal(fo_stats['total_consumption']) + \
+            fuel_oil_data.total_consumption
+        if is_latest or fo_stats['rob'] is None:
+            fo_stats['rob'] = fuel_oil_data.rob
@@ -0,0 +1,145 @@
+from datetime import timedelta
+from typing import Optional
+
+from core.models import Ship
+from vesselreporting.models.report_models import (
+    ReportEdge,
+    ReportHeader,
+)
+
+TIMELINE_BACKWARD = 'backward'
+TIMELINE_FORWARD = 'forward'
+TIMELINE_DIRECTIONS = (TIMELINE_BACKWARD, TIMELINE_FORWARD)
+DEFAULT_TIMELINE_LIMIT = 50
+MAX_TIMELINE_LIMIT = 500
+# Consecutive reports further apart than this are flagged as a gap,
+# noon reports are at most a day plus a time zone change apart
+TIMELINE_GAP_HOURS = 25
+
+# (edge column joined on the current report, edge column stepped to)
+_TIMELINE_STEPS = {
+    TIMELINE_BACKWARD: ('next_report_id', 'previous_report_id'),
+    TIMELINE_FORWARD: ('previous_report_id', 'next_report_id'),
+}
+
+
+def get_timeline(
+    ship: Ship,
+    start_uuid: Optional[str] = None,
+    direction: str = TIMELINE_BACKWARD,
+    limit: int = DEFAULT_TIMELINE_LIMIT,
+) -> dict:
+    """
+    Walks a ship's ReportEdge chain from a report, in one recursive query
+    * start_uuid: first report, inclusive, otherwise the ship's latest
+    * direction: backward (older reports) or forward (newer reports)
+    Returns the reports in walk order, gaps and forks among them, and the
+    report to continue from (None at the end of the chain)
+    """
+    reports = list(ReportHeader.objects.raw(
+        *_get_timeline_query(ship, start_uuid, direction, limit)))
+    next_report = None
+    if len(reports) > limit:
+        next_report = reports.pop()
+    return {
+        'reports': reports,
+        'gaps': find_timeline_gaps(reports, direction),
+        'forks': find_timeline_forks(ship, reports),
+        'next': next_report.uuid if next_report is not None else None,
+    }
+
+
+def _get_timeline_query(
+    ship: Ship,
+    start_uuid: Optional[str],
+    direction: str,
+    limit: int,
+) -> tuple[str, list]:
+    join_column, step_column = _TIMELINE_STEPS[direction]
+    tables = {
+        'reports': ReportHeader._meta.db_table,
+        'edges': ReportEdge._meta.db_table,
+    }
+
+    if start_uuid is not None:
+        seed = (
+            'SELECT r.id FROM {reports} r '
+            'WHERE r.uuid = %s AND r.ship_id = %s'
+        ).format(**tables)
+        params = [start_uuid, ship.pk]
+    else:
+        # CASE: The latest leg may have no reports yet, the walk starts
+        # from the ship's latest report on any leg
+        seed = (
+            'SELECT r.id FROM {reports} r '
+            'WHERE r.ship_id = %s '
+            'ORDER BY r.report_date DESC, r.id DESC LIMIT 1'
+        ).format(**tables)
+        params = [ship.pk]
+
+    # Edge columns are one-to-one, so each step is a unique index lookup
+    sql = (
+        'WITH RECURSIVE timeline (report_id, depth) AS ('
+        ' SELECT seed.id, 0 FROM ({seed}) AS seed (id)'
+        ' UNION ALL'
+        ' SELECT e.{step_column}, t.depth + 1'
+        ' FROM timeline t'
+        ' JOIN {edges} e ON e.{join_column} = t.report_id'
+        ' WHERE t.depth < %s AND e.{step_column} IS NOT NULL'
+        ') '
+        'SELECT r.*, t.depth FROM timeline t '
+        'JOIN {reports} r ON r.id = t.report_id '
+        'ORDER BY t.depth'
+    ).format(
+        seed=seed,
+        join_column=join_column,
+        step_column=step_column,
+        **tables)
+    # One extra report tells whether the chain goes on
+    params.append(limit)
+    return sql, params
+
+
+def find_timeline_gaps(
+    reports: list[ReportHeader],
+    direction: str = TIMELINE_BACKWARD,
+) -> list[dict]:
+    """
+    Consecutive reports more than TIMELINE_GAP_HOURS apart
+    Negative hours mean the chain runs against report date order
+    """
+    gaps = []
+    for report, following in zip(reports, reports[1:]):
+        if direction == TIMELINE_BACKWARD:
+            previous_report, next_report = following, report
+        else:
+            previous_report, next_report = report, following
+        hours = (next_report.report_date - previous_report.report_date) / \
+            timedelta(hours=1)
+        if hours < 0 or hours > TIMELINE_GAP_HOURS:
+            gaps.append({
+                'previous_report': previous_report.uuid,
+                'next_report': next_report.uuid,
+                'hours': round(hours, 2),
+            })
+    return gaps
+
+
+def find_timeline_forks(ship: Ship, reports: list[ReportHeader]) -> list:
+    """
+    Uuids of the ship's reports dated within the timeline that the chain
+    does not pass through, i.e. branches cut off from the chain
+    """
+    if not reports:
+        return []
+    report_dates = [report.report_date for report in reports]
+    return list(ReportHeader.objects.filter(
+        ship=ship,
+        report_date__range=(min(report_dates), max(report_dates)),
+    ).exclude(
+        id__in=[report.id for report in reports],
+    ).order_by(
+        'report_date', 'id',
+    ).values_list(
+        'uuid', flat=True,
+    ))
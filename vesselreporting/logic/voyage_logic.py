@@ -2,6 +2,7 @@ from django.db import transaction
 from rest_framework.serializers import ValidationError
 
 from core.models import Ship
+from core.response_cache import bump_ship_version
 from vesselreporting.models.report_models import (
     Voyage,
     VoyageLeg,
@@ -55,6 +56,7 @@ def create_new_voyage_leg(
         # CASE: Voyage has no legs
         leg = VoyageLeg.objects.create(voyage=voyage, leg_num=leg_num)
         VoyageLegProgress.objects.create(voyage_leg=leg)
+        set_latest_leg_for_ship(leg)
         return leg
 
     if not last_leg.voyagelegprogress.arrival_fwe:
@@ -64,4 +66,20 @@ def create_new_voyage_leg(
     # CASE: Last leg is complete
     leg = VoyageLeg.objects.create(voyage=voyage, leg_num=leg_num)
     VoyageLegProgress.objects.create(voyage_leg=leg)
+    set_latest_leg_for_ship(leg)
     return leg
+
+
+def set_latest_leg_for_ship(
+    voyage_leg: VoyageLeg,
+) -> None:
+    """
+    Points the ship's denormalized latest_leg at a newly created leg
+    Used by the ships overview to avoid scanning every leg per ship
+    """
+    Ship.objects.filter(
+        pk=voyage_leg.voyage.ship_id,
+    ).update(
+        latest_leg=voyage_leg,
+    )
+    bump_ship_version(voyage_leg.voyage.ship_id)
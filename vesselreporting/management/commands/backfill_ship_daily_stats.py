@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Ship
+from vesselreporting.logic.stats_logic import rebuild_ship_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds ShipDailyStat rollups from existing reports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--imo-reg',
+            type=int,
+            nargs='+',
+            dest='imo_regs',
+            help="Only rebuild these ships (default: all ships)")
+
+    def handle(self, *args, **options):
+        ship_ids = None
+        imo_regs = options['imo_regs']
+        if imo_regs:
+            ship_ids = list(Ship.objects.filter(
+                imo_reg__in=imo_regs).values_list('id', flat=True))
+            if len(ship_ids) != len(set(imo_regs)):
+                raise CommandError("Unknown IMO number in {}".format(imo_regs))
+
+        row_count = rebuild_ship_daily_stats(ship_ids)
+        self.stdout.write(self.style.SUCCESS(
+            "Wrote {} daily stat rows".format(row_count)))
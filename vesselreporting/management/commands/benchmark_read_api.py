@@ -0,0 +1,93 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import requests
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Load tests read endpoints of running servers, e.g. the same "
+        "endpoint served by marinanet.wsgi and by marinanet.asgi, at each "
+        "concurrency level")
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+')
+        parser.add_argument('--token', help="Bearer token to send")
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50],
+            help="Concurrent connections, one run per value")
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            dest='request_count',
+            help="Requests per run")
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help="Make every URL unique, so no response is served from "
+                 "the response cache")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = 'Bearer {}'.format(options['token'])
+
+        self.stdout.write(
+            "{:<60} {:>5} {:>9} {:>8} {:>8} {:>7}".format(
+                "url", "conns", "req/s", "p50 ms", "p95 ms", "errors"))
+        for url in options['urls']:
+            for concurrency in options['concurrency']:
+                result = self._run(
+                    url, headers, concurrency, options['request_count'],
+                    options['cold'])
+                self.stdout.write(
+                    "{:<60} {:>5} {:>9.1f} {:>8.1f} {:>8.1f} {:>7}".format(
+                        url[-60:], concurrency, *result))
+
+    def _run(
+        self,
+        url: str,
+        headers: dict,
+        concurrency: int,
+        request_count: int,
+        cold: bool,
+    ) -> tuple:
+        # One keep-alive connection per client thread
+        local = threading.local()
+        request_numbers = count()
+
+        def get(_):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            params = {'_': next(request_numbers)} if cold else None
+            start = time.perf_counter()
+            try:
+                response = local.session.get(
+                    url, headers=headers, params=params, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - start, ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(get, range(request_count)))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        return (
+            request_count / elapsed,
+            statistics.median(latencies),
+            p95,
+            errors,
+        )
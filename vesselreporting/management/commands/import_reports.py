@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.serializers import ValidationError
+
+from core.models import Ship
+from vesselreporting.logic.import_logic import import_reports, iter_ndjson
+
+
+class Command(BaseCommand):
+    help = "Imports a ship's historical reports from an NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('imo_reg', type=int)
+        parser.add_argument(
+            'path',
+            help="NDJSON file, one report per line in chronological order, "
+                 "or - for stdin")
+
+    def handle(self, *args, **options):
+        try:
+            ship = Ship.objects.get(imo_reg=options['imo_reg'])
+        except Ship.DoesNotExist:
+            raise CommandError(
+                "Ship {} does not exist".format(options['imo_reg']))
+
+        if options['path'] == '-':
+            result = self._import(ship, sys.stdin)
+        else:
+            with open(options['path'], encoding='utf-8') as f:
+                result = self._import(ship, f)
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {reports} reports over {legs} legs".format(**result)))
+
+    def _import(self, ship, lines) -> dict:
+        try:
+            return import_reports(ship, iter_ndjson(lines))
+        except ValidationError as e:
+            raise CommandError("Import failed: {}".format(e.detail))
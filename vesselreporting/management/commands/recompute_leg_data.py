@@ -0,0 +1,71 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from vesselreporting.logic.recompute_logic import recompute_leg_data
+from vesselreporting.models.report_models import ReportHeader, VoyageLeg
+from vesselreporting.tasks import recompute_leg_data_task
+
+
+class Command(BaseCommand):
+    help = "Recomputes VoyageLegData from reports in ReportEdge order"
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument(
+            '--imo-reg',
+            type=int,
+            nargs='+',
+            dest='imo_regs',
+            help="Recompute every leg of these ships (default: all ships)")
+        target.add_argument(
+            '--leg',
+            dest='leg_uuid',
+            help="Recompute this voyage leg")
+        target.add_argument(
+            '--from-report',
+            dest='report_uuid',
+            help="Recompute this report's leg from this report onward")
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help="Queue Celery tasks instead of recomputing in process")
+
+    def handle(self, *args, **options):
+        try:
+            jobs = self._get_jobs(options)
+        except (ReportHeader.DoesNotExist, VoyageLeg.DoesNotExist,
+                DjangoValidationError):
+            raise CommandError("Voyage leg or report not found")
+
+        for voyage_leg, from_report in jobs:
+            if options['run_async']:
+                recompute_leg_data_task.delay(
+                    voyage_leg_uuid=str(voyage_leg.uuid),
+                    from_report_uuid=(
+                        str(from_report.uuid) if from_report else None))
+            else:
+                recompute_leg_data(voyage_leg, from_report)
+
+        verb = "Queued" if options['run_async'] else "Recomputed"
+        self.stdout.write(self.style.SUCCESS(
+            "{} {} voyage legs".format(verb, len(jobs))))
+
+    def _get_jobs(self, options) -> list:
+        if options['report_uuid']:
+            from_report = ReportHeader.objects.select_related(
+                'voyage_leg__voyage__ship__shipspecs',
+            ).get(uuid=options['report_uuid'])
+            return [(from_report.voyage_leg, from_report)]
+
+        voyage_legs = VoyageLeg.objects.select_related(
+            'voyage__ship__shipspecs',
+        ).order_by(
+            'created_at',
+        )
+        if options['leg_uuid']:
+            return [(voyage_legs.get(uuid=options['leg_uuid']), None)]
+        if options['imo_regs']:
+            voyage_legs = voyage_legs.filter(
+                voyage__ship__imo_reg__in=options['imo_regs'])
+        return [(voyage_leg, None) for voyage_leg in voyage_legs]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vesselreporting", "0003_alter_freshwaterdata_ccdata_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reportheader",
+            index=models.Index(
+                fields=["report_date", "id"], name="report_headers_date_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="voyage",
+            index=models.Index(
+                fields=["created_at", "id"], name="voyages_created_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="voyageleg",
+            index=models.Index(
+                fields=["created_at", "id"], name="voyage_legs_created_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 4.1.1 on 2026-10-18 11:02
+
+from decimal import Decimal
+import django.core.serializers.json
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_ship_latest_leg"),
+        ("vesselreporting", "0004_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShipDailyStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "uuid",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("modified_at", models.DateTimeField(auto_now=True)),
+                ("date", models.DateField()),
+                ("report_count", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "last_report_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("NOON", "Noon at Sea"),
+                            ("DSBY", "Departure: Standby"),
+                            ("DCSP", "Departure: COSP"),
+                            ("ASBY", "Arrival: Standby"),
+                            ("AFWE", "Arrival: FWE"),
+                            ("BDN", "Bunker Delivery Note"),
+                            ("EVHB", "Event in Harbour"),
+                            ("EVPO", "Event in Port"),
+                            ("NNHB", "Noon in Harbour"),
+                            ("NNPO", "Noon in Port"),
+                        ],
+                        max_length=4,
+                        null=True,
+                    ),
+                ),
+                ("last_report_date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "hours",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=6,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.00"))
+                        ],
+                    ),
+                ),
+                (
+                    "distance_observed",
+                    models.DecimalField(
+                        decimal_places=0,
+                        default=Decimal("0"),
+                        max_digits=6,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.0"))
+                        ],
+                    ),
+                ),
+                (
+                    "distance_engine",
+                    models.DecimalField(
+                        decimal_places=0,
+                        default=Decimal("0"),
+                        max_digits=6,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.0"))
+                        ],
+                    ),
+                ),
+                (
+                    "distance_to_go",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=0,
+                        max_digits=5,
+                        null=True,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.0"))
+                        ],
+                    ),
+                ),
+                (
+                    "speed",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=5,
+                        null=True,
+                        validators=[
+                            django.core.validators.MinValueValidator(Decimal("0.0"))
+                        ],
+                    ),
+                ),
+                (
+                    "fuel_oil_stats",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "ship",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="core.ship"
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "ship_daily_stats",
+                "unique_together": {("ship", "date")},
+            },
+        ),
+    ]
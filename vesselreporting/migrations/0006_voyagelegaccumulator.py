@@ -0,0 +1,164 @@
+# Generated by Django 4.1.1 on 2026-10-18 13:40
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+# VoyageLegData field -> (phase, substance, quantity)
+LEG_DATA_TOTAL_FIELDS = {
+    "fuel_oil_cons_port_to_port": ("PORT_TO_PORT", "FO", "CONSUMPTION"),
+    "fuel_oil_cons_pilot_to_pilot": ("PILOT_TO_PILOT", "FO", "CONSUMPTION"),
+    "fuel_oil_cons_in_harbour_port": ("IN_HARBOUR_PORT", "FO", "CONSUMPTION"),
+    "fuel_oil_receipt_in_harbour_port": ("IN_HARBOUR_PORT", "FO", "RECEIPT"),
+    "fuel_oil_debunker_in_harbour_port": ("IN_HARBOUR_PORT", "FO", "DEBUNKERING"),
+    "lube_oil_cons_in_harbour_port": ("IN_HARBOUR_PORT", "LO", "CONSUMPTION"),
+    "lube_oil_receipt_in_harbour_port": ("IN_HARBOUR_PORT", "LO", "RECEIPT"),
+    "lube_oil_debunker_in_harbour_port": ("IN_HARBOUR_PORT", "LO", "DEBUNKERING"),
+    "freshwater_cons_in_harbour_port": ("IN_HARBOUR_PORT", "FW", "CONSUMPTION"),
+    "freshwater_gen_in_harbour_port": ("IN_HARBOUR_PORT", "FW", "GENERATION"),
+    "freshwater_receipt_in_harbour_port": ("IN_HARBOUR_PORT", "FW", "RECEIPT"),
+    "freshwater_discharge_in_harbour_port": ("IN_HARBOUR_PORT", "FW", "DISCHARGE"),
+}
+
+
+def copy_leg_data_totals(apps, schema_editor):
+    VoyageLegData = apps.get_model("vesselreporting", "VoyageLegData")
+    VoyageLegAccumulator = apps.get_model("vesselreporting", "VoyageLegAccumulator")
+
+    accumulators = []
+    leg_data_set = VoyageLegData.objects.filter(voyage_leg__isnull=False)
+    for leg_data in leg_data_set.iterator(chunk_size=500):
+        for field, (phase, substance, quantity) in LEG_DATA_TOTAL_FIELDS.items():
+            value = getattr(leg_data, field)
+            if substance == "FW":
+                rows = {("", ""): value}
+            elif substance == "FO" and quantity == "CONSUMPTION":
+                rows = {
+                    (oil_type, consumer): val
+                    for oil_type, breakdown in value.items()
+                    for consumer, val in breakdown.items()
+                }
+            else:
+                rows = {(oil_type, ""): val for oil_type, val in value.items()}
+
+            for (oil_type, consumer), val in rows.items():
+                if val is None:
+                    continue
+                accumulators.append(
+                    VoyageLegAccumulator(
+                        voyage_leg_id=leg_data.voyage_leg_id,
+                        phase=phase,
+                        substance=substance,
+                        oil_type=oil_type,
+                        quantity=quantity,
+                        consumer=consumer,
+                        value=Decimal(str(val)),
+                    )
+                )
+    VoyageLegAccumulator.objects.bulk_create(accumulators, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vesselreporting", "0005_shipdailystat"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VoyageLegAccumulator",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "phase",
+                    models.CharField(
+                        choices=[
+                            ("IN_HARBOUR_PORT", "In Harbour / In Port"),
+                            ("PILOT_TO_PILOT", "Pilot to Pilot"),
+                            ("PORT_TO_PORT", "Port to Port"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "substance",
+                    models.CharField(
+                        choices=[
+                            ("FO", "Fuel Oil"),
+                            ("LO", "Lubricating Oil"),
+                            ("FW", "Fresh Water"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "oil_type",
+                    models.CharField(blank=True, default="", max_length=64),
+                ),
+                (
+                    "quantity",
+                    models.CharField(
+                        choices=[
+                            ("CONSUMPTION", "Consumption"),
+                            ("RECEIPT", "Receipt"),
+                            ("DEBUNKERING", "Debunkering"),
+                            ("GENERATION", "Generation"),
+                            ("DISCHARGE", "Discharge"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                (
+                    "consumer",
+                    models.CharField(blank=True, default="", max_length=32),
+                ),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=12
+                    ),
+                ),
+                (
+                    "voyage_leg",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="accumulators",
+                        to="vesselreporting.voyageleg",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "voyage_leg_accumulators",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="voyagelegaccumulator",
+            index=models.Index(
+                fields=["substance", "oil_type", "phase"],
+                name="voyage_leg_acc_type_phase_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="voyagelegaccumulator",
+            constraint=models.UniqueConstraint(
+                fields=(
+                    "voyage_leg",
+                    "phase",
+                    "substance",
+                    "oil_type",
+                    "quantity",
+                    "consumer",
+                ),
+                name="voyage_leg_accumulator_unique",
+            ),
+        ),
+        migrations.RunPython(copy_leg_data_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.1.1 on 2026-10-18 14:25
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vesselreporting", "0006_voyagelegaccumulator"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VoyageLegCheckpoint",
+            fields=[
+                (
+                    "report_header",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="leg_checkpoint",
+                        serialize=False,
+                        to="vesselreporting.reportheader",
+                    ),
+                ),
+                (
+                    "leg_data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    "totals",
+                    models.JSONField(
+                        default=list,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "voyage_leg_checkpoints",
+            },
+        ),
+    ]
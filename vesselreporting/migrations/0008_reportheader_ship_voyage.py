@@ -0,0 +1,76 @@
+# Generated by Django 4.1.1 on 2026-10-18 15:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_ship_latest_leg"),
+        ("vesselreporting", "0007_voyagelegcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportheader",
+            name="ship",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.ship",
+            ),
+        ),
+        migrations.AddField(
+            model_name="reportheader",
+            name="voyage",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="vesselreporting.voyage",
+            ),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE report_headers AS r
+            SET voyage_id = l.voyage_id, ship_id = v.ship_id
+            FROM voyage_legs AS l
+            JOIN voyages AS v ON v.id = l.voyage_id
+            WHERE l.id = r.voyage_leg_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="reportheader",
+            name="ship",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.ship",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="reportheader",
+            name="voyage",
+            field=models.ForeignKey(
+                editable=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="vesselreporting.voyage",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reportheader",
+            index=models.Index(
+                fields=["ship", "-report_date"], name="report_headers_ship_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reportheader",
+            index=models.Index(
+                fields=["ship", "report_type", "-report_date"],
+                name="report_headers_ship_type_idx",
+            ),
+        ),
+    ]
@@ -26,6 +26,8 @@ from vesselreporting.enums import (
     ConsumptionType,
     DouglasScale,
     GlacierIceCondition,
+    LegQuantity,
+    LegSubstance,
     LoadCondition,
     ParkingStatus,
     ReportType,
@@ -45,6 +47,10 @@ class Voyage(BaseModel):
     class Meta:
         db_table = "voyages"
         unique_together = ["ship", "voyage_num"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"], name="voyages_created_at_id_idx"),
+        ]
 
 
 class VoyageLeg(BaseModel):
@@ -54,6 +60,11 @@ class VoyageLeg(BaseModel):
     class Meta:
         db_table = "voyage_legs"
         unique_together = ["voyage", "leg_num"]
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                name="voyage_legs_created_at_id_idx"),
+        ]
 
 
 class VoyageLegData(BaseModel):
@@ -146,6 +157,8 @@ class VoyageLegData(BaseModel):
 
     fuel_oil_robs = models.JSONField(
         default=dict, encoder=DjangoJSONEncoder)
+    # Running totals below are no longer written, they are kept in
+    # VoyageLegAccumulator and served in the same shape by the serializer
     fuel_oil_cons_port_to_port = models.JSONField(
         default=dict, encoder=DjangoJSONEncoder)
     fuel_oil_cons_pilot_to_pilot = models.JSONField(
@@ -187,9 +200,49 @@ class VoyageLegData(BaseModel):
         db_table = "voyage_leg_data"
 
 
+class VoyageLegAccumulator(models.Model):
+    """
+    Running total of one quantity over a leg, e.g. HFO consumed by the ME
+    from port to port
+    * Incremented in place, see accumulator_logic
+    * consumer is the fuel oil breakdown key, blank otherwise
+    * oil_type is blank for fresh water
+    """
+    voyage_leg = models.ForeignKey(
+        VoyageLeg, on_delete=models.CASCADE, related_name='accumulators')
+    phase = models.CharField(
+        max_length=16, choices=TotalConsumptionType.choices)
+    substance = models.CharField(max_length=2, choices=LegSubstance.choices)
+    oil_type = models.CharField(max_length=64, blank=True, default='')
+    quantity = models.CharField(max_length=16, choices=LegQuantity.choices)
+    consumer = models.CharField(max_length=32, blank=True, default='')
+    value = models.DecimalField(
+        max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        db_table = "voyage_leg_accumulators"
+        constraints = [
+            UniqueConstraint(
+                fields=('voyage_leg', 'phase', 'substance', 'oil_type',
+                        'quantity', 'consumer'),
+                name="voyage_leg_accumulator_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["substance", "oil_type", "phase"],
+                name="voyage_leg_acc_type_phase_idx",
+            ),
+        ]
+
+
 class ReportHeader(BaseModel):
     """Common header for all report types"""
     voyage_leg = models.ForeignKey(VoyageLeg, on_delete=models.PROTECT)
+    # Denormalized from voyage_leg for ship-scoped lookups
+    voyage = models.ForeignKey(
+        Voyage, on_delete=models.PROTECT, editable=False)
+    ship = models.ForeignKey(Ship, on_delete=models.PROTECT, editable=False)
     report_type = models.CharField(max_length=4, choices=ReportType.choices)
     report_num = models.PositiveIntegerField()
     report_date = models.DateTimeField()
@@ -201,6 +254,47 @@ class ReportHeader(BaseModel):
 
     class Meta:
         db_table = "report_headers"
+        indexes = [
+            models.Index(
+                fields=["report_date", "id"],
+                name="report_headers_date_id_idx"),
+            models.Index(
+                fields=["ship", "-report_date"],
+                name="report_headers_ship_date_idx"),
+            models.Index(
+                fields=["ship", "report_type", "-report_date"],
+                name="report_headers_ship_type_idx"),
+        ]
+
+    # Leg that the stored voyage and ship were denormalized from
+    _saved_voyage_leg_id = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_voyage_leg_id = instance.__dict__.get(
+            'voyage_leg_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        saves_leg = update_fields is None or bool(
+            {'voyage_leg', 'voyage_leg_id'} & set(update_fields))
+        # CASE: New report, or moved to another leg
+        if saves_leg and (
+                self.voyage_leg_id != self._saved_voyage_leg_id or
+                self.voyage_id is None or self.ship_id is None):
+            self.set_voyage_and_ship()
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'voyage', 'ship'}
+        super().save(*args, **kwargs)
+        if saves_leg:
+            self._saved_voyage_leg_id = self.voyage_leg_id
+
+    def set_voyage_and_ship(self):
+        self.voyage_id = self.voyage_leg.voyage_id
+        self.ship_id = self.voyage_leg.voyage.ship_id
 
 
 class ReportDataBaseModel(BaseModel):
@@ -948,3 +1042,65 @@ class ReportEdge(models.Model):
                 name="report_edge_reports_unique",
             ),
         ]
+
+
+class VoyageLegCheckpoint(models.Model):
+    """
+    Leg data as folded up to and including report_header
+    Lets recompute_logic replay a leg from a changed report onward instead
+    of from the start of the leg
+    """
+    report_header = models.OneToOneField(
+        ReportHeader, on_delete=models.CASCADE, primary_key=True,
+        related_name='leg_checkpoint')
+    leg_data = models.JSONField(encoder=DjangoJSONEncoder)
+    # [[phase, substance, oil_type, quantity, consumer, value], ...]
+    totals = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        db_table = "voyage_leg_checkpoints"
+
+
+class ShipDailyStat(BaseModel):
+    """
+    Rollup of a ship's reports per UTC day
+    Kept up to date as reports are created, see stats_logic
+    """
+    ship = models.ForeignKey(Ship, on_delete=models.CASCADE)
+    date = models.DateField()
+    report_count = models.PositiveSmallIntegerField(default=0)
+    last_report_type = models.CharField(
+        max_length=4, choices=ReportType.choices, null=True, blank=True)
+    last_report_date = models.DateTimeField(null=True, blank=True)
+
+    hours = models.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        validators=[MinValueValidator(Decimal("0.00"))])
+    distance_observed = models.DecimalField(
+        max_digits=6,
+        decimal_places=0,
+        default=Decimal("0"),
+        validators=[MinValueValidator(Decimal("0.0"))])
+    distance_engine = models.DecimalField(
+        max_digits=6,
+        decimal_places=0,
+        default=Decimal("0"),
+        validators=[MinValueValidator(Decimal("0.0"))])
+    distance_to_go = models.DecimalField(
+        max_digits=5,
+        decimal_places=0,
+        validators=[MinValueValidator(Decimal("0.0"))],
+        null=True, blank=True)
+    speed = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal("0.0"))],
+        null=True, blank=True)
+    # Per fuel type: {"total_consumption": ..., "rob": ...}
+    fuel_oil_stats = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    class Meta:
+        db_table = "ship_daily_stats"
+        unique_together = ["ship", "date"]
@@ -0,0 +1,110 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+import binascii
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination on (ordering_field, id), newest first
+    * Each page is a single indexed range scan, no OFFSET and no COUNT
+    * The cursor is an opaque token holding the last row's key
+    """
+    ordering_field = 'created_at'
+    cursor_query_param = 'cursor'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(
+            '-{}'.format(self.ordering_field), '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            value, pk = cursor
+            # (field, id) < (value, pk), with a plain bound on field so the
+            # composite index is range scanned
+            queryset = queryset.filter(
+                Q(**{'{}__lte'.format(self.ordering_field): value}),
+                Q(**{'{}__lt'.format(self.ordering_field): value}) |
+                Q(id__lt=pk))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = self.encode_cursor(
+            getattr(last, self.ordering_field), last.pk)
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {
+                    'type': 'string',
+                    'nullable': True,
+                },
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, value, pk) -> str:
+        token = json.dumps([value.isoformat(), pk])
+        return urlsafe_b64encode(token.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            token = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            value, pk = json.loads(token)
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+
+class ReportDateCursorPagination(KeysetCursorPagination):
+    ordering_field = 'report_date'
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    ordering_field = 'created_at'
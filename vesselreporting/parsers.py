@@ -0,0 +1,16 @@
+from rest_framework.parsers import BaseParser
+
+from vesselreporting.logic.import_logic import iter_ndjson
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline delimited JSON lazily, one record per line
+    request.data is an iterator of (line number, record)
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return iter(())
+        return iter_ndjson(stream)
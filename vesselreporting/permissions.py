@@ -1,6 +1,8 @@
 from rest_framework import permissions
 
+from core.access import get_request_ships
+
 
 class IsShipUser(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        return request.user in obj.assigned_users.all()
+        return obj.pk in get_request_ships(request).ids
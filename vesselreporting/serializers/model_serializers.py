@@ -49,6 +49,7 @@ from vesselreporting.models.report_models import (
     VoyageLegData,
     WeatherData,
 )
+from vesselreporting.logic.accumulator_logic import get_leg_data_totals
 from vesselreporting.logic.voyage_logic import (
     create_new_voyage,
     create_new_voyage_leg,
@@ -124,6 +125,15 @@ class VoyageLegDataSerializer(serializers.ModelSerializer):
         model = VoyageLegData
         exclude = ['uuid', 'created_at', 'modified_at']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Running totals are read from the leg's accumulators, prefetch
+        # voyage_leg__accumulators when serializing many
+        if getattr(instance, 'voyage_leg_id', None) is not None:
+            data.update(get_leg_data_totals(
+                instance.voyage_leg.accumulators.all()))
+        return data
+
 
 class ReportHeaderSerializer(serializers.ModelSerializer):
     # latitude = serializers.CharField(max_length=10)
@@ -140,6 +150,17 @@ class ReportHeaderSerializer(serializers.ModelSerializer):
         read_only_fields = ['uuid', 'created_at', 'modified_at']
 
 
+class TimelineReportSerializer(ReportHeaderSerializer):
+    depth = serializers.IntegerField(read_only=True)
+
+
+class TimelineSerializer(serializers.Serializer):
+    reports = TimelineReportSerializer(many=True)
+    gaps = serializers.ListField(child=serializers.DictField())
+    forks = serializers.ListField(child=serializers.UUIDField())
+    next = serializers.UUIDField(allow_null=True)
+
+
 class ReportHeaderWithLegSerializer(serializers.ModelSerializer):
     voyage_leg = VoyageLegSerializer()
 
@@ -65,6 +65,7 @@ class NoonReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         reportroute = validated_data.pop('reportroute')
         noonreporttimeandposition = validated_data.pop(
             'noonreporttimeandposition')
@@ -89,6 +90,7 @@ class NoonReportViewSerializer(BaseReportViewSerializer):
                 heavyweatherdata=heavyweatherdata,
                 stoppagedata=stoppagedata,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -108,6 +110,7 @@ class DepartureStandbyReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         reportroute = validated_data.pop('reportroute')
         cargooperation = validated_data.pop('cargooperation')
         departurevesselcondition = validated_data.pop(
@@ -129,6 +132,7 @@ class DepartureStandbyReportViewSerializer(BaseReportViewSerializer):
                 totalconsumptiondata=totalconsumptiondata,
                 departurepilotstation=departurepilotstation,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -150,6 +154,7 @@ class DepartureCOSPReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         reportroute = validated_data.pop('reportroute')
         departurepilotstation = validated_data.pop(
             'departurepilotstation', None)
@@ -173,6 +178,7 @@ class DepartureCOSPReportViewSerializer(BaseReportViewSerializer):
                 departurepilotstation=departurepilotstation,
                 arrivalpilotstation=arrivalpilotstation,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -196,6 +202,7 @@ class ArrivalStandbyReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         reportroute = validated_data.pop('reportroute')
         plannedoperations = validated_data.pop('plannedoperations')
         arrivalstandbytimeandposition = validated_data.pop(
@@ -224,6 +231,7 @@ class ArrivalStandbyReportViewSerializer(BaseReportViewSerializer):
                 totalconsumptiondata=totalconsumptiondata,
                 arrivalpilotstation=arrivalpilotstation,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -245,6 +253,7 @@ class ArrivalFWEReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         reportroute = validated_data.pop('reportroute')
         arrivalfwetimeandposition = validated_data.pop(
             'arrivalfwetimeandposition')
@@ -269,6 +278,7 @@ class ArrivalFWEReportViewSerializer(BaseReportViewSerializer):
                 totalconsumptiondata=totalconsumptiondata,
                 arrivalpilotstation=arrivalpilotstation,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -284,6 +294,7 @@ class EventReportViewSerialiazer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         eventdata = validated_data.pop('eventdata')
         plannedoperations = validated_data.pop('plannedoperations')
         consumptionconditiondata = validated_data.pop(
@@ -297,6 +308,7 @@ class EventReportViewSerialiazer(BaseReportViewSerializer):
                 plannedoperations=plannedoperations,
                 consumptionconditiondata=consumptionconditiondata,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
 
@@ -310,6 +322,7 @@ class BDNReportViewSerializer(BaseReportViewSerializer):
         fields = '__all__'
 
     def create(self, validated_data) -> ReportHeader:
+        batch = validated_data.pop('batch', None)
         bdndata = validated_data.pop('bdndata')
         additionalremarks=validated_data.pop('additionalremarks', None)
 
@@ -318,5 +331,6 @@ class BDNReportViewSerializer(BaseReportViewSerializer):
                 reportheader=validated_data,
                 bdndata=bdndata,
                 additionalremarks=additionalremarks,
+                batch=batch,
             )
         return header
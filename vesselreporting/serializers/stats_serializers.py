@@ -1,44 +1,30 @@
 from rest_framework import serializers
 
-from vesselreporting.models.report_models import (
-    FuelOilData,
-    ReportHeader,
-    VoyageLeg,
-)
+from vesselreporting.models.report_models import ShipDailyStat, VoyageLeg
 
 
-class FuelOilStatSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = FuelOilData
-        fields = ['fuel_oil_type', 'total_consumption', 'rob']
-        read_only_fields = ['uuid']
-
-
-class DailyStatSerializer(serializers.ModelSerializer):
-    speed = serializers.DecimalField(
-        source='performancedata.speed_since_last',
-        max_digits=4,
-        decimal_places=2)
-    distance_observed = serializers.DecimalField(
-        source='distancetimedata.distance_observed_since_last',
-        max_digits=3,
-        decimal_places=0)
-    distance_to_go = serializers.DecimalField(
-        source='distancetimedata.distance_to_go',
-        max_digits=5,
-        decimal_places=0)
-    fuel_stats = FuelOilStatSerializer(
-        source='consumptionconditiondata.fueloildata_set', many=True)
+class ShipDailyStatSerializer(serializers.ModelSerializer):
+    fuel_stats = serializers.SerializerMethodField()
 
     class Meta:
-        model = ReportHeader
-        fields = ['report_date',
-                  'report_type',
+        model = ShipDailyStat
+        fields = ['date',
+                  'report_count',
+                  'last_report_type',
+                  'last_report_date',
+                  'hours',
                   'speed',
                   'distance_observed',
+                  'distance_engine',
                   'distance_to_go',
                   'fuel_stats']
 
+    def get_fuel_stats(self, obj):
+        return [
+            {'fuel_oil_type': fuel_oil_type, **fo_stats}
+            for fuel_oil_type, fo_stats in sorted(obj.fuel_oil_stats.items())
+        ]
+
 
 class ShipOverviewSerializer(serializers.ModelSerializer):
     name = serializers.CharField(max_length=255)
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from vesselreporting.models.report_models import (
+    FuelOilDataCorrection,
+    LubricatingOilDataCorrection,
+    ReportHeader,
+)
+from vesselreporting.tasks import recompute_leg_data_task
+
+
+def schedule_leg_recompute(**report_filters) -> None:
+    """
+    Recomputes the matching report's leg from the report onward once the
+    current transaction commits
+    """
+    report = ReportHeader.objects.filter(
+        **report_filters,
+    ).values_list(
+        'uuid', 'voyage_leg__uuid',
+    ).first()
+    if report is None:
+        return
+    report_uuid, voyage_leg_uuid = report
+    transaction.on_commit(lambda: recompute_leg_data_task.delay(
+        str(voyage_leg_uuid), str(report_uuid)))
+
+
+@receiver(pre_save, sender=ReportHeader)
+def remember_previous_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if instance.pk is not None:
+        instance._previous_status = ReportHeader.objects.filter(
+            pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=ReportHeader)
+def recompute_voided_report_leg(sender, instance, created, **kwargs):
+    # CASE: Voiding or restoring a report changes what its leg folds.
+    # QuerySet.update() skips this, callers recompute themselves
+    previous_status = getattr(instance, '_previous_status', None)
+    if not created and previous_status not in (None, instance.status):
+        schedule_leg_recompute(pk=instance.pk)
+
+
+@receiver(post_save, sender=FuelOilDataCorrection)
+@receiver(post_delete, sender=FuelOilDataCorrection)
+def recompute_fuel_oil_correction_leg(sender, instance, **kwargs):
+    schedule_leg_recompute(
+        consumptionconditiondata__fueloildata=instance.fuel_oil_data_id)
+
+
+@receiver(post_save, sender=LubricatingOilDataCorrection)
+@receiver(post_delete, sender=LubricatingOilDataCorrection)
+def recompute_lube_oil_correction_leg(sender, instance, **kwargs):
+    schedule_leg_recompute(
+        consumptionconditiondata__lubricatingoildata=instance.
+        lubricating_oil_data_id)
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from celery import shared_task
+
+from vesselreporting.logic.recompute_logic import recompute_leg_data
+from vesselreporting.models.report_models import (
+    ReportHeader,
+    VoyageLeg,
+)
+
+
+@shared_task()
+def recompute_leg_data_task(
+    voyage_leg_uuid: str,
+    from_report_uuid: Optional[str] = None,
+):
+    voyage_leg = VoyageLeg.objects.select_related(
+        'voyage__ship__shipspecs').get(uuid=voyage_leg_uuid)
+    from_report = None
+    if from_report_uuid is not None:
+        from_report = ReportHeader.objects.get(uuid=from_report_uuid)
+    recompute_leg_data(voyage_leg, from_report)
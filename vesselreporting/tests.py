@@ -1,3 +1,1168 @@
-from django.test import TestCase
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+import json
+from unittest import mock
+import uuid
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase
+from django.utils.dateparse import parse_datetime
+from rest_framework.serializers import ValidationError
+from rest_framework.test import APIClient
+
+from core.enums import (
+    CargoUnits,
+    FuelType,
+    ShipAccessPrivilege,
+    ShipType,
+    Status,
+)
+from core.models import Company, Ship, ShipSpecs, ShipUser, User
+from core.response_cache import bump_ship_version
+from core.test_utils import QueryBudgetTestMixin
+from vesselreporting.enums import (
+    ConsumptionType,
+    LoadCondition,
+    ReportType,
+    TotalConsumptionType,
+)
+from vesselreporting.logic.checkpoint_logic import LEG_CHECKPOINT_INTERVAL
+from vesselreporting.logic import import_logic
+from vesselreporting.logic.import_logic import import_reports, iter_ndjson
+from vesselreporting.logic.recompute_logic import (
+    fold_leg_reports,
+    order_leg_chain,
+    recompute_leg_data,
+)
+from vesselreporting.logic.report_logic import (
+    ReportRowBatch,
+    create_noon_report,
+    get_leg_reports,
+    update_leg_data,
+)
+from vesselreporting.logic.stats_logic import (
+    rebuild_ship_daily_stats,
+    update_ship_daily_stat,
+)
+from vesselreporting.logic.voyage_logic import (
+    create_new_voyage,
+    create_new_voyage_leg,
+    set_latest_leg_for_ship,
+)
+from vesselreporting.models.report_models import (
+    ConsumptionConditionData,
+    DistanceTimeData,
+    FreshWaterData,
+    FuelOilData,
+    FuelOilDataCorrection,
+    LubricatingOilData,
+    ReportEdge,
+    ReportHeader,
+    ReportRoute,
+    ShipDailyStat,
+    StoppageData,
+    VoyageLeg,
+    VoyageLegAccumulator,
+    VoyageLegCheckpoint,
+    VoyageLegData,
+)
+
+
+def create_ship_for_user(user: User, company: Company, imo_reg: int) -> Ship:
+    ship = Ship.objects.create(
+        name="Ship {}".format(imo_reg),
+        imo_reg=imo_reg,
+        company=company,
+        ship_type=ShipType.BULK_CARRIER,
+    )
+    ShipSpecs.objects.create(
+        ship=ship,
+        flag="SG",
+        call_sign="9V0000",
+        mmsi=563000000,
+        delivery_date=date(2015, 1, 1),
+        class_society="DNV",
+        gross_tonnage=40000,
+        deadweight_tonnage=75000,
+        net_tonnage=25000,
+        cargo_unit=CargoUnits.MT,
+        cargo_capacity=70000,
+        propeller_pitch=1,
+    )
+    ShipUser.objects.create(
+        ship=ship, user=user, privilege=ShipAccessPrivilege.WRITE)
+    return ship
+
+
+class ShipsOverviewListViewTest(QueryBudgetTestMixin, TestCase):
+    url = '/api/marinanet/ships-overview/'
+
+    def setUp(self):
+        self.user = User.objects.create(username="fleet.manager")
+        self.company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_ship_with_leg(self, imo_reg: int, load_condition: str):
+        ship = create_ship_for_user(self.user, self.company, imo_reg)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+        VoyageLegData.objects.create(
+            voyage_leg=leg, load_condition=load_condition)
+        return ship, voyage
+
+    def test_query_count_is_constant(self):
+        # Accessible ships, reloaded after ShipUser changes, then ships
+        self._create_ship_with_leg(9000000, LoadCondition.LADEN)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        for i in range(1, 6):
+            self._create_ship_with_leg(9000000 + i, LoadCondition.BALLAST)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 6)
+
+    def test_within_query_budget(self):
+        for i in range(3):
+            self._create_ship_with_leg(9050000 + i, LoadCondition.LADEN)
+        response = self.assertWithinQueryBudget(self.url)
+        self.assertEqual(len(response.data), 3)
+
+    def test_unassigned_ship_is_hidden(self):
+        ship, _ = self._create_ship_with_leg(9100000, LoadCondition.LADEN)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        ShipUser.objects.filter(ship=ship, user=self.user).delete()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 0)
+
+    def test_returns_latest_leg_per_ship(self):
+        ship, voyage = self._create_ship_with_leg(
+            9200000, LoadCondition.BALLAST)
+        second_leg = VoyageLeg.objects.create(voyage=voyage, leg_num=2)
+        VoyageLegData.objects.create(
+            voyage_leg=second_leg, load_condition=LoadCondition.LADEN)
+        set_latest_leg_for_ship(second_leg)
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(
+            response.data[0]['load_condition'], LoadCondition.LADEN)
+
+
+class ShipReportsListTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(self.user, company, 9300000)
+        self.url = '/api/marinanet/ships/{}/reports/'.format(
+            self.ship.imo_reg)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_voyage_with_reports(self, voyage_num: int):
+        report_date = datetime(2022, 1, voyage_num, tzinfo=timezone.utc)
+        voyage = create_new_voyage(ship=self.ship, voyage_num=voyage_num)
+        for leg_num in range(1, 3):
+            leg = create_new_voyage_leg(voyage=voyage, leg_num=leg_num)
+            VoyageLegData.objects.create(
+                voyage_leg=leg, load_condition=LoadCondition.LADEN)
+            for report_num in range(1, 3):
+                header = ReportHeader.objects.create(
+                    voyage_leg=leg,
+                    report_type=ReportType.NOON,
+                    report_num=report_num,
+                    report_date=report_date,
+                    report_tz=0,
+                )
+                ReportRoute.objects.create(
+                    report_header=header,
+                    departure_port="SGSIN",
+                    departure_date=report_date,
+                    departure_tz=0,
+                    arrival_port="CNSHA",
+                    arrival_date=report_date,
+                    arrival_tz=0,
+                )
+
+    def test_query_count_is_constant(self):
+        # Accessible ships, ship, voyages, legs with leg data, reports with
+        # routes
+        self._create_voyage_with_reports(1)
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 1)
+
+        # Accessible ships are cached
+        for voyage_num in range(2, 5):
+            self._create_voyage_with_reports(voyage_num)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(
+            len(response.data['results'][0]['voyage_legs']), 2)
+
+    def test_within_query_budget(self):
+        for voyage_num in range(1, 4):
+            self._create_voyage_with_reports(voyage_num)
+        response = self.assertWithinQueryBudget(self.url)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_cursor_pages_through_voyages(self):
+        for voyage_num in range(1, 6):
+            self._create_voyage_with_reports(voyage_num)
+
+        voyage_nums = []
+        url = self.url + '?page_size=2'
+        while url is not None:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 2)
+            voyage_nums += [
+                voyage['voyage_num'] for voyage in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(voyage_nums, [5, 4, 3, 2, 1])
+
+
+class ShipTimelineViewTest(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(self.user, company, 9400000)
+        self.url = '/api/marinanet/ships/{}/timeline/'.format(
+            self.ship.imo_reg)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        voyage = create_new_voyage(ship=self.ship, voyage_num=1)
+        leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        # Daily reports with a 3 day gap before the last one
+        self.reports = []
+        previous_report = None
+        for report_num, days in enumerate([0, 1, 2, 5], start=1):
+            report = ReportHeader.objects.create(
+                voyage_leg=leg,
+                report_type=ReportType.NOON,
+                report_num=report_num,
+                report_date=start + timedelta(days=days),
+                report_tz=0,
+            )
+            ReportEdge.objects.create(
+                previous_report=previous_report, next_report=report)
+            self.reports.append(report)
+            previous_report = report
+        leg.voyagelegprogress.latest_report = previous_report
+        leg.voyagelegprogress.save()
+        # Not linked into the chain
+        self.orphan = ReportHeader.objects.create(
+            voyage_leg=leg,
+            report_type=ReportType.NOON,
+            report_num=9,
+            report_date=start + timedelta(days=3),
+            report_tz=0,
+        )
+
+    def test_walks_back_from_latest_report(self):
+        # Accessible ships, ship, timeline, forks
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url + '?limit=3')
+        self.assertEqual(
+            [report['uuid'] for report in response.data['reports']],
+            [str(report.uuid) for report in self.reports[:0:-1]])
+        self.assertEqual(response.data['next'], str(self.reports[0].uuid))
+        self.assertEqual(len(response.data['gaps']), 1)
+        self.assertEqual(response.data['gaps'][0]['hours'], 72)
+        self.assertEqual(response.data['forks'], [str(self.orphan.uuid)])
+
+        response = self.client.get(
+            self.url + '?limit=3&start={}'.format(response.data['next']))
+        self.assertEqual(len(response.data['reports']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_within_query_budget(self):
+        response = self.assertWithinQueryBudget(self.url)
+        self.assertEqual(len(response.data['reports']), 4)
+
+    def test_walks_back_from_latest_report_before_latest_leg(self):
+        # CASE: A new leg has no reports yet
+        leg = self.reports[0].voyage_leg
+        leg.voyagelegprogress.arrival_fwe = self.reports[-1]
+        leg.voyagelegprogress.save()
+        create_new_voyage_leg(voyage=leg.voyage, leg_num=2)
+
+        response = self.client.get(self.url)
+        self.assertEqual(
+            [report['uuid'] for report in response.data['reports']],
+            [str(report.uuid) for report in reversed(self.reports)])
+
+    def test_walks_forward_from_report(self):
+        response = self.client.get(
+            self.url + '?direction=forward&start={}'.format(
+                self.reports[0].uuid))
+        self.assertEqual(
+            [report['uuid'] for report in response.data['reports']],
+            [str(report.uuid) for report in self.reports])
+        self.assertIsNone(response.data['next'])
+
+
+class ShipResponseCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(self.user, company, 9500000)
+        self.url = '/api/marinanet/ships/{}/'.format(self.ship.imo_reg)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_matching_etag_is_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Ship id only
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_bumped_ship_is_served_fresh(self):
+        etag = self.client.get(self.url)['ETag']
+        Ship.objects.filter(pk=self.ship.pk).update(name="Renamed")
+        bump_ship_version(self.ship.pk)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['name'], "Renamed")
+
+
+class ShipAccessTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(self.user, company, 9550000)
+        other_user = User.objects.create(username="other.manager")
+        self.other_ship = create_ship_for_user(other_user, company, 9560000)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_ship_views_require_access(self):
+        for path in ['', 'voyages/', 'latest-voyage/', 'reports/',
+                     'timeline/', 'latest-report/', 'legs/',
+                     'latest-details/', 'stats/']:
+            with self.subTest(path=path):
+                response = self.client.get(
+                    '/api/marinanet/ships/{}/{}'.format(
+                        self.other_ship.imo_reg, path))
+                self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            '/api/marinanet/ships/{}/'.format(self.ship.imo_reg))
+        self.assertEqual(response.status_code, 200)
+
+    async def test_async_ship_views_require_access(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        for path in ['latest-details/', 'stats/']:
+            with self.subTest(path=path):
+                response = await self.async_client.get(
+                    '/api/marinanet/async/ships/{}/{}'.format(
+                        self.other_ship.imo_reg, path))
+                self.assertEqual(response.status_code, 403)
+
+        response = await self.async_client.get(
+            '/api/marinanet/async/ships/{}/stats/'.format(self.ship.imo_reg))
+        self.assertEqual(response.status_code, 200)
+
+
+class ShipDailyStatTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(user, company, 9600000)
+        voyage = create_new_voyage(ship=self.ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+        self.report_count = 0
+
+    def _create_report(
+        self,
+        report_date: datetime,
+        report_type: str = ReportType.NOON,
+        hours: str = "12.00",
+        distance: str = "150",
+        distance_to_go: str = "1000",
+        consumption: str = "10.00",
+        rob: str = "800.00",
+    ) -> ReportHeader:
+        self.report_count += 1
+        header = ReportHeader.objects.create(
+            voyage_leg=self.leg,
+            report_type=report_type,
+            report_num=self.report_count,
+            report_date=report_date,
+            report_tz=0,
+        )
+        if report_type == ReportType.BDN:
+            update_ship_daily_stat(header)
+            return header
+
+        dtdata = DistanceTimeData.objects.create(
+            report_header=header,
+            hours_since_last=Decimal(hours),
+            hours_total=Decimal(hours),
+            distance_to_go=Decimal(distance_to_go),
+            remarks_for_changes="",
+            distance_observed_since_last=Decimal(distance),
+            distance_observed_total=Decimal(distance),
+            distance_engine_since_last=Decimal(distance),
+            distance_engine_total=Decimal(distance),
+            revolution_count=0,
+        )
+        ccdata = ConsumptionConditionData.objects.create(
+            report_header=header,
+            consumption_type=ConsumptionType.NOON_TO_NOON,
+        )
+        FuelOilData.objects.create(
+            ccdata=ccdata,
+            fuel_oil_type=FuelType.HFO,
+            total_consumption=Decimal(consumption),
+            receipt=Decimal("0.00"),
+            debunkering=Decimal("0.00"),
+            rob=Decimal(rob),
+            breakdown={},
+        )
+        update_ship_daily_stat(
+            header,
+            distance_time_data=dtdata,
+            consumption_condition_data=ccdata,
+        )
+        return header
+
+    def _get_stats(self) -> list[dict]:
+        return list(ShipDailyStat.objects.filter(ship=self.ship).order_by(
+            'date',
+        ).values(
+            'date', 'report_count', 'last_report_type', 'last_report_date',
+            'hours', 'distance_observed', 'distance_to_go', 'speed',
+            'fuel_oil_stats',
+        ))
+
+    def test_reports_add_up_per_utc_day(self):
+        sgt = timezone(timedelta(hours=8))
+        self._create_report(datetime(2022, 3, 1, 2, tzinfo=timezone.utc))
+        # 2022-03-01 22:00 UTC
+        self._create_report(
+            datetime(2022, 3, 2, 6, tzinfo=sgt),
+            hours="10.00", distance="100", distance_to_go="900",
+            consumption="5.50", rob="794.50")
+        self._create_report(datetime(2022, 3, 2, 2, tzinfo=timezone.utc))
+
+        stats = self._get_stats()
+        self.assertEqual(
+            [stat['date'] for stat in stats],
+            [date(2022, 3, 1), date(2022, 3, 2)])
+        self.assertEqual(stats[0]['report_count'], 2)
+        self.assertEqual(stats[0]['hours'], Decimal("22.00"))
+        self.assertEqual(stats[0]['distance_observed'], Decimal("250"))
+        self.assertEqual(stats[0]['speed'], Decimal("11.36"))
+        self.assertEqual(stats[0]['distance_to_go'], Decimal("900"))
+        self.assertEqual(
+            Decimal(stats[0]['fuel_oil_stats'][FuelType.HFO][
+                'total_consumption']),
+            Decimal("15.50"))
+        self.assertEqual(
+            Decimal(stats[0]['fuel_oil_stats'][FuelType.HFO]['rob']),
+            Decimal("794.50"))
+
+    def test_out_of_order_report_keeps_latest_values(self):
+        self._create_report(
+            datetime(2022, 3, 1, 12, tzinfo=timezone.utc),
+            distance_to_go="900", rob="790.00")
+        self._create_report(
+            datetime(2022, 3, 1, 0, tzinfo=timezone.utc),
+            report_type=ReportType.DEP_COSP,
+            distance_to_go="1000", rob="800.00")
+
+        stat = self._get_stats()[0]
+        self.assertEqual(stat['report_count'], 2)
+        self.assertEqual(stat['last_report_type'], ReportType.NOON)
+        self.assertEqual(
+            stat['last_report_date'],
+            datetime(2022, 3, 1, 12, tzinfo=timezone.utc))
+        self.assertEqual(stat['distance_to_go'], Decimal("900"))
+        self.assertEqual(
+            Decimal(stat['fuel_oil_stats'][FuelType.HFO]['rob']),
+            Decimal("790.00"))
+
+    def test_speed_too_high_to_store_is_skipped(self):
+        # CASE: 150 nm over 6 minutes is 1500 knots
+        self._create_report(
+            datetime(2022, 3, 1, 2, tzinfo=timezone.utc), hours="0.10")
+        stat = self._get_stats()[0]
+        self.assertEqual(stat['hours'], Decimal("0.10"))
+        self.assertIsNone(stat['speed'])
+
+        self._create_report(datetime(2022, 3, 1, 14, tzinfo=timezone.utc))
+        self.assertEqual(self._get_stats()[0]['speed'], Decimal("24.79"))
+
+    def test_bdn_is_not_counted(self):
+        self._create_report(datetime(2022, 3, 1, 2, tzinfo=timezone.utc))
+        self._create_report(
+            datetime(2022, 3, 1, 6, tzinfo=timezone.utc),
+            report_type=ReportType.BDN)
+
+        stat = self._get_stats()[0]
+        self.assertEqual(stat['report_count'], 1)
+        self.assertEqual(stat['last_report_type'], ReportType.NOON)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        start = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        for hours in (30, 6, 18, 42, 54):
+            self._create_report(start + timedelta(hours=hours))
+        self._create_report(
+            start + timedelta(hours=20), report_type=ReportType.BDN)
+        incremental_stats = self._get_stats()
+
+        ShipDailyStat.objects.filter(ship=self.ship, date=start.date()).update(
+            report_count=0, hours=Decimal("0.00"))
+        self.assertEqual(rebuild_ship_daily_stats([self.ship.pk]), 3)
+        self.assertEqual(self._get_stats(), incremental_stats)
+
+
+class IterNDJSONTest(SimpleTestCase):
+    def test_yields_records_in_order_with_line_numbers(self):
+        lines = [
+            b'{"report_num": 1}\n',
+            '\n',
+            '  {"report_num": 2}  \n',
+            '{"report_num": 3}',
+        ]
+        self.assertEqual(
+            list(iter_ndjson(lines)),
+            [(1, {'report_num': 1}),
+             (3, {'report_num': 2}),
+             (4, {'report_num': 3})])
+
+    def test_malformed_line_stops_at_its_line_number(self):
+        records = iter_ndjson([
+            '{"report_num": 1}',
+            '{"report_num": 2',
+            '{"report_num": 3}',
+        ])
+        self.assertEqual(next(records), (1, {'report_num': 1}))
+        with self.assertRaises(ValidationError) as context:
+            next(records)
+        self.assertEqual(list(context.exception.detail), [2])
+
+    def test_non_object_line_is_rejected(self):
+        with self.assertRaises(ValidationError) as context:
+            list(iter_ndjson(['{"report_num": 1}', '[1, 2]']))
+        self.assertEqual(list(context.exception.detail), [2])
+
+
+class ImportReportsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        self.ship = create_ship_for_user(user, company, 9700000)
+        voyage = create_new_voyage(ship=self.ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+
+    def _bdn_line(self, voyage_leg: VoyageLeg, report_num: int,
+                  report_date: datetime) -> str:
+        bunkering_date = report_date.isoformat()
+        return json.dumps({
+            'report_type': ReportType.BDN,
+            'voyage_leg': {'uuid': str(voyage_leg.uuid)},
+            'report_num': report_num,
+            'report_date': bunkering_date,
+            'report_tz': 0,
+            'bdndata': {
+                'is_before_arrival': False,
+                'bunkering_port': "SGSIN",
+                'bunkering_date': bunkering_date,
+                'bdn_file': ["https://files.example/bdn.pdf"],
+                'delivered_oil_type': FuelType.HFO,
+                'delivered_quantity': "500.00",
+                'density_15': "0.9910",
+                'viscosity_value': "380.000",
+                'viscosity_temperature': "50.0",
+                'flash_point': "70.000",
+                'sulfur_content': "0.450",
+                'sample_sealing_marpol': "M-1",
+                'sample_sealing_ship': "S-1",
+                'sample_sealing_barge': "B-1",
+                'alongside_date': bunkering_date,
+                'hose_connection_date': bunkering_date,
+                'pump_start_date': bunkering_date,
+                'pump_stop_date': bunkering_date,
+                'hose_disconnection_date': bunkering_date,
+                'slipoff_date': bunkering_date,
+                'purchaser': "MarinaChain",
+                'barge_name': "Barge 1",
+                'supplier_name': "Supplier",
+                'supplier_address': "1 Harbour Road",
+                'supplier_contact': "+6561234567",
+            },
+        })
+
+    def test_reports_are_imported_across_legs(self):
+        next_leg = create_new_voyage_leg(voyage=self.leg.voyage, leg_num=2)
+        start = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        lines = [
+            self._bdn_line(self.leg, 1, start),
+            self._bdn_line(self.leg, 2, start + timedelta(days=1)),
+            self._bdn_line(next_leg, 1, start + timedelta(days=2)),
+            self._bdn_line(next_leg, 2, start + timedelta(days=3)),
+        ]
+
+        patchers = {
+            name: mock.patch.object(
+                import_logic, name, wraps=getattr(import_logic, name))
+            for name in (
+                'recompute_voyage_leg',
+                'rebuild_ship_daily_stats',
+                'rebuild_cii_year_to_date',
+            )}
+        mocks = {name: patcher.start() for name, patcher in patchers.items()}
+        for patcher in patchers.values():
+            self.addCleanup(patcher.stop)
+
+        counts = import_reports(self.ship, iter_ndjson(lines))
+
+        self.assertEqual(counts, {'reports': 4, 'legs': 2})
+        # CASE: Derived data is rebuilt once per leg or ship, not per report
+        self.assertEqual(
+            [args[0] for args, _ in
+             mocks['recompute_voyage_leg'].call_args_list],
+            [self.leg, next_leg])
+        mocks['rebuild_ship_daily_stats'].assert_called_once_with(
+            [self.ship.pk])
+        mocks['rebuild_cii_year_to_date'].assert_called_once_with(
+            [self.ship.pk])
+
+        reports = list(ReportHeader.objects.filter(
+            ship=self.ship,
+        ).order_by(
+            'report_date',
+        ))
+        self.assertEqual(
+            [report.voyage_leg_id for report in reports],
+            [self.leg.pk, self.leg.pk, next_leg.pk, next_leg.pk])
+        self.assertEqual(
+            [ReportEdge.objects.get(next_report=report).previous_report
+             for report in reports],
+            [None] + reports[:-1])
+        for voyage_leg, latest_report in (
+                (self.leg, reports[1]), (next_leg, reports[3])):
+            leg_data = VoyageLegData.objects.get(voyage_leg=voyage_leg)
+            self.assertEqual(
+                leg_data.last_report_date, latest_report.report_date)
+            self.assertEqual(leg_data.last_report_type, ReportType.BDN)
+
+    def test_errors_are_keyed_by_line_number(self):
+        lines = [
+            json.dumps({'report_type': 'XXXX'}),
+            '',
+            json.dumps({'report_type': ReportType.NOON}),
+            json.dumps({
+                'report_type': ReportType.NOON,
+                'voyage_leg': {'uuid': str(uuid.uuid4())},
+            }),
+        ]
+        with self.assertRaises(ValidationError) as context:
+            import_reports(self.ship, iter_ndjson(lines))
+        self.assertEqual(list(context.exception.detail), [1, 3, 4])
+        self.assertEqual(
+            context.exception.detail[4]['voyage_leg'],
+            'Voyage leg not found.')
+        self.assertFalse(ReportHeader.objects.filter(ship=self.ship).exists())
+
+    def test_malformed_line_aborts_import(self):
+        lines = [
+            json.dumps({'report_type': ReportType.NOON}),
+            'not json',
+        ]
+        with self.assertRaises(ValidationError) as context:
+            import_reports(self.ship, iter_ndjson(lines))
+        self.assertEqual(list(context.exception.detail), [2])
+        self.assertFalse(ReportHeader.objects.filter(ship=self.ship).exists())
+
+
+class ReportHeaderSaveTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        ship = create_ship_for_user(user, company, 9750000)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+        self.other_ship = create_ship_for_user(user, company, 9750001)
+        other_voyage = create_new_voyage(ship=self.other_ship, voyage_num=1)
+        self.other_leg = create_new_voyage_leg(
+            voyage=other_voyage, leg_num=1)
+        self.report = ReportHeader.objects.create(
+            voyage_leg=self.leg,
+            report_type=ReportType.NOON,
+            report_num=1,
+            report_date=datetime(2022, 3, 1, tzinfo=timezone.utc),
+            report_tz=0,
+        )
+
+    def _assert_on_other_leg(self, report: ReportHeader) -> None:
+        self.assertEqual(report.voyage_id, self.other_leg.voyage_id)
+        self.assertEqual(report.ship_id, self.other_ship.pk)
+
+    def test_moving_report_to_another_leg_moves_voyage_and_ship(self):
+        report = ReportHeader.objects.get(pk=self.report.pk)
+        report.voyage_leg = self.other_leg
+        report.save()
+
+        self._assert_on_other_leg(report)
+        self._assert_on_other_leg(ReportHeader.objects.get(pk=report.pk))
+
+    def test_moving_report_with_update_fields(self):
+        report = ReportHeader.objects.get(pk=self.report.pk)
+        report.voyage_leg_id = self.other_leg.pk
+        report.save(update_fields=['voyage_leg'])
+
+        self._assert_on_other_leg(ReportHeader.objects.get(pk=report.pk))
+
+    def test_saving_on_same_leg_keeps_voyage_and_ship(self):
+        report = ReportHeader.objects.get(pk=self.report.pk)
+        report.report_tz = 8
+        with mock.patch.object(
+                ReportHeader, 'set_voyage_and_ship') as set_voyage_and_ship:
+            report.save()
+            report.voyage_leg = self.other_leg
+            report.save(update_fields=['report_tz'])
+        set_voyage_and_ship.assert_not_called()
+
+
+class UpdateLegDataTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        ship = create_ship_for_user(user, company, 9800000)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+
+    def _create_report(self, report_date: datetime,
+                       report_type: str = ReportType.BDN) -> ReportHeader:
+        return ReportHeader.objects.create(
+            voyage_leg=self.leg,
+            report_type=report_type,
+            report_num=ReportHeader.objects.filter(
+                voyage_leg=self.leg).count() + 1,
+            report_date=report_date,
+            report_tz=0,
+        )
+
+    def _create_ccdata(self, header: ReportHeader,
+                       rob: str) -> ConsumptionConditionData:
+        ccdata = ConsumptionConditionData.objects.create(
+            report_header=header,
+            consumption_type=ConsumptionType.NOON_TO_NOON,
+        )
+        FuelOilData.objects.create(
+            ccdata=ccdata,
+            fuel_oil_type=FuelType.HFO,
+            total_consumption=Decimal("10.00"),
+            receipt=Decimal("0.00"),
+            debunkering=Decimal("0.00"),
+            rob=Decimal(rob),
+            breakdown={'ME': "10.00"},
+        )
+        FreshWaterData.objects.create(
+            ccdata=ccdata,
+            consumed=5, generated=0, received=0, discharged=0, rob=100)
+        return ccdata
+
+    def test_report_writes_only_its_fields(self):
+        VoyageLegData.objects.create(
+            voyage_leg=self.leg,
+            load_condition=LoadCondition.LADEN,
+            fuel_oil_robs={FuelType.HFO: "500.00"},
+        )
+        header = self._create_report(
+            datetime(2022, 3, 1, tzinfo=timezone.utc))
+        # CASE: Another report changes ROBs while this one is written
+        VoyageLegData.objects.filter(voyage_leg=self.leg).update(
+            fuel_oil_robs={FuelType.HFO: "450.00"})
+        update_leg_data(header)
+
+        leg_data = VoyageLegData.objects.get(voyage_leg=self.leg)
+        self.assertEqual(leg_data.last_report_type, ReportType.BDN)
+        self.assertEqual(leg_data.load_condition, LoadCondition.LADEN)
+        self.assertEqual(leg_data.fuel_oil_robs, {FuelType.HFO: "450.00"})
+
+    def test_consumption_merges_robs_and_upserts_totals(self):
+        VoyageLegData.objects.create(
+            voyage_leg=self.leg,
+            fuel_oil_robs={FuelType.HFO: "500.00", FuelType.MGO: "80.00"},
+        )
+        start = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        for hours, rob in ((0, "490.00"), (24, "480.00")):
+            header = self._create_report(
+                start + timedelta(hours=hours), ReportType.NOON)
+            update_leg_data(
+                header,
+                consumption_condition_data=self._create_ccdata(header, rob),
+                stoppage_data=StoppageData(
+                    reduced_rpm=0, duration=Decimal("1.50")),
+            )
+
+        leg_data = VoyageLegData.objects.get(voyage_leg=self.leg)
+        self.assertEqual(
+            leg_data.fuel_oil_robs,
+            {FuelType.HFO: "480.00", FuelType.MGO: "80.00"})
+        self.assertEqual(leg_data.freshwater_rob, 100)
+        self.assertEqual(leg_data.time_stopped_at_sea, Decimal("3.00"))
+        self.assertEqual(
+            VoyageLegAccumulator.objects.get(
+                voyage_leg=self.leg,
+                phase=TotalConsumptionType.PORT_TO_PORT,
+                oil_type=FuelType.HFO,
+                consumer='ME',
+            ).value,
+            Decimal("20.00"))
+
+    def test_older_report_keeps_latest_values(self):
+        start = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        for hours, rob in ((24, "480.00"), (0, "490.00")):
+            header = self._create_report(
+                start + timedelta(hours=hours), ReportType.NOON)
+            update_leg_data(
+                header,
+                consumption_condition_data=self._create_ccdata(header, rob),
+                stoppage_data=StoppageData(
+                    reduced_rpm=0, duration=Decimal("1.50")),
+            )
+
+        leg_data = VoyageLegData.objects.get(voyage_leg=self.leg)
+        self.assertEqual(
+            leg_data.last_report_date, start + timedelta(hours=24))
+        self.assertEqual(leg_data.fuel_oil_robs, {FuelType.HFO: "480.00"})
+        # CASE: Totals still count the older report
+        self.assertEqual(leg_data.time_stopped_at_sea, Decimal("3.00"))
+        self.assertEqual(
+            VoyageLegAccumulator.objects.get(
+                voyage_leg=self.leg, consumer='ME').value,
+            Decimal("20.00"))
+
+    def test_first_report_creates_leg_data(self):
+        header = self._create_report(
+            datetime(2022, 3, 1, tzinfo=timezone.utc))
+        update_leg_data(header)
+
+        leg_data = VoyageLegData.objects.get(voyage_leg=self.leg)
+        self.assertEqual(leg_data.propeller_pitch, 1)
+        self.assertEqual(leg_data.last_report_type, ReportType.BDN)
+
+
+class ReportRowBatchTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        ship = create_ship_for_user(user, company, 9810000)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+
+    def _add_noon_report(self, batch: ReportRowBatch,
+                         report_date: datetime) -> ReportHeader:
+        return create_noon_report(
+            reportheader={
+                'voyage_leg': self.leg,
+                'report_type': ReportType.NOON,
+                'report_num': len(batch.report_headers) + 1,
+                'report_date': report_date,
+                'report_tz': 0,
+            },
+            reportroute={
+                'departure_port': "SGSIN",
+                'departure_date': datetime(2022, 3, 1, tzinfo=timezone.utc),
+                'departure_tz': 8,
+                'arrival_port': "NLRTM",
+                'arrival_date': datetime(2022, 3, 30, tzinfo=timezone.utc),
+                'arrival_tz': 1,
+            },
+            noonreporttimeandposition={
+                'time': report_date,
+                'timezone': 0,
+                'position': Point(103.8, 1.3),
+            },
+            weatherdata={},
+            distancetimedata={
+                'hours_since_last': Decimal("24.00"),
+                'hours_total': Decimal("24.00"),
+                'distance_to_go': Decimal("8000"),
+                'remarks_for_changes': "",
+                'distance_observed_since_last': Decimal("300"),
+                'distance_observed_total': Decimal("300"),
+                'distance_engine_since_last': Decimal("310"),
+                'distance_engine_total': Decimal("310"),
+                'revolution_count': 120000,
+            },
+            performancedata={
+                'speed_since_last': Decimal("12.50"),
+                'rpm_since_last': Decimal("83.3"),
+                'slip_since_last': Decimal("3.20"),
+                'speed_average': Decimal("12.50"),
+                'rpm_average': Decimal("83.3"),
+                'slip_average': Decimal("3.20"),
+            },
+            consumptionconditiondata={
+                'consumption_type': ConsumptionType.NOON_TO_NOON,
+                'fueloildata_set': [
+                    {
+                        'fuel_oil_type': fuel_oil_type,
+                        'total_consumption': Decimal("10.00"),
+                        'receipt': Decimal("0.00"),
+                        'debunkering': Decimal("0.00"),
+                        'rob': Decimal("500.00"),
+                        'breakdown': {'ME': "10.00"},
+                    }
+                    for fuel_oil_type in (FuelType.HFO, FuelType.MGO)],
+                'lubricatingoildata_set': [{
+                    'lubricating_oil_type': "ME_CYL",
+                    'total_consumption': Decimal("0.10"),
+                    'receipt': Decimal("0.00"),
+                    'debunkering': Decimal("0.00"),
+                    'rob': Decimal("20.00"),
+                }],
+                'freshwaterdata': {
+                    'consumed': 5, 'generated': 0, 'received': 0,
+                    'discharged': 0, 'rob': 100},
+            },
+            batch=batch,
+        )
+
+    def test_flush_writes_each_model_once_with_parent_keys(self):
+        batch = ReportRowBatch()
+        start = datetime(2022, 3, 2, tzinfo=timezone.utc)
+        for day in range(2):
+            self._add_noon_report(batch, start + timedelta(days=day))
+
+        # One INSERT per model: the header, 6 report data models at depth 1
+        # and fuel oil, lube oil and fresh water data at depth 2
+        with self.assertNumQueries(10):
+            report_headers = batch.flush()
+
+        self.assertEqual(len(report_headers), 2)
+        for report_header in report_headers:
+            self.assertIsNotNone(report_header.pk)
+            self.assertEqual(report_header.ship_id, self.leg.voyage.ship_id)
+            # Depth 1
+            ccdata = ConsumptionConditionData.objects.get(
+                report_header=report_header)
+            self.assertTrue(ReportRoute.objects.filter(
+                report_header=report_header).exists())
+            self.assertTrue(DistanceTimeData.objects.filter(
+                report_header=report_header).exists())
+            # Depth 2
+            self.assertEqual(
+                sorted(FuelOilData.objects.filter(
+                    ccdata=ccdata,
+                ).values_list(
+                    'fuel_oil_type', flat=True,
+                )),
+                [FuelType.HFO, FuelType.MGO])
+            self.assertTrue(LubricatingOilData.objects.filter(
+                ccdata=ccdata).exists())
+            self.assertEqual(
+                FreshWaterData.objects.get(ccdata=ccdata).rob, 100)
+
+
+class FoldLegReportsTest(SimpleTestCase):
+    def test_voided_report_is_skipped(self):
+        leg_data = VoyageLegData()
+        totals = defaultdict(Decimal)
+        reports = [
+            ReportHeader(
+                report_type=ReportType.BDN,
+                report_date=datetime(2022, 3, day, tzinfo=timezone.utc),
+                report_tz=0,
+                status=status,
+            )
+            for day, status in ((1, Status.ACTIVE), (2, Status.INACTIVE))
+        ]
+        fold_leg_reports(leg_data, totals, reports)
+        self.assertEqual(leg_data.last_report_date, reports[0].report_date)
+
+    def test_chain_follows_edges_then_report_date(self):
+        # 1 -> 3 -> 2, 4 is past a missing edge
+        self.assertEqual(
+            order_leg_chain([1, 2, 3, 4], [(None, 1), (1, 3), (3, 2)]),
+            [1, 3, 2, 4])
+
+
+class RecomputeLegDataTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        ship = create_ship_for_user(user, company, 9900000)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+
+        start = datetime(2022, 3, 1, tzinfo=timezone.utc)
+        self.reports = []
+        previous_report = None
+        for report_num in range(LEG_CHECKPOINT_INTERVAL + 4):
+            report = ReportHeader.objects.create(
+                voyage_leg=self.leg,
+                report_type=ReportType.BDN,
+                report_num=report_num + 1,
+                report_date=start + timedelta(hours=report_num),
+                report_tz=0,
+            )
+            ReportEdge.objects.create(
+                previous_report=previous_report, next_report=report)
+            update_leg_data(report)
+            self.reports.append(report)
+            previous_report = report
+
+    def _get_checkpointed_reports(self) -> list[ReportHeader]:
+        checkpointed_ids = set(VoyageLegCheckpoint.objects.filter(
+            report_header__voyage_leg=self.leg,
+        ).values_list(
+            'report_header_id', flat=True,
+        ))
+        return [report for report in self.reports
+                if report.pk in checkpointed_ids]
+
+    def _recompute(self, from_report: ReportHeader) -> list[int]:
+        """Recomputes the leg, returns the ids of the reports replayed"""
+        with mock.patch(
+            'vesselreporting.logic.recompute_logic.get_leg_reports',
+            wraps=get_leg_reports,
+        ) as leg_reports:
+            recompute_leg_data(self.leg, from_report=from_report)
+        return list(leg_reports.call_args.args[1])
+
+    def test_live_reports_checkpoint_every_interval(self):
+        self.assertEqual(
+            self._get_checkpointed_reports(),
+            [self.reports[LEG_CHECKPOINT_INTERVAL - 1]])
+
+    def test_correction_to_latest_replays_from_live_checkpoint(self):
+        replayed_ids = self._recompute(self.reports[-1])
+        self.assertEqual(
+            replayed_ids,
+            [report.pk for report in self.reports[LEG_CHECKPOINT_INTERVAL:]])
+
+    def test_checkpoints_interval_and_before_latest(self):
+        recompute_leg_data(self.leg)
+        self.assertEqual(
+            self._get_checkpointed_reports(),
+            [self.reports[LEG_CHECKPOINT_INTERVAL - 1], self.reports[-2]])
+
+    def test_correction_replays_from_nearest_checkpoint(self):
+        replayed_ids = self._recompute(self.reports[-3])
+        self.assertEqual(
+            replayed_ids,
+            [report.pk for report in self.reports[LEG_CHECKPOINT_INTERVAL:]])
+
+        leg_data = VoyageLegData.objects.get(voyage_leg=self.leg)
+        self.assertEqual(
+            leg_data.last_report_date, self.reports[-1].report_date)
+        self.assertEqual(
+            self._get_checkpointed_reports(),
+            [self.reports[LEG_CHECKPOINT_INTERVAL - 1], self.reports[-2]])
+
+    def test_correction_to_latest_after_recompute_replays_one_report(self):
+        recompute_leg_data(self.leg)
+        replayed_ids = self._recompute(self.reports[-1])
+        self.assertEqual(replayed_ids, [self.reports[-1].pk])
+
+    def test_voided_report_is_skipped_and_checkpoint_replaced(self):
+        voided_report = self.reports[-2]
+        ReportHeader.objects.filter(pk=voided_report.pk).update(
+            status=Status.INACTIVE)
+        self._recompute(voided_report)
+
+        # CASE: The voided report's checkpoint holds the report before it
+        checkpoint = VoyageLegCheckpoint.objects.get(
+            report_header=voided_report)
+        self.assertEqual(
+            parse_datetime(checkpoint.leg_data['last_report_date']),
+            self.reports[-3].report_date)
+
+        ReportHeader.objects.filter(pk=self.reports[-1].pk).update(
+            status=Status.INACTIVE)
+        leg_data = recompute_leg_data(
+            self.leg, from_report=self.reports[-1])
+        self.assertEqual(
+            leg_data.last_report_date, self.reports[-3].report_date)
+
+
+class LegRecomputeSignalTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="fleet.manager")
+        company = Company.objects.create(
+            name="MarinaChain", link="https://marinachain.io")
+        ship = create_ship_for_user(user, company, 9910000)
+        voyage = create_new_voyage(ship=ship, voyage_num=1)
+        self.leg = create_new_voyage_leg(voyage=voyage, leg_num=1)
+        self.report = ReportHeader.objects.create(
+            voyage_leg=self.leg,
+            report_type=ReportType.NOON,
+            report_num=1,
+            report_date=datetime(2022, 3, 1, tzinfo=timezone.utc),
+            report_tz=0,
+        )
+        ccdata = ConsumptionConditionData.objects.create(
+            report_header=self.report,
+            consumption_type=ConsumptionType.NOON_TO_NOON,
+        )
+        self.fuel_oil_data = FuelOilData.objects.create(
+            ccdata=ccdata,
+            fuel_oil_type=FuelType.HFO,
+            total_consumption=Decimal("10.00"),
+            receipt=Decimal("0.00"),
+            debunkering=Decimal("0.00"),
+            rob=Decimal("490.00"),
+            breakdown={},
+        )
+
+        patcher = mock.patch(
+            'vesselreporting.signals.recompute_leg_data_task')
+        self.recompute_task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertRecomputeScheduled(self):
+        self.recompute_task.delay.assert_called_once_with(
+            str(self.leg.uuid), str(self.report.uuid))
+
+    def test_voiding_report_recomputes_its_leg(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report.status = Status.INACTIVE
+            self.report.save()
+        self.assertRecomputeScheduled()
+
+    def test_saving_unchanged_status_does_not_recompute(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.report.report_tz = 8
+            self.report.save()
+        self.recompute_task.delay.assert_not_called()
+
+    def test_correction_recomputes_its_leg(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FuelOilDataCorrection.objects.create(
+                fuel_oil_data=self.fuel_oil_data,
+                correction=Decimal("-1.50"),
+                remarks="Sounding error",
+            )
+        self.assertRecomputeScheduled()
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('marinanet/ships/', views.ShipList.as_view()), # Unused
@@ -14,6 +14,10 @@ urlpatterns = [
          views.LatestVoyageDetailByShip.as_view()),
     path('marinanet/ships/<int:imo_reg>/reports/',
          views.ShipReportsList.as_view()),
+    path('marinanet/ships/<int:imo_reg>/reports/import/',
+         views.ShipReportsImportView.as_view()),
+    path('marinanet/ships/<int:imo_reg>/timeline/',
+         views.ShipTimelineView.as_view()),
     path('marinanet/ships/<int:imo_reg>/latest-report/', # Unused
          views.LatestReportDetailByShip.as_view()),
     path('marinanet/ships/<int:imo_reg>/legs/', views.ShipLegsList.as_view()),
@@ -27,6 +31,15 @@ urlpatterns = [
     path('marinanet/reports/', views.ReportsList.as_view()), # Unused
     path('marinanet/reports/<uuid:uuid>/', views.ReportDetail.as_view()),
     path('marinanet/ships/<int:imo_reg>/stats/',
-         views.WeeklyStatsList.as_view()),
+         views.DailyStatsList.as_view()),
     path('marinanet/user/', views.UserProfileView.as_view()),
+    # Async read views, for ASGI workers
+    path('marinanet/async/ships-overview/',
+         async_views.ShipsOverviewAsyncView.as_view()),
+    path('marinanet/async/ships/<int:imo_reg>/latest-details/',
+         async_views.ReportPrefillAsyncView.as_view()),
+    path('marinanet/async/ships/<int:imo_reg>/stats/',
+         async_views.DailyStatsAsyncView.as_view()),
+    path('marinanet/async/reports/<uuid:uuid>/',
+         async_views.ReportDetailAsyncView.as_view()),
 ]
@@ -1,13 +1,13 @@
 from datetime import datetime, timedelta, timezone
+import uuid
 
-from django.db.models import Q
 from django.db.models.functions import TruncDate
 from django.forms.models import model_to_dict
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.serializers import ModelSerializer
 from rest_framework.views import APIView
@@ -18,7 +18,14 @@ from core.models import (
     ShipSpecs,
     UserProfile,
 )
+from core.permissions import HasShipAccess, ShipAccessQuerysetMixin
+from core.response_cache import (
+    AccessibleShipsCachedResponseMixin,
+    ShipCachedResponseMixin,
+    bump_ship_version,
+)
 from vesselreporting.enums import ReportType
+from vesselreporting.filters import DateRangeFilter
 from vesselreporting.models.report_models import (
     ReportHeader,
     ReportRoute,
@@ -26,6 +33,11 @@ from vesselreporting.models.report_models import (
     VoyageLeg,
     VoyageLegData,
 )
+from vesselreporting.pagination import (
+    CreatedAtCursorPagination,
+    ReportDateCursorPagination,
+)
+from vesselreporting.parsers import NDJSONParser
 from vesselreporting.permissions import (
     IsShipUser
 )
@@ -34,6 +46,7 @@ from vesselreporting.serializers.model_serializers import (
     ReportHeaderWithLegSerializer,
     ShipSerializer,
     ShipSpecsSerializer,
+    TimelineSerializer,
     UserProfileSerializer,
     VoyageLegSerializer,
     VoyageLegDataSerializer,
@@ -42,10 +55,25 @@ from vesselreporting.serializers.model_serializers import (
     VoyageWithVoyageLegsSerializer,
 )
 from vesselreporting.serializers.stats_serializers import (
-    DailyStatSerializer,
+    ShipDailyStatSerializer,
     ShipOverviewSerializer,
 )
 from vesselreporting.logic.serializer_map import get_serializer_from_report_type
+from vesselreporting.logic.import_logic import import_reports
+from vesselreporting.logic.stats_logic import (
+    DEFAULT_STATS_WINDOW,
+    STATS_WINDOWS,
+    get_ship_daily_stats,
+)
+from vesselreporting.logic.timeline_logic import (
+    DEFAULT_TIMELINE_LIMIT,
+    MAX_TIMELINE_LIMIT,
+    TIMELINE_BACKWARD,
+    TIMELINE_DIRECTIONS,
+    get_timeline,
+)
+from vesselreporting.logic.voyage_logic import set_latest_leg_for_ship
+from utils.prefetch_utils import PrefetchPlannedMixin
 
 import logging
 
@@ -67,22 +95,22 @@ class UserProfileView(APIView):
 """
 
 
-class ShipList(generics.ListAPIView):
+class ShipList(ShipAccessQuerysetMixin, PrefetchPlannedMixin,
+               generics.ListAPIView):
     """
     List all Ships that a user can view
     """
     permission_classes = [IsShipUser]
     serializer_class = ShipSerializer
+    ship_access_field = 'id'
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Ship.objects.filter(assigned_users=user).select_related(
-            'shipspecs')  # TODO: Why can't this be "ship_specs"?
-        print(queryset)
+        queryset = Ship.objects.all()
         return queryset
 
 
-class ShipDetail(generics.RetrieveAPIView):
+class ShipDetail(ShipCachedResponseMixin, generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated, HasShipAccess]
     queryset = Ship.objects.all()
     serializer_class = ShipSerializer
     lookup_field = 'imo_reg'
@@ -105,38 +133,20 @@ class ShipDetail(generics.RetrieveAPIView):
 #             return Response(data)
 
 
-class ShipsOverviewListView(generics.ListAPIView):
+class ShipsOverviewListView(AccessibleShipsCachedResponseMixin,
+                            ShipAccessQuerysetMixin, PrefetchPlannedMixin,
+                            generics.ListAPIView):
     """
     List all Ships that a user can view, with specs and latest status
     """
     serializer_class = ShipOverviewSerializer
+    ship_access_field = 'id'
+    # Accessible ships, then ships
+    query_budget = 2
 
     def get_queryset(self):
-        user = self.request.user
-        ships = Ship.objects.filter(
-            assigned_users=user,
-        ).select_related(
-            'shipspecs',
-        )
-
-        # Get the latest legs for each ship in 1 query
-        legs = VoyageLeg.objects.filter(
-            voyage__ship__in=ships,
-        ).order_by(
-            'uuid',
-            '-created_at',
-        ).distinct(
-            'uuid',
-        ).select_related(
-            'voyagelegdata',
-        )
-
-        # Map legs to respective ships
-        # Assign none if no legs have been created
-        legs_dict = {leg.voyage.ship.uuid: leg for leg in legs}
-        for ship in ships:
-            ship.latest_leg = legs_dict.get(ship.uuid, None)
-
+        # Latest leg is denormalized onto Ship, so this is a single query
+        ships = Ship.objects.all()
         return ships
 
 
@@ -148,6 +158,7 @@ class ShipSpecsCreateView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(ship=ship)
+        bump_ship_version(ship.pk)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED,
                         headers=headers)
@@ -181,11 +192,15 @@ class ShipSpecsCreateView(generics.CreateAPIView):
 #                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ShipVoyageList(generics.ListAPIView):
+class ShipVoyageList(PrefetchPlannedMixin, generics.ListAPIView):
     """
     List all Voyages from a single ship
     """
+    permission_classes = [IsAuthenticated, HasShipAccess]
     serializer_class = VoyageSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'created_at'
 
     def get_queryset(self):
         imo_reg = self.kwargs['imo_reg']
@@ -194,16 +209,19 @@ class ShipVoyageList(generics.ListAPIView):
         return queryset
 
 
-class VoyageList(generics.ListCreateAPIView):
+class VoyageList(ShipAccessQuerysetMixin, PrefetchPlannedMixin,
+                 generics.ListCreateAPIView):
     """
     List all voyages that a user can view
     Creates voyage based on Ship UUID
     """
     serializer_class = VoyageSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'created_at'
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Voyage.objects.filter(ship__assigned_users=user)
+        queryset = Voyage.objects.all()
         return queryset
 
     def create(self, request):
@@ -236,6 +254,7 @@ class LatestVoyageDetailByShip(generics.RetrieveAPIView):
     Displays details for the latest report for a ship
     User must have permission to view ship that voyage is associated with
     """
+    permission_classes = [IsAuthenticated, HasShipAccess]
     serializer_class = VoyageSerializer
     lookup_field = 'imo_reg'
 
@@ -251,7 +270,7 @@ class LatestVoyageDetailByShip(generics.RetrieveAPIView):
         return queryset.latest('created_at')
 
 
-class VoyageReportsList(generics.ListAPIView):
+class VoyageReportsList(PrefetchPlannedMixin, generics.ListAPIView):
     """
     Lists all reports from a single voyage
     TODO: User must have permission to view ship
@@ -261,29 +280,40 @@ class VoyageReportsList(generics.ListAPIView):
     def get_queryset(self):
         voyage_uuid = self.kwargs['uuid']
         voyage = Voyage.objects.get(uuid=voyage_uuid)
-        queryset = ReportHeader.objects.filter(voyage_leg__voyage=voyage)
+        queryset = ReportHeader.objects.filter(voyage=voyage)
         return queryset
 
 
-class ShipReportsList(generics.ListAPIView):
+class ShipReportsList(PrefetchPlannedMixin, generics.ListAPIView):
     """
     Lists all reports from a single ship
     """
+    permission_classes = [IsAuthenticated, HasShipAccess]
     serializer_class = VoyageWithVoyageLegsSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'created_at'
+    # Accessible ships, ship, voyages, legs with leg data, reports with
+    # routes
+    query_budget = 5
 
     def get_queryset(self):
         imo_reg = self.kwargs['imo_reg']
         ship = Ship.objects.get(imo_reg=imo_reg)
-        queryset = Voyage.objects.filter(ship=ship).order_by("-created_at")
+        queryset = Voyage.objects.filter(ship=ship)
         return queryset
 
 
-class VoyageLegList(generics.ListCreateAPIView):
+class VoyageLegList(ShipAccessQuerysetMixin, PrefetchPlannedMixin,
+                    generics.ListCreateAPIView):
     serializer_class = VoyageLegSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'created_at'
+    ship_access_field = 'voyage__ship_id'
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = VoyageLeg.objects.filter(voyage__ship__assigned_users=user)
+        queryset = VoyageLeg.objects.all()
         return queryset
 
     def create(self, request, *args, **kwargs):
@@ -296,17 +326,19 @@ class VoyageLegList(generics.ListCreateAPIView):
                         headers=headers)
 
 
-class ReportsList(generics.ListCreateAPIView):
+class ReportsList(ShipAccessQuerysetMixin, PrefetchPlannedMixin,
+                  generics.ListCreateAPIView):
     """
     Lists all reports that a user can view
     Creates a new report
     """
     serializer_class = ReportHeaderSerializer
+    pagination_class = ReportDateCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'report_date'
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = ReportHeader.objects.filter(
-            voyage_leg__voyage__ship__assigned_users=user)
+        queryset = ReportHeader.objects.all()
         return queryset
 
     def create(self, request, *args, **kwargs):
@@ -324,8 +356,10 @@ class ReportsList(generics.ListCreateAPIView):
             voyage_leg_data = request.data.pop('voyage_leg')
             voyage_uuid = voyage_leg_data.pop('voyage').pop('uuid')
             voyage = Voyage.objects.get(uuid=voyage_uuid)
-            voyage_leg, _ = VoyageLeg.objects.get_or_create(
+            voyage_leg, created = VoyageLeg.objects.get_or_create(
                 voyage=voyage, **voyage_leg_data)
+            if created:
+                set_latest_leg_for_ship(voyage_leg)
         else:
             voyage_leg_data = request.data.pop('voyage_leg')
             voyage_leg = VoyageLeg.objects.get(uuid=voyage_leg_data['uuid'])
@@ -340,7 +374,60 @@ class ReportsList(generics.ListCreateAPIView):
             serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class ReportDetail(generics.RetrieveAPIView):
+class ShipReportsImportView(APIView):
+    """
+    Imports a ship's historical reports from an NDJSON body
+    One ReportsList-shaped report per line, in chronological order
+    """
+    parser_classes = [NDJSONParser]
+    permission_classes = [IsAuthenticated, HasShipAccess]
+
+    def post(self, request, imo_reg):
+        ship = get_object_or_404(Ship, imo_reg=imo_reg)
+        result = import_reports(ship, request.data)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class ShipTimelineView(APIView):
+    """
+    Walks a ship's report chain from `start` (the latest report by default)
+    * direction: backward (default) or forward
+    * limit: reports per page, pass `next` as `start` to continue
+    """
+    permission_classes = [IsAuthenticated, HasShipAccess]
+    # Accessible ships, ship, timeline, forks
+    query_budget = 4
+
+    def get(self, request, imo_reg):
+        ship = get_object_or_404(Ship, imo_reg=imo_reg)
+
+        direction = request.query_params.get('direction', TIMELINE_BACKWARD)
+        if direction not in TIMELINE_DIRECTIONS:
+            raise ValidationError(
+                {'direction': 'Must be one of {}.'.format(
+                    ', '.join(TIMELINE_DIRECTIONS))})
+        try:
+            limit = int(request.query_params.get(
+                'limit', DEFAULT_TIMELINE_LIMIT))
+        except ValueError:
+            limit = None
+        if limit is None or not 0 < limit <= MAX_TIMELINE_LIMIT:
+            raise ValidationError(
+                {'limit': 'Must be between 1 and {}.'.format(
+                    MAX_TIMELINE_LIMIT)})
+        start = request.query_params.get('start')
+        if start is not None:
+            try:
+                start = str(uuid.UUID(start))
+            except ValueError:
+                raise ValidationError({'start': 'Must be a valid UUID.'})
+
+        timeline = get_timeline(ship, start, direction, limit)
+        serializer = TimelineSerializer(timeline)
+        return Response(serializer.data)
+
+
+class ReportDetail(ShipCachedResponseMixin, generics.RetrieveAPIView):
     """
     Displays details for a single Noon Report At Sea based on UUID
     TODO: User must have permission to view ship
@@ -352,6 +439,10 @@ class ReportDetail(generics.RetrieveAPIView):
         queryset = ReportHeader.objects.filter(uuid=report_uuid)
         return queryset
 
+    def get_cache_ship_ids(self):
+        ship_id = self.get_queryset().values_list('ship_id', flat=True).first()
+        return [ship_id] if ship_id is not None else None
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         report_type = instance.report_type
@@ -364,12 +455,13 @@ class LatestReportDetailByShip(generics.RetrieveAPIView):
     """
     Displays details for the latest report for a given ship.
     """
+    permission_classes = [IsAuthenticated, HasShipAccess]
     lookup_field = 'imo_reg'
 
     def get_queryset(self):
         imo_reg = self.kwargs['imo_reg']
         queryset = ReportHeader.objects.filter(
-            voyage_leg__voyage__ship__imo_reg=imo_reg
+            ship__imo_reg=imo_reg
         ).order_by('-report_date')
         return queryset.first()
 
@@ -388,33 +480,37 @@ class LatestReportDetailByShip(generics.RetrieveAPIView):
         return Response(serializer.data)
 
 
-class ShipLegsList(generics.ListAPIView):
+class ShipLegsList(ShipCachedResponseMixin, PrefetchPlannedMixin,
+                   generics.ListAPIView):
     """
     Lists all legs from a single ship
     """
+    permission_classes = [IsAuthenticated, HasShipAccess]
     serializer_class = VoyageLegWithPortsSerializer
+    pagination_class = CreatedAtCursorPagination
+    filter_backends = [DateRangeFilter]
+    date_range_field = 'created_at'
 
     def get_queryset(self):
         imo_reg = self.kwargs['imo_reg']
         ship = Ship.objects.get(imo_reg=imo_reg)
-        queryset = VoyageLeg.objects.filter(
-            voyage__ship=ship
-        ).select_related(
-            'voyagelegdata',
-        ).order_by(
-            '-created_at',
-        )
+        queryset = VoyageLeg.objects.filter(voyage__ship=ship)
         return queryset
 
 
-class ReportPrefillView(generics.RetrieveAPIView):
+class ReportPrefillView(ShipCachedResponseMixin, generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated, HasShipAccess]
     serializer_class = VoyageLegDataSerializer
     lookup_field = 'imo_reg'
 
     def get_queryset(self):
         imo_reg = self.kwargs['imo_reg']
         ship = Ship.objects.get(imo_reg=imo_reg)
-        queryset = VoyageLegData.objects.filter(voyage_leg__voyage__ship=ship)
+        queryset = VoyageLegData.objects.filter(
+            voyage_leg__voyage__ship=ship,
+        ).prefetch_related(
+            'voyage_leg__accumulators',
+        )
         return queryset
 
     def get_object(self):
@@ -425,24 +521,28 @@ class ReportPrefillView(generics.RetrieveAPIView):
         return obj
 
 
-class WeeklyStatsList(APIView):
+def get_stats_window(request) -> int:
+    """The `days` query param, one of STATS_WINDOWS"""
+    try:
+        days = int(request.query_params.get('days', DEFAULT_STATS_WINDOW))
+    except ValueError:
+        days = None
+    if days not in STATS_WINDOWS:
+        raise ValidationError(
+            {'days': 'Must be one of {}.'.format(
+                ', '.join(str(window) for window in STATS_WINDOWS))})
+    return days
+
+
+class DailyStatsList(APIView):
+    """
+    Lists a ship's daily rollups for the last `days` days (7 by default)
+    """
+    permission_classes = [IsAuthenticated, HasShipAccess]
+
     def get(self, request, imo_reg):
         ship = get_object_or_404(Ship, imo_reg=imo_reg)
-        past_week_reports = ReportHeader.objects.filter(
-            voyage_leg__voyage__ship=ship,
-        ).filter(
-            Q(report_type=ReportType.DEP_SBY) |
-            Q(report_type=ReportType.DEP_COSP) |
-            Q(report_type=ReportType.NOON) |
-            Q(report_type=ReportType.ARR_SBY) |
-            Q(report_type=ReportType.ARR_FWE)
-        ).order_by(
-            '-report_date',
-        ).select_related(
-            'distancetimedata',
-        ).prefetch_related(
-            'consumptionconditiondata__fueloildata_set',
-        )[:7]
-
-        serializer = DailyStatSerializer(past_week_reports, many=True)
+        days = get_stats_window(request)
+        daily_stats = get_ship_daily_stats(ship, days)
+        serializer = ShipDailyStatSerializer(daily_stats, many=True)
         return Response(serializer.data)